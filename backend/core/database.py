@@ -1,8 +1,12 @@
 """
 Configuração e conexão com banco de dados
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 from .config import get_database_url
 
 # Configuração do banco
@@ -34,3 +38,47 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Lock entre processos para jobs de background
+@contextmanager
+def advisory_lock(name: str, timeout: int = 0) -> Iterator[Optional[Session]]:
+    """Sessão numa conexão dedicada que segura GET_LOCK(name) do MySQL
+
+    O lock pertence à conexão: a sessão pode fazer commit a cada lote sem
+    devolvê-la ao pool, e o RELEASE_LOCK roda na mesma conexão no fim do
+    bloco. Entrega None se outra conexão já tem o lock. Fora do MySQL não há
+    lock (a sessão é entregue sempre).
+    """
+    connection = engine.connect()
+    try:
+        is_mysql = connection.dialect.name == "mysql"
+        locked = True
+        if is_mysql:
+            locked = bool(connection.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout}
+            ).scalar())
+        connection.commit()
+        if not locked:
+            yield None
+            return
+
+        db = SessionLocal(bind=connection)
+        try:
+            yield db
+        finally:
+            db.close()
+            if is_mysql:
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+                connection.commit()
+    finally:
+        connection.close()
+
+@asynccontextmanager
+async def advisory_lock_async(name: str, timeout: int = 0) -> AsyncIterator[Optional[Session]]:
+    """advisory_lock para tasks asyncio (conexão e lock fora do event loop)"""
+    lock = advisory_lock(name, timeout)
+    db = await asyncio.to_thread(lock.__enter__)
+    try:
+        yield db
+    finally:
+        await asyncio.to_thread(lock.__exit__, None, None, None)
@@ -0,0 +1,144 @@
+"""
+Migrações versionadas do schema
+
+Cada módulo em backend/migrations (vNNN_descricao.py) define VERSION,
+DESCRIPTION e upgrade(). As versões aplicadas ficam na tabela
+schema_migrations. O startup da API só confere a versão; as migrações rodam
+por `python maintenance/migrate.py upgrade` (ou no startup, se
+AUTO_MIGRATE=true).
+
+Regras para novas migrações:
+- devem ser idempotentes (conferir INFORMATION_SCHEMA antes de cada ALTER),
+  já que bancos novos recebem o schema completo da v001;
+- índices em tabelas grandes devem ser criados online
+  (ALGORITHM=INPLACE, LOCK=NONE) — ver add_index_online().
+"""
+import importlib
+import os
+import pkgutil
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+from .database import advisory_lock, engine, SessionLocal
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def load_migrations() -> List:
+    """Módulos de migração ordenados por versão"""
+    import migrations
+
+    modules = []
+    for module_info in pkgutil.iter_modules(migrations.__path__):
+        if module_info.name.startswith("v"):
+            modules.append(importlib.import_module(f"migrations.{module_info.name}"))
+    modules.sort(key=lambda module: module.VERSION)
+
+    versions = [module.VERSION for module in modules]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Versões de migração repetidas: {versions}")
+    return modules
+
+def latest_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1].VERSION if migrations else 0
+
+def current_version() -> int:
+    """Última versão aplicada (0 se o banco nunca foi migrado)"""
+    if not inspect(engine).has_table("schema_migrations"):
+        return 0
+    with engine.connect() as connection:
+        version = connection.execute(
+            select(schema_migrations.c.version).order_by(schema_migrations.c.version.desc()).limit(1)
+        ).scalar()
+    return version or 0
+
+def pending_migrations() -> List:
+    version = current_version()
+    return [module for module in load_migrations() if module.VERSION > version]
+
+def _record(db, module):
+    db.execute(schema_migrations.insert().values(
+        version=module.VERSION,
+        description=module.DESCRIPTION,
+        applied_at=datetime.utcnow()
+    ))
+    db.commit()
+
+def upgrade(target: Optional[int] = None) -> int:
+    """Aplicar as migrações pendentes (até target, se informado); devolve a versão final"""
+    migration_metadata.create_all(bind=engine)
+
+    # Uma única instância migrando por vez; o lock fica na conexão usada pelo _record
+    with advisory_lock("schema_migrations", 60) as db:
+        if db is None:
+            raise RuntimeError("Outra instância está aplicando migrações")
+
+        for module in pending_migrations():
+            if target is not None and module.VERSION > target:
+                break
+            print(f"➕ Aplicando migração {module.VERSION:03d}: {module.DESCRIPTION}")
+            module.upgrade()
+            _record(db, module)
+            print(f"✅ Migração {module.VERSION:03d} aplicada")
+
+    return current_version()
+
+def stamp(version: int):
+    """Marcar as migrações até version como aplicadas, sem executá-las"""
+    migration_metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        applied = current_version()
+        for module in load_migrations():
+            if applied < module.VERSION <= version:
+                _record(db, module)
+    finally:
+        db.close()
+
+def add_index_online(db, table_name: str, index_name: str, columns: str, unique: bool = False):
+    """Criar um índice sem bloquear escritas, se ainda não existir"""
+    exists = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone().count > 0
+    if exists:
+        return False
+
+    db.execute(text(
+        f"ALTER TABLE {table_name} ADD {'UNIQUE ' if unique else ''}INDEX {index_name} ({columns}), "
+        f"ALGORITHM=INPLACE, LOCK=NONE"
+    ))
+    db.commit()
+    return True
+
+def check_schema_version():
+    """Conferência do startup: avisa sobre migrações pendentes (ou aplica, com AUTO_MIGRATE)"""
+    pending = pending_migrations()
+    if not pending:
+        print(f"✅ Schema na versão {current_version()}")
+        return True
+
+    if os.getenv("AUTO_MIGRATE", "false").lower() == "true":
+        print(f"🔧 Aplicando {len(pending)} migrações pendentes (AUTO_MIGRATE)...")
+        upgrade()
+        return True
+
+    print(f"⚠️ Schema na versão {current_version()}, {len(pending)} migrações pendentes:")
+    for module in pending:
+        print(f"   {module.VERSION:03d}: {module.DESCRIPTION}")
+    print("   Rode: python maintenance/migrate.py upgrade")
+    return False
@@ -1,6 +1,7 @@
 """
 Aplicação principal FastAPI - Vibe Social Network
 """
+import json
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
@@ -8,15 +9,38 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from core.config import ALLOWED_ORIGINS
-from core.database import engine, Base
+from core.database import SessionLocal
+from core.migrations import check_schema_version
 from core.security_middleware import security_middleware
 from core.performance_middleware import performance_middleware, start_cache_cleanup
 from core.websockets import manager
+from utils.notification_outbox import notification_outbox, start_notification_outbox, stop_notification_outbox
+from utils.notification_counters import start_counter_cleanup
+from utils.notification_retention import start_notification_retention
+from utils.social_graph import social_graph
+from utils.friend_suggestions import friend_suggestions
+from utils.user_search import user_search
+from utils.identifier_index import identifier_index, start_identifier_index
+from utils.user_stats import user_stats, start_user_stats_reconciler
+from utils.messaging import messaging
+from utils.comment_tree import comment_tree
+from utils.reactions import reaction_counters
+from utils.viewer_state import viewer_state
+from utils.idempotency import idempotency_cache
+from utils.shares import share_service
+from utils.feed import feed
+from utils.feed_ranking import feed_ranker
+from utils.visibility import visibility
+from utils.timeline import timeline, start_timeline_fanout, stop_timeline_fanout
+from utils.cascade_deletion import cascade_deletion, start_cascade_deletion, stop_cascade_deletion
+from utils.chat_coalescer import chat_coalescer, start_chat_coalescer, stop_chat_coalescer
 from routes import auth_router, posts_router, users_router, email_verification_router, stories_router, upload_router
 from routes.friendships import router as friendships_router
 from routes.follows import router as follows_router
 from routes.reports import router as reports_router
 from routes.notifications import router as notifications_router
+from routes.messages import router as messages_router
+from routes.comments import router as comments_router
 from utils.auth import verify_websocket_token
 
 @asynccontextmanager
@@ -33,16 +57,23 @@ async def lifespan(app: FastAPI):
         if "No module named" not in str(e):
             print(f"⚠️ Could not auto-fix reactions table: {e}")
 
-    # Criar tabelas se não existirem
+    # Conferir a versão do schema (migrações: python maintenance/migrate.py upgrade)
     try:
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tabelas do banco verificadas/criadas!")
+        check_schema_version()
     except Exception as e:
-        print(f"⚠️ Erro ao criar tabelas: {e}")
+        print(f"⚠️ Erro ao verificar versão do schema: {e}")
 
     # Iniciar tarefas de background
     print("🔧 Starting security and performance services...")
     start_cache_cleanup()
+    start_notification_outbox()
+    start_counter_cleanup()
+    start_notification_retention()
+    start_identifier_index()
+    start_user_stats_reconciler()
+    start_chat_coalescer()
+    start_timeline_fanout()
+    start_cascade_deletion()
 
     print("🌟 API pronta para uso!")
 
@@ -50,6 +81,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     print("🛑 Encerrando API...")
+    await stop_notification_outbox()
+    await stop_chat_coalescer()
+    await stop_timeline_fanout()
+    await stop_cascade_deletion()
 
 # Criar instância da aplicação FastAPI
 app = FastAPI(
@@ -140,7 +175,7 @@ app.add_middleware(
         "Authorization",
         "X-Requested-With"
     ],
-    expose_headers=["X-Response-Time", "X-Cache", "X-Slow-Request"]
+    expose_headers=["X-Response-Time", "X-Cache", "X-Slow-Request", "X-Next-Cursor"]
 )
 
 # Criar diretórios de upload se não existirem
@@ -166,6 +201,8 @@ app.include_router(friendships_router)
 app.include_router(follows_router)
 app.include_router(reports_router)
 app.include_router(notifications_router)
+app.include_router(messages_router)
+app.include_router(comments_router)
 
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = None):
@@ -195,6 +232,20 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = No
                 # Echo para manter conexão ativa
                 if data == "ping":
                     await websocket.send_text("pong")
+                    continue
+
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+
+                # Indicador de digitação enviado pelo chat
+                if isinstance(event, dict) and event.get("type") == "typing" and isinstance(event.get("recipient_id"), int):
+                    db = SessionLocal()
+                    try:
+                        chat_coalescer.typing(db, user_id, event["recipient_id"], bool(event.get("is_typing")))
+                    finally:
+                        db.close()
 
         except WebSocketDisconnect:
             manager.disconnect(websocket, user_id)
@@ -224,7 +275,27 @@ async def health_check():
 @app.get("/stats")
 async def get_performance_stats():
     """Endpoint para obter estatísticas de performance (apenas para desenvolvimento)"""
-    return performance_middleware.get_stats()
+    return {
+        **performance_middleware.get_stats(),
+        "notification_outbox": notification_outbox.get_stats(),
+        "social_graph": social_graph.get_stats(),
+        "friend_suggestions": friend_suggestions.get_stats(),
+        "user_search": user_search.get_stats(),
+        "identifier_index": identifier_index.get_stats(),
+        "user_stats": user_stats.get_stats(),
+        "messaging": messaging.get_stats(),
+        "chat_coalescer": chat_coalescer.get_stats(),
+        "comment_tree": comment_tree.get_stats(),
+        "reactions": reaction_counters.get_stats(),
+        "viewer_state": viewer_state.get_stats(),
+        "idempotency": idempotency_cache.get_stats(),
+        "shares": share_service.get_stats(),
+        "feed": feed.get_stats(),
+        "timeline": timeline.get_stats(),
+        "feed_ranking": feed_ranker.get_stats(),
+        "visibility": visibility.get_stats(),
+        "cascade_deletion": cascade_deletion.get_stats()
+    }
 
 @app.post("/admin/clear-cache")
 async def clear_cache():
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar os contadores e índices da árvore de comentários
+
+Etapas:
+1. adiciona comments.replies_count e comments.reactions_count;
+2. aponta respostas de respostas para o comentário de primeiro nível
+   (a árvore tem dois níveis);
+3. recalcula replies_count e posts.comments_count a partir das linhas;
+4. cria os índices de thread (post_id, parent_id, id) e de respostas
+   (parent_id, id).
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+COMMENT_COLUMNS = ("replies_count", "reactions_count")
+
+COMMENT_INDEXES = {
+    "ix_comments_post_thread": "post_id, parent_id, id",
+    "ix_comments_parent": "parent_id, id",
+}
+
+def column_exists(db, column_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'comments'
+        AND COLUMN_NAME = :column_name
+    """), {"column_name": column_name}).fetchone()
+    return result.count > 0
+
+def index_exists(db, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'comments'
+        AND INDEX_NAME = :index_name
+    """), {"index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_comment_counters():
+    """Adiciona os contadores, achata as threads, recalcula e cria os índices"""
+    db = SessionLocal()
+
+    try:
+        for column_name in COMMENT_COLUMNS:
+            if column_exists(db, column_name):
+                print(f"✅ Coluna {column_name} já existe")
+            else:
+                print(f"➕ Adicionando coluna {column_name}...")
+                db.execute(text(f"ALTER TABLE comments ADD COLUMN {column_name} INT NOT NULL DEFAULT 0"))
+
+        print("🔄 Movendo respostas de respostas para a thread de primeiro nível...")
+        moved = 0
+        while True:
+            result = db.execute(text("""
+                UPDATE comments c
+                JOIN comments p ON p.id = c.parent_id
+                SET c.parent_id = p.parent_id
+                WHERE p.parent_id IS NOT NULL
+            """))
+            db.commit()
+            moved += result.rowcount
+            if result.rowcount == 0:
+                break
+        print(f"✅ {moved} respostas movidas")
+
+        for index_name, columns in COMMENT_INDEXES.items():
+            if index_exists(db, index_name):
+                print(f"✅ Índice {index_name} já existe")
+                continue
+
+            print(f"➕ Criando índice {index_name} ({columns})...")
+            db.execute(text(
+                f"ALTER TABLE comments ADD INDEX {index_name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+            print(f"✅ Índice {index_name} criado")
+
+        print("🔄 Recalculando replies_count...")
+        db.execute(text("""
+            UPDATE comments c
+            LEFT JOIN (
+                SELECT parent_id, COUNT(*) AS total
+                FROM comments
+                WHERE parent_id IS NOT NULL
+                GROUP BY parent_id
+            ) r ON r.parent_id = c.id
+            SET c.replies_count = COALESCE(r.total, 0)
+        """))
+
+        print("🔄 Recalculando posts.comments_count...")
+        db.execute(text("""
+            UPDATE posts p
+            LEFT JOIN (
+                SELECT post_id, COUNT(*) AS total
+                FROM comments
+                GROUP BY post_id
+            ) c ON c.post_id = p.id
+            SET p.comments_count = COALESCE(c.total, 0)
+        """))
+        db.commit()
+        print("✅ Contadores recalculados")
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração da árvore de comentários")
+    print("=" * 60)
+
+    if add_comment_counters():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Script para criar a tabela conversations e ligar as mensagens existentes
+
+Etapas:
+1. cria a tabela conversations (última mensagem e não lidas desnormalizadas);
+2. adiciona messages.conversation_id e cria uma conversa por par de usuários
+   que já trocou mensagens;
+3. preenche a última mensagem, as não lidas e a última lida de cada lado;
+4. cria o índice do histórico (conversation_id, id).
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+from models import Conversation
+
+def column_exists(db, table_name, column_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND COLUMN_NAME = :column_name
+    """), {"table_name": table_name, "column_name": column_name}).fetchone()
+    return result.count > 0
+
+def index_exists(db, table_name, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_conversations():
+    """Cria a tabela, faz o backfill das conversas e cria o índice do histórico"""
+    db = SessionLocal()
+
+    try:
+        print("➕ Criando tabela conversations (se não existir)...")
+        Conversation.__table__.create(bind=db.get_bind(), checkfirst=True)
+
+        if column_exists(db, "messages", "conversation_id"):
+            print("✅ Coluna messages.conversation_id já existe")
+        else:
+            print("➕ Adicionando coluna messages.conversation_id...")
+            db.execute(text("ALTER TABLE messages ADD COLUMN conversation_id INT NULL"))
+
+        print("🔄 Criando conversas para os pares que já trocaram mensagens...")
+        result = db.execute(text("""
+            INSERT INTO conversations (user_low_id, user_high_id, low_unread_count, high_unread_count,
+                                       low_last_read_id, high_last_read_id, created_at)
+            SELECT LEAST(m.sender_id, m.recipient_id), GREATEST(m.sender_id, m.recipient_id),
+                   0, 0, 0, 0, MIN(m.created_at)
+            FROM messages m
+            LEFT JOIN conversations c
+              ON c.user_low_id = LEAST(m.sender_id, m.recipient_id)
+             AND c.user_high_id = GREATEST(m.sender_id, m.recipient_id)
+            WHERE c.id IS NULL
+            GROUP BY LEAST(m.sender_id, m.recipient_id), GREATEST(m.sender_id, m.recipient_id)
+        """))
+        db.commit()
+        print(f"✅ {result.rowcount} conversas criadas")
+
+        print("🔄 Ligando mensagens às conversas...")
+        result = db.execute(text("""
+            UPDATE messages m
+            JOIN conversations c
+              ON c.user_low_id = LEAST(m.sender_id, m.recipient_id)
+             AND c.user_high_id = GREATEST(m.sender_id, m.recipient_id)
+            SET m.conversation_id = c.id
+            WHERE m.conversation_id IS NULL
+        """))
+        db.commit()
+        print(f"✅ {result.rowcount} mensagens ligadas")
+
+        if index_exists(db, "messages", "ix_messages_conversation"):
+            print("✅ Índice messages.ix_messages_conversation já existe")
+        else:
+            print("➕ Criando índice messages.ix_messages_conversation...")
+            db.execute(text(
+                "ALTER TABLE messages ADD INDEX ix_messages_conversation (conversation_id, id), "
+                "ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+
+        print("🔄 Preenchendo última mensagem e estado de leitura...")
+        db.execute(text("""
+            UPDATE conversations c
+            JOIN (
+                SELECT conversation_id, MAX(id) AS last_id
+                FROM messages
+                WHERE conversation_id IS NOT NULL
+                GROUP BY conversation_id
+            ) latest ON latest.conversation_id = c.id
+            JOIN messages m ON m.id = latest.last_id
+            SET c.last_message_id = m.id,
+                c.last_sender_id = m.sender_id,
+                c.last_message_preview = LEFT(COALESCE(m.content, ''), 200),
+                c.last_message_type = m.message_type,
+                c.last_message_at = m.created_at
+            WHERE c.last_message_id IS NULL
+        """))
+        for side in ("low", "high"):
+            db.execute(text(f"""
+                UPDATE conversations c
+                JOIN (
+                    SELECT conversation_id, recipient_id,
+                           SUM(is_read = 0) AS unread_count,
+                           COALESCE(MAX(CASE WHEN is_read = 1 THEN id END), 0) AS last_read_id
+                    FROM messages
+                    WHERE conversation_id IS NOT NULL
+                    GROUP BY conversation_id, recipient_id
+                ) reads ON reads.conversation_id = c.id AND reads.recipient_id = c.user_{side}_id
+                SET c.{side}_unread_count = reads.unread_count,
+                    c.{side}_last_read_id = reads.last_read_id
+            """))
+        db.commit()
+        print("✅ Conversas preenchidas")
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração das conversas de mensagens")
+    print("=" * 60)
+
+    if add_conversations():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar o par canônico (user_low_id, user_high_id) à tabela friendships
+
+Etapas:
+1. cria as colunas e preenche com LEAST/GREATEST(requester_id, addressee_id);
+2. remove pares duplicados, mantendo o registro de maior prioridade
+   (accepted > pending > rejected; em empate, o mais antigo) e soltando as
+   notificações que apontavam para os registros removidos;
+3. cria o índice único do par e os índices de listagem por usuário.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+STATUS_PRIORITY = "FIELD({alias}.status, 'accepted', 'pending', 'rejected')"
+
+FRIENDSHIP_INDEXES = {
+    "uq_friendships_pair": "UNIQUE INDEX uq_friendships_pair (user_low_id, user_high_id)",
+    "ix_friendships_requester": "INDEX ix_friendships_requester (requester_id, status, addressee_id)",
+    "ix_friendships_addressee": "INDEX ix_friendships_addressee (addressee_id, status, requester_id)",
+}
+
+def column_exists(db, column_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'friendships'
+        AND COLUMN_NAME = :column_name
+    """), {"column_name": column_name}).fetchone()
+    return result.count > 0
+
+def index_exists(db, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'friendships'
+        AND INDEX_NAME = :index_name
+    """), {"index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_friendship_pair_key():
+    """Adiciona o par canônico, deduplica e cria os índices"""
+    db = SessionLocal()
+
+    try:
+        for column_name in ("user_low_id", "user_high_id"):
+            if column_exists(db, column_name):
+                print(f"✅ Coluna {column_name} já existe")
+            else:
+                print(f"➕ Adicionando coluna {column_name}...")
+                db.execute(text(f"ALTER TABLE friendships ADD COLUMN {column_name} INT NULL"))
+
+        print("🔄 Preenchendo o par canônico...")
+        result = db.execute(text("""
+            UPDATE friendships
+            SET user_low_id = LEAST(requester_id, addressee_id),
+                user_high_id = GREATEST(requester_id, addressee_id)
+            WHERE user_low_id IS NULL OR user_high_id IS NULL
+        """))
+        db.commit()
+        print(f"✅ {result.rowcount} registros preenchidos")
+
+        print("🔍 Procurando pares duplicados...")
+        duplicate_ids = [row.id for row in db.execute(text(f"""
+            SELECT DISTINCT f.id
+            FROM friendships f
+            JOIN friendships k
+              ON k.user_low_id = f.user_low_id
+             AND k.user_high_id = f.user_high_id
+             AND k.id <> f.id
+            WHERE {STATUS_PRIORITY.format(alias='k')} < {STATUS_PRIORITY.format(alias='f')}
+               OR ({STATUS_PRIORITY.format(alias='k')} = {STATUS_PRIORITY.format(alias='f')} AND k.id < f.id)
+        """))]
+
+        if duplicate_ids:
+            print(f"🗑️ Removendo {len(duplicate_ids)} registros duplicados...")
+            for start in range(0, len(duplicate_ids), 1000):
+                batch = duplicate_ids[start:start + 1000]
+                params = {f"id_{i}": friendship_id for i, friendship_id in enumerate(batch)}
+                placeholders = ", ".join(f":{name}" for name in params)
+                db.execute(text(
+                    f"UPDATE notifications SET friendship_id = NULL WHERE friendship_id IN ({placeholders})"
+                ), params)
+                db.execute(text(f"DELETE FROM friendships WHERE id IN ({placeholders})"), params)
+                db.commit()
+            print("✅ Duplicados removidos")
+        else:
+            print("✅ Nenhum par duplicado")
+
+        db.execute(text("""
+            ALTER TABLE friendships
+            MODIFY user_low_id INT NOT NULL,
+            MODIFY user_high_id INT NOT NULL
+        """))
+
+        for index_name, definition in FRIENDSHIP_INDEXES.items():
+            if index_exists(db, index_name):
+                print(f"✅ Índice {index_name} já existe")
+                continue
+
+            print(f"➕ Criando índice {index_name}...")
+            db.execute(text(
+                f"ALTER TABLE friendships ADD {definition}, ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+            print(f"✅ Índice {index_name} criado")
+
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração do par canônico de amizades")
+    print("=" * 60)
+
+    if add_friendship_pair_key():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar os índices das consultas mais frequentes
+
+Os índices foram desenhados a partir das consultas em backend/routes (ver os
+__table_args__ dos modelos). Antes de criar um índice único, os registros
+duplicados da tabela são removidos (fica o mais antigo, exceto em reactions,
+onde fica a reação mais recente). Os índices são criados online
+(ALGORITHM=INPLACE, LOCK=NONE).
+
+Depois de rodar, confira os planos com maintenance/check_query_plans.py.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+# tabela -> [(nome do índice, colunas, único)]
+HOT_QUERY_INDEXES = {
+    "posts": [
+        ("ix_posts_author_type_created", "author_id, post_type, created_at", False),
+        ("ix_posts_created", "created_at", False),
+    ],
+    "reactions": [
+        ("uq_reactions_post_user", "post_id, user_id", True),
+    ],
+    "comments": [
+        ("ix_comments_post_created", "post_id, created_at", False),
+    ],
+    "shares": [
+        ("ix_shares_post_user", "post_id, user_id", False),
+    ],
+    "stories": [
+        ("ix_stories_active", "archived, expires_at", False),
+        ("ix_stories_author_created", "author_id, created_at", False),
+    ],
+    "story_views": [
+        ("uq_story_views_story_viewer", "story_id, viewer_id", True),
+    ],
+    "story_tags": [
+        ("ix_story_tags_story", "story_id", False),
+    ],
+    "story_overlays": [
+        ("ix_story_overlays_story", "story_id", False),
+    ],
+    "follows": [
+        ("uq_follows_pair", "follower_id, followed_id", True),
+        ("ix_follows_followed", "followed_id, follower_id", False),
+    ],
+    "blocks": [
+        ("uq_blocks_pair", "blocker_id, blocked_id", True),
+        ("ix_blocks_blocked", "blocked_id, blocker_id", False),
+    ],
+}
+
+# Em duplicatas, qual registro sobrevive
+KEEP_NEWEST = {"reactions"}
+
+def index_exists(db, table_name, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone()
+    return result.count > 0
+
+def remove_duplicates(db, table_name, columns):
+    """Remove registros repetidos nas colunas do índice único"""
+    join_condition = " AND ".join(f"k.{column.strip()} = t.{column.strip()}" for column in columns.split(","))
+    comparison = "k.id > t.id" if table_name in KEEP_NEWEST else "k.id < t.id"
+    result = db.execute(text(f"""
+        DELETE t FROM {table_name} t
+        JOIN {table_name} k ON {join_condition} AND {comparison}
+    """))
+    db.commit()
+    return result.rowcount
+
+def add_hot_query_indexes():
+    """Cria os índices que ainda não existem"""
+    db = SessionLocal()
+
+    try:
+        for table_name, indexes in HOT_QUERY_INDEXES.items():
+            for index_name, columns, unique in indexes:
+                if index_exists(db, table_name, index_name):
+                    print(f"✅ Índice {table_name}.{index_name} já existe")
+                    continue
+
+                if unique:
+                    removed = remove_duplicates(db, table_name, columns)
+                    if removed:
+                        print(f"🗑️ {removed} registros duplicados removidos de {table_name}")
+
+                print(f"➕ Criando índice {table_name}.{index_name} ({columns})...")
+                db.execute(text(
+                    f"ALTER TABLE {table_name} ADD {'UNIQUE ' if unique else ''}INDEX {index_name} ({columns}), "
+                    f"ALGORITHM=INPLACE, LOCK=NONE"
+                ))
+                print(f"✅ Índice {table_name}.{index_name} criado")
+
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração dos índices de consultas frequentes")
+    print("=" * 60)
+
+    if add_hot_query_indexes():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar a data de exclusão das notificações
+
+O job de retenção (utils/notification_retention.py) expurga as notificações
+apagadas pelo usuário um período depois da exclusão, e não da criação. Etapas:
+1. adiciona notifications.deleted_at;
+2. preenche deleted_at das notificações já apagadas com a data da migração
+   (em lotes), para que elas ganhem o período de carência completo;
+3. cria o índice ix_notifications_deleted (is_deleted, deleted_at).
+Coluna e índice são criados online (ALGORITHM=INPLACE, LOCK=NONE).
+"""
+import sys
+import os
+from datetime import datetime
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+BACKFILL_BATCH = 5000
+
+def column_exists(db, table_name, column_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND COLUMN_NAME = :column_name
+    """), {"table_name": table_name, "column_name": column_name}).fetchone()
+    return result.count > 0
+
+def index_exists(db, table_name, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_notification_deleted_at():
+    """Adiciona notifications.deleted_at, preenche as já apagadas e cria o índice"""
+    db = SessionLocal()
+
+    try:
+        if column_exists(db, "notifications", "deleted_at"):
+            print("✅ Coluna notifications.deleted_at já existe")
+        else:
+            print("➕ Adicionando coluna notifications.deleted_at...")
+            db.execute(text(
+                "ALTER TABLE notifications ADD COLUMN deleted_at DATETIME NULL, ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+
+        print("🔄 Preenchendo deleted_at das notificações já apagadas...")
+        now = datetime.utcnow()
+        total = 0
+        while True:
+            result = db.execute(text("""
+                UPDATE notifications SET deleted_at = :now
+                WHERE is_deleted = TRUE AND deleted_at IS NULL
+                LIMIT :batch
+            """), {"now": now, "batch": BACKFILL_BATCH})
+            db.commit()
+            total += result.rowcount
+            if result.rowcount < BACKFILL_BATCH:
+                break
+        print(f"✅ {total} notificações apagadas preenchidas")
+
+        if index_exists(db, "notifications", "ix_notifications_deleted"):
+            print("✅ Índice ix_notifications_deleted já existe")
+        else:
+            print("➕ Criando índice ix_notifications_deleted...")
+            db.execute(text(
+                "ALTER TABLE notifications ADD INDEX ix_notifications_deleted (is_deleted, deleted_at), "
+                "ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração da data de exclusão das notificações")
+    print("=" * 60)
+
+    if add_notification_deleted_at():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
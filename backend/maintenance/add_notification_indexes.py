@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar os índices compostos da tabela notifications
+
+Base.metadata.create_all só cria índices em tabelas novas; bancos existentes
+precisam deste script. Os índices são criados online (ALGORITHM=INPLACE,
+LOCK=NONE), sem bloquear escritas na tabela.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+NOTIFICATION_INDEXES = {
+    "ix_notifications_inbox": "recipient_id, is_deleted, created_at, id",
+    "ix_notifications_unread": "recipient_id, is_read, is_deleted, created_at",
+    "ix_notifications_group": "recipient_id, notification_type, post_id",
+    "ix_notifications_retention": "is_deleted, is_read, created_at",
+}
+
+def add_notification_indexes():
+    """Cria os índices que ainda não existem na tabela notifications"""
+    db = SessionLocal()
+
+    try:
+        for index_name, columns in NOTIFICATION_INDEXES.items():
+            result = db.execute(text("""
+                SELECT COUNT(*) as count
+                FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'notifications'
+                AND INDEX_NAME = :index_name
+            """), {"index_name": index_name}).fetchone()
+
+            if result.count > 0:
+                print(f"✅ Índice {index_name} já existe")
+                continue
+
+            print(f"➕ Criando índice {index_name} ({columns})...")
+            db.execute(text(
+                f"ALTER TABLE notifications ADD INDEX {index_name} ({columns}), "
+                f"ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+            print(f"✅ Índice {index_name} criado")
+
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração dos índices de notificações")
+    print("=" * 60)
+
+    if add_notification_indexes():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
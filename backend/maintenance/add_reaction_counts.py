@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar as reações em comentários e os contadores por tipo
+
+Etapas:
+1. cria a tabela comment_reactions (ou, se ela já existia pelo script.py,
+   remove duplicatas e cria o índice único (comment_id, user_id));
+2. adiciona reaction_counts (JSON) em posts e comments;
+3. recalcula reactions_count e reaction_counts a partir das reações.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import inspect, text
+
+from models import CommentReaction
+
+# tabela com o contador -> (tabela de reações, coluna que aponta para a tabela)
+REACTION_SOURCES = {
+    "posts": ("reactions", "post_id"),
+    "comments": ("comment_reactions", "comment_id"),
+}
+
+def column_exists(db, table_name, column_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND COLUMN_NAME = :column_name
+    """), {"table_name": table_name, "column_name": column_name}).fetchone()
+    return result.count > 0
+
+def index_exists(db, table_name, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_reaction_counts():
+    """Cria comment_reactions, adiciona reaction_counts e recalcula os contadores"""
+    db = SessionLocal()
+
+    try:
+        if inspect(db.get_bind()).has_table("comment_reactions"):
+            print("✅ Tabela comment_reactions já existe")
+            if not index_exists(db, "comment_reactions", "uq_comment_reactions_comment_user"):
+                # Fica a reação mais recente de cada usuário
+                result = db.execute(text("""
+                    DELETE t FROM comment_reactions t
+                    JOIN comment_reactions k
+                      ON k.comment_id = t.comment_id AND k.user_id = t.user_id AND k.id > t.id
+                """))
+                if result.rowcount:
+                    print(f"🗑️ {result.rowcount} reações duplicadas removidas")
+                print("➕ Criando índice uq_comment_reactions_comment_user...")
+                db.execute(text(
+                    "ALTER TABLE comment_reactions ADD UNIQUE INDEX uq_comment_reactions_comment_user "
+                    "(comment_id, user_id), ALGORITHM=INPLACE, LOCK=NONE"
+                ))
+        else:
+            print("➕ Criando tabela comment_reactions...")
+            CommentReaction.__table__.create(bind=db.get_bind())
+
+        for table_name, (reaction_table, key_column) in REACTION_SOURCES.items():
+            if column_exists(db, table_name, "reaction_counts"):
+                print(f"✅ Coluna {table_name}.reaction_counts já existe")
+            else:
+                print(f"➕ Adicionando coluna {table_name}.reaction_counts...")
+                db.execute(text(f"ALTER TABLE {table_name} ADD COLUMN reaction_counts JSON NULL"))
+
+            print(f"🔄 Recalculando reações de {table_name}...")
+            db.execute(text(f"""
+                UPDATE {table_name} t
+                LEFT JOIN (
+                    SELECT {key_column}, JSON_OBJECTAGG(reaction_type, total) AS counts, SUM(total) AS total
+                    FROM (
+                        SELECT {key_column}, reaction_type, COUNT(*) AS total
+                        FROM {reaction_table}
+                        GROUP BY {key_column}, reaction_type
+                    ) by_type
+                    GROUP BY {key_column}
+                ) r ON r.{key_column} = t.id
+                SET t.reaction_counts = r.counts,
+                    t.reactions_count = COALESCE(r.total, 0)
+            """))
+            db.commit()
+            print(f"✅ Reações de {table_name} recalculadas")
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração das reações por tipo")
+    print("=" * 60)
+
+    if add_reaction_counts():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Script para criar as tabelas de posts salvos e o índice de estado do usuário
+
+As tabelas eram criadas manualmente pelo script.py; aqui elas são criadas se
+ainda não existirem, e saved_posts ganha o índice (user_id, post_id) usado
+pela hidratação do estado do usuário em cada página de posts.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+from models import SavedPostCollection, SavedPost
+
+def index_exists(db, table_name, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_saved_posts():
+    """Cria as tabelas que faltam e o índice (user_id, post_id)"""
+    db = SessionLocal()
+
+    try:
+        print("➕ Criando tabelas de posts salvos (se não existirem)...")
+        SavedPostCollection.__table__.create(bind=db.get_bind(), checkfirst=True)
+        SavedPost.__table__.create(bind=db.get_bind(), checkfirst=True)
+
+        if index_exists(db, "saved_posts", "ix_saved_posts_user_post"):
+            print("✅ Índice saved_posts.ix_saved_posts_user_post já existe")
+        else:
+            print("➕ Criando índice saved_posts.ix_saved_posts_user_post...")
+            db.execute(text(
+                "ALTER TABLE saved_posts ADD INDEX ix_saved_posts_user_post (user_id, post_id), "
+                "ALGORITHM=INPLACE, LOCK=NONE"
+            ))
+            print("✅ Índice criado")
+
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração dos posts salvos")
+    print("=" * 60)
+
+    if add_saved_posts():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Script para a chave única de compartilhamentos e o contador shares_count
+
+Remove compartilhamentos duplicados (mesmo usuário e post, fica o mais
+antigo), troca o índice ix_shares_post_user pela chave única
+uq_shares_post_user, adiciona a coluna content e o índice
+(user_id, created_at) usado pelo feed, e recalcula posts.shares_count.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+def column_exists(db, table_name, column_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND COLUMN_NAME = :column_name
+    """), {"table_name": table_name, "column_name": column_name}).fetchone()
+    return result.count > 0
+
+def index_exists(db, table_name, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_share_constraints():
+    """Deduplica, cria a chave única e os índices e recalcula shares_count"""
+    db = SessionLocal()
+
+    try:
+        if column_exists(db, "shares", "content"):
+            print("✅ Coluna shares.content já existe")
+        else:
+            print("➕ Adicionando coluna shares.content...")
+            db.execute(text("ALTER TABLE shares ADD COLUMN content TEXT NULL, ALGORITHM=INPLACE, LOCK=NONE"))
+            print("✅ Coluna adicionada")
+
+        print("🔍 Procurando compartilhamentos duplicados...")
+        duplicate_ids = [row.id for row in db.execute(text("""
+            SELECT s.id
+            FROM shares s
+            JOIN shares k
+              ON k.post_id = s.post_id
+             AND k.user_id = s.user_id
+             AND k.id < s.id
+        """))]
+
+        if duplicate_ids:
+            print(f"🗑️ Removendo {len(duplicate_ids)} compartilhamentos duplicados...")
+            for start in range(0, len(duplicate_ids), 1000):
+                batch = duplicate_ids[start:start + 1000]
+                params = {f"id_{i}": share_id for i, share_id in enumerate(batch)}
+                placeholders = ", ".join(f":{name}" for name in params)
+                db.execute(text(f"DELETE FROM shares WHERE id IN ({placeholders})"), params)
+                db.commit()
+            print("✅ Duplicados removidos")
+        else:
+            print("✅ Nenhum compartilhamento duplicado")
+
+        for index_name, definition in (
+            ("uq_shares_post_user", "UNIQUE INDEX uq_shares_post_user (post_id, user_id)"),
+            ("ix_shares_user_created", "INDEX ix_shares_user_created (user_id, created_at)"),
+        ):
+            if index_exists(db, "shares", index_name):
+                print(f"✅ Índice {index_name} já existe")
+                continue
+            print(f"➕ Criando índice {index_name}...")
+            db.execute(text(f"ALTER TABLE shares ADD {definition}, ALGORITHM=INPLACE, LOCK=NONE"))
+            print(f"✅ Índice {index_name} criado")
+
+        # A chave única cobre as mesmas consultas
+        if index_exists(db, "shares", "ix_shares_post_user"):
+            print("🗑️ Removendo índice redundante ix_shares_post_user...")
+            db.execute(text("ALTER TABLE shares DROP INDEX ix_shares_post_user, ALGORITHM=INPLACE, LOCK=NONE"))
+
+        print("🔄 Recalculando posts.shares_count...")
+        result = db.execute(text("""
+            UPDATE posts p
+            LEFT JOIN (
+                SELECT post_id, COUNT(*) AS total
+                FROM shares
+                GROUP BY post_id
+            ) s ON s.post_id = p.id
+            SET p.shares_count = COALESCE(s.total, 0)
+            WHERE COALESCE(p.shares_count, -1) <> COALESCE(s.total, 0)
+        """))
+        print(f"✅ {result.rowcount} posts corrigidos")
+
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração dos compartilhamentos")
+    print("=" * 60)
+
+    if add_share_constraints():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
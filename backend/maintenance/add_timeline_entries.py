@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Script para criar a tabela de timelines do feed
+
+timeline_entries guarda, por usuário, os posts do feed gravados na
+publicação (ver utils/timeline.py). A tabela começa vazia: cada timeline é
+preenchida na primeira leitura do feed e depois mantida pelo fan-out.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+
+from models import TimelineEntry
+
+def add_timeline_entries():
+    """Cria a tabela timeline_entries (com seus índices) se não existir"""
+    db = SessionLocal()
+
+    try:
+        print("➕ Criando tabela timeline_entries (se não existir)...")
+        TimelineEntry.__table__.create(bind=db.get_bind(), checkfirst=True)
+        print("✅ Tabela pronta")
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração das timelines do feed")
+    print("=" * 60)
+
+    if add_timeline_entries():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar as lápides da exclusão em cascata
+
+Adiciona deleted_at (com índice) em posts, stories e users: as rotas de
+exclusão só gravam a lápide e o worker de utils/cascade_deletion.py remove os
+dependentes em segundo plano. Também cria o índice de notifications.story_id,
+usado para apagar as notificações de uma story. Colunas e índices são criados
+online (ALGORITHM=INPLACE, LOCK=NONE).
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+# tabela -> índice da lápide
+TOMBSTONE_TABLES = {
+    "posts": "ix_posts_deleted",
+    "stories": "ix_stories_deleted",
+    "users": "ix_users_deleted",
+}
+
+def column_exists(db, table_name, column_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND COLUMN_NAME = :column_name
+    """), {"table_name": table_name, "column_name": column_name}).fetchone()
+    return result.count > 0
+
+def index_exists(db, table_name, index_name):
+    result = db.execute(text("""
+        SELECT COUNT(*) as count
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = :table_name
+        AND INDEX_NAME = :index_name
+    """), {"table_name": table_name, "index_name": index_name}).fetchone()
+    return result.count > 0
+
+def add_index(db, table_name, index_name, columns):
+    if index_exists(db, table_name, index_name):
+        print(f"✅ Índice {index_name} já existe")
+        return
+    print(f"➕ Criando índice {index_name}...")
+    db.execute(text(
+        f"ALTER TABLE {table_name} ADD INDEX {index_name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE"
+    ))
+
+def add_tombstones():
+    """Adiciona deleted_at em posts, stories e users e o índice de notifications.story_id"""
+    db = SessionLocal()
+
+    try:
+        for table_name, index_name in TOMBSTONE_TABLES.items():
+            if column_exists(db, table_name, "deleted_at"):
+                print(f"✅ Coluna {table_name}.deleted_at já existe")
+            else:
+                print(f"➕ Adicionando coluna {table_name}.deleted_at...")
+                db.execute(text(
+                    f"ALTER TABLE {table_name} ADD COLUMN deleted_at DATETIME NULL, ALGORITHM=INPLACE, LOCK=NONE"
+                ))
+            add_index(db, table_name, index_name, "deleted_at")
+
+        add_index(db, "notifications", "ix_notifications_story", "story_id")
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração das lápides de exclusão")
+    print("=" * 60)
+
+    if add_tombstones():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
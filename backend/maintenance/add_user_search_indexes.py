@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Script para adicionar os índices de busca da tabela users
+
+Cria o índice FULLTEXT usado pela busca e pelo typeahead de usuários e o
+índice B-tree de nome usado na busca por prefixo. Índices FULLTEXT do InnoDB
+são criados com ALGORITHM=INPLACE, mas não aceitam LOCK=NONE: escritas em
+users ficam bloqueadas enquanto o índice é construído.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import text
+
+USER_SEARCH_INDEXES = {
+    "ft_users_search": ("FULLTEXT INDEX", "first_name, last_name, username, bio", "ALGORITHM=INPLACE"),
+    "ix_users_name": ("INDEX", "first_name, last_name", "ALGORITHM=INPLACE, LOCK=NONE"),
+}
+
+def add_user_search_indexes():
+    """Cria os índices que ainda não existem na tabela users"""
+    db = SessionLocal()
+
+    try:
+        for index_name, (index_type, columns, algorithm) in USER_SEARCH_INDEXES.items():
+            result = db.execute(text("""
+                SELECT COUNT(*) as count
+                FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'users'
+                AND INDEX_NAME = :index_name
+            """), {"index_name": index_name}).fetchone()
+
+            if result.count > 0:
+                print(f"✅ Índice {index_name} já existe")
+                continue
+
+            print(f"➕ Criando índice {index_name} ({columns})...")
+            db.execute(text(
+                f"ALTER TABLE users ADD {index_type} {index_name} ({columns}), {algorithm}"
+            ))
+            print(f"✅ Índice {index_name} criado")
+
+        db.commit()
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro durante a migração: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Iniciando migração dos índices de busca de usuários")
+    print("=" * 60)
+
+    if add_user_search_indexes():
+        print("\n🎉 Migração concluída com sucesso!")
+    else:
+        print("\n❌ Falha na migração")
+        sys.exit(1)
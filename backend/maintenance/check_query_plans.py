@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Verificação dos planos de execução das consultas mais frequentes
+
+Roda EXPLAIN (MySQL) nas consultas quentes das rotas, montadas com os mesmos
+filtros e ordenações usados em backend/routes, e falha (exit 1) se alguma
+delas só puder ser atendida por varredura completa: type = ALL sem nenhum
+índice candidato (possible_keys vazio).
+
+Varredura completa com índice candidato só gera aviso: em tabelas pequenas o
+otimizador prefere ler a tabela inteira. Para um resultado representativo,
+rode contra um banco com volume de produção (ex.: staging).
+
+Uso: python maintenance/check_query_plans.py
+"""
+import sys
+import os
+from datetime import datetime
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.database import SessionLocal
+from sqlalchemy import and_, desc, func, select
+
+from models import (
+    Notification, Post, Reaction, Comment, Share, Story, StoryView,
+    Friendship, Follow, Block, Conversation, Message, TimelineEntry
+)
+
+SAMPLE_USER_ID = 1
+SAMPLE_OTHER_ID = 2
+SAMPLE_POST_ID = 1
+SAMPLE_STORY_ID = 1
+SAMPLE_COMMENT_ID = 1
+SAMPLE_CONVERSATION_ID = 1
+
+def hot_queries():
+    """(nome, statement) das consultas que não podem varrer a tabela inteira"""
+    now = datetime.utcnow()
+    return [
+        ("notificações: caixa de entrada", select(Notification.id).where(
+            Notification.recipient_id == SAMPLE_USER_ID,
+            Notification.is_deleted == False
+        ).order_by(desc(Notification.created_at), desc(Notification.id)).limit(20)),
+        ("notificações: não lidas", select(func.count(Notification.id)).where(
+            Notification.recipient_id == SAMPLE_USER_ID,
+            Notification.is_read == False,
+            Notification.is_deleted == False
+        )),
+        ("posts de um usuário", select(Post.id).where(
+            Post.author_id == SAMPLE_USER_ID,
+            Post.post_type == "post"
+        ).order_by(desc(Post.created_at)).limit(50)),
+        ("contagem de posts de um usuário", select(func.count()).where(Post.author_id == SAMPLE_USER_ID)),
+        ("reação de um usuário num post", select(Reaction.id).where(
+            Reaction.post_id == SAMPLE_POST_ID,
+            Reaction.user_id == SAMPLE_USER_ID
+        )),
+        ("comentários de um post", select(Comment.id).where(
+            Comment.post_id == SAMPLE_POST_ID
+        ).order_by(Comment.created_at)),
+        ("comentários de primeiro nível", select(Comment.id).where(
+            Comment.post_id == SAMPLE_POST_ID,
+            Comment.parent_id.is_(None)
+        ).order_by(Comment.id).limit(20)),
+        ("respostas de um comentário", select(Comment.id).where(
+            Comment.parent_id == SAMPLE_COMMENT_ID
+        ).order_by(Comment.id).limit(20)),
+        ("compartilhamentos de um post", select(func.count()).where(Share.post_id == SAMPLE_POST_ID)),
+        ("compartilhamentos recentes para o feed", select(Share.post_id).where(
+            Share.user_id.in_([SAMPLE_USER_ID, SAMPLE_OTHER_ID])
+        ).order_by(desc(Share.created_at)).limit(200)),
+        ("timeline de um usuário", select(TimelineEntry.post_id).where(
+            TimelineEntry.user_id == SAMPLE_USER_ID
+        ).order_by(desc(TimelineEntry.created_at)).limit(50)),
+        ("stories ativas", select(Story.id).where(
+            and_(Story.expires_at > now, Story.archived == False)
+        )),
+        ("visualização de story", select(StoryView.id).where(
+            StoryView.story_id == SAMPLE_STORY_ID,
+            StoryView.viewer_id == SAMPLE_USER_ID
+        )),
+        ("amizade entre dois usuários", select(Friendship.id).where(
+            Friendship.between(SAMPLE_USER_ID, SAMPLE_OTHER_ID)
+        )),
+        ("amizades enviadas", select(Friendship.addressee_id).where(
+            Friendship.requester_id == SAMPLE_USER_ID,
+            Friendship.status == "accepted"
+        )),
+        ("amizades recebidas", select(Friendship.requester_id).where(
+            Friendship.addressee_id == SAMPLE_USER_ID,
+            Friendship.status == "accepted"
+        )),
+        ("seguidores", select(Follow.follower_id).where(Follow.followed_id == SAMPLE_USER_ID)),
+        ("seguindo", select(Follow.followed_id).where(Follow.follower_id == SAMPLE_USER_ID)),
+        ("bloqueios feitos", select(Block.blocked_id).where(Block.blocker_id == SAMPLE_USER_ID)),
+        ("bloqueios recebidos", select(Block.blocker_id).where(Block.blocked_id == SAMPLE_USER_ID)),
+        ("conversas (lado menor)", select(Conversation.id).where(
+            Conversation.user_low_id == SAMPLE_USER_ID
+        ).order_by(desc(Conversation.last_message_at)).limit(30)),
+        ("conversas (lado maior)", select(Conversation.id).where(
+            Conversation.user_high_id == SAMPLE_USER_ID
+        ).order_by(desc(Conversation.last_message_at)).limit(30)),
+        ("histórico de uma conversa", select(Message.id).where(
+            Message.conversation_id == SAMPLE_CONVERSATION_ID
+        ).order_by(desc(Message.id)).limit(50)),
+        ("lápides de posts", select(Post.id).where(Post.deleted_at.isnot(None)).order_by(Post.deleted_at).limit(100)),
+        ("lápides de stories", select(Story.id).where(Story.deleted_at.isnot(None)).order_by(Story.deleted_at).limit(100)),
+        ("notificações de uma story", select(Notification.id).where(
+            Notification.story_id == SAMPLE_STORY_ID
+        ).limit(500)),
+    ]
+
+def explain(db, statement):
+    """Linhas do EXPLAIN de um statement, como dicionários"""
+    compiled = statement.compile(dialect=db.bind.dialect)
+    result = db.connection().exec_driver_sql(f"EXPLAIN {compiled}", compiled.params)
+    return [dict(row._mapping) for row in result]
+
+def check_query_plans():
+    """Retorna True se nenhuma consulta quente depende de varredura completa"""
+    db = SessionLocal()
+    failures = []
+
+    try:
+        if db.bind.dialect.name != "mysql":
+            print("⚠️ EXPLAIN só é verificado no MySQL")
+            return True
+
+        for name, statement in hot_queries():
+            for row in explain(db, statement):
+                table = row.get("table")
+                scan_type = row.get("type")
+                if scan_type == "ALL" and not row.get("possible_keys"):
+                    failures.append(name)
+                    print(f"❌ {name}: varredura completa de {table} sem índice candidato")
+                elif scan_type == "ALL":
+                    print(f"⚠️ {name}: otimizador escolheu varredura completa de {table} "
+                          f"(índices candidatos: {row.get('possible_keys')})")
+                else:
+                    print(f"✅ {name}: {table} via {row.get('key')} ({scan_type})")
+
+        return not failures
+
+    except Exception as e:
+        print(f"❌ Erro ao verificar os planos: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🔍 Verificando planos de execução das consultas frequentes")
+    print("=" * 60)
+
+    if check_query_plans():
+        print("\n🎉 Nenhuma consulta quente depende de varredura completa")
+    else:
+        print("\n❌ Há consultas quentes sem índice utilizável")
+        sys.exit(1)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Aplicar e consultar as migrações versionadas do schema
+
+Uso:
+    python maintenance/migrate.py status        # versão atual e pendentes
+    python maintenance/migrate.py upgrade [N]   # aplicar pendentes (até N)
+    python maintenance/migrate.py stamp N       # marcar até N como aplicadas
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.migrations import current_version, latest_version, pending_migrations, stamp, upgrade
+
+def show_status():
+    print(f"📊 Versão atual: {current_version()} / última: {latest_version()}")
+    for module in pending_migrations():
+        print(f"   ⏳ {module.VERSION:03d}: {module.DESCRIPTION}")
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    argument = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    try:
+        if command == "status":
+            show_status()
+        elif command == "upgrade":
+            print("🚀 Aplicando migrações do schema")
+            print("=" * 60)
+            version = upgrade(argument)
+            print(f"\n🎉 Schema na versão {version}")
+        elif command == "stamp" and argument is not None:
+            stamp(argument)
+            print(f"✅ Migrações até {argument} marcadas como aplicadas")
+        else:
+            print(__doc__)
+            sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Falha na migração: {e}")
+        sys.exit(1)
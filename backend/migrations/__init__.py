@@ -0,0 +1,3 @@
+"""
+Migrações versionadas do schema (ver core/migrations.py)
+"""
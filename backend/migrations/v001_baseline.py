@@ -0,0 +1,11 @@
+"""
+Schema base: cria as tabelas declaradas nos modelos que ainda não existem
+"""
+from core.database import engine, Base
+import models  # noqa: F401 - registra todos os modelos no metadata
+
+VERSION = 1
+DESCRIPTION = "Schema base (tabelas dos modelos)"
+
+def upgrade():
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,11 @@
+"""
+Campo onboarding_completed em users
+"""
+from maintenance.add_onboarding_field import add_onboarding_field
+
+VERSION = 2
+DESCRIPTION = "Campo onboarding_completed em users"
+
+def upgrade():
+    if not add_onboarding_field():
+        raise RuntimeError("Falha ao adicionar onboarding_completed")
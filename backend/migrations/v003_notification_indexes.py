@@ -0,0 +1,11 @@
+"""
+Índices compostos da tabela notifications
+"""
+from maintenance.add_notification_indexes import add_notification_indexes
+
+VERSION = 3
+DESCRIPTION = "Índices compostos de notifications"
+
+def upgrade():
+    if not add_notification_indexes():
+        raise RuntimeError("Falha ao criar os índices de notifications")
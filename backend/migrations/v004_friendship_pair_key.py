@@ -0,0 +1,11 @@
+"""
+Par canônico (user_low_id, user_high_id) em friendships
+"""
+from maintenance.add_friendship_pair_key import add_friendship_pair_key
+
+VERSION = 4
+DESCRIPTION = "Par canônico e índices de friendships"
+
+def upgrade():
+    if not add_friendship_pair_key():
+        raise RuntimeError("Falha ao adicionar o par canônico de friendships")
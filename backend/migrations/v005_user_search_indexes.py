@@ -0,0 +1,11 @@
+"""
+Índices de busca da tabela users
+"""
+from maintenance.add_user_search_indexes import add_user_search_indexes
+
+VERSION = 5
+DESCRIPTION = "Índices FULLTEXT e de nome em users"
+
+def upgrade():
+    if not add_user_search_indexes():
+        raise RuntimeError("Falha ao criar os índices de busca de users")
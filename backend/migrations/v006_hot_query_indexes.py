@@ -0,0 +1,11 @@
+"""
+Índices das consultas mais frequentes
+"""
+from maintenance.add_hot_query_indexes import add_hot_query_indexes
+
+VERSION = 6
+DESCRIPTION = "Índices de posts, reações, comentários, stories, follows e blocks"
+
+def upgrade():
+    if not add_hot_query_indexes():
+        raise RuntimeError("Falha ao criar os índices de consultas frequentes")
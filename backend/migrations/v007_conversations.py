@@ -0,0 +1,11 @@
+"""
+Tabela conversations e messages.conversation_id
+"""
+from maintenance.add_conversations import add_conversations
+
+VERSION = 7
+DESCRIPTION = "Conversas de mensagens diretas (última mensagem e não lidas desnormalizadas)"
+
+def upgrade():
+    if not add_conversations():
+        raise RuntimeError("Falha ao criar as conversas de mensagens")
@@ -0,0 +1,11 @@
+"""
+Contadores desnormalizados e índices da árvore de comentários
+"""
+from maintenance.add_comment_counters import add_comment_counters
+
+VERSION = 8
+DESCRIPTION = "replies_count/reactions_count em comments e índices de thread"
+
+def upgrade():
+    if not add_comment_counters():
+        raise RuntimeError("Falha ao preparar a árvore de comentários")
@@ -0,0 +1,11 @@
+"""
+Reações em comentários e contadores de reações por tipo
+"""
+from maintenance.add_reaction_counts import add_reaction_counts
+
+VERSION = 9
+DESCRIPTION = "Tabela comment_reactions e reaction_counts (JSON) em posts e comments"
+
+def upgrade():
+    if not add_reaction_counts():
+        raise RuntimeError("Falha ao criar os contadores de reações por tipo")
@@ -0,0 +1,11 @@
+"""
+Tabelas de posts salvos e índice (user_id, post_id)
+"""
+from maintenance.add_saved_posts import add_saved_posts
+
+VERSION = 10
+DESCRIPTION = "Tabelas saved_post_collections/saved_posts e índice de estado do usuário"
+
+def upgrade():
+    if not add_saved_posts():
+        raise RuntimeError("Falha ao criar as tabelas de posts salvos")
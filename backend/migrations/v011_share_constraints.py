@@ -0,0 +1,11 @@
+"""
+Chave única de compartilhamentos, índice do feed e recálculo de shares_count
+"""
+from maintenance.add_share_constraints import add_share_constraints
+
+VERSION = 11
+DESCRIPTION = "Chave única (post_id, user_id) em shares, coluna content e índice (user_id, created_at)"
+
+def upgrade():
+    if not add_share_constraints():
+        raise RuntimeError("Falha ao migrar os compartilhamentos")
@@ -0,0 +1,11 @@
+"""
+Tabela de timelines do feed (fan-out na escrita)
+"""
+from maintenance.add_timeline_entries import add_timeline_entries
+
+VERSION = 12
+DESCRIPTION = "Tabela timeline_entries com índices (user_id, created_at) e (post_id, actor_id)"
+
+def upgrade():
+    if not add_timeline_entries():
+        raise RuntimeError("Falha ao criar a tabela timeline_entries")
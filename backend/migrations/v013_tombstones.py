@@ -0,0 +1,11 @@
+"""
+Lápides da exclusão em cascata de posts, stories e contas
+"""
+from maintenance.add_tombstones import add_tombstones
+
+VERSION = 13
+DESCRIPTION = "Colunas deleted_at (com índice) em posts, stories e users e índice de notifications.story_id"
+
+def upgrade():
+    if not add_tombstones():
+        raise RuntimeError("Falha ao adicionar as lápides de exclusão")
@@ -0,0 +1,11 @@
+"""
+Data de exclusão das notificações (expurgo pela data da exclusão)
+"""
+from maintenance.add_notification_deleted_at import add_notification_deleted_at
+
+VERSION = 14
+DESCRIPTION = "Coluna notifications.deleted_at com índice (is_deleted, deleted_at)"
+
+def upgrade():
+    if not add_notification_deleted_at():
+        raise RuntimeError("Falha ao adicionar notifications.deleted_at")
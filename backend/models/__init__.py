@@ -1,18 +1,18 @@
 """
 Modelos do banco de dados
 """
-from .user import User
-from .post import Post, Reaction, Comment, Share
+from .user import User, UserStats
+from .post import Post, Reaction, Comment, CommentReaction, Share, SavedPostCollection, SavedPost, TimelineEntry
 from .story import Story, StoryView, StoryTag, StoryOverlay
 from .friendship import Friendship, Block, Follow
-from .notification import Notification, NotificationType, Message, MediaFile
+from .notification import Notification, NotificationType, NotificationArchive, Conversation, Message, MediaFile
 from .report import Report, ReportType, ReportStatus
 
 __all__ = [
-    "User",
-    "Post", "Reaction", "Comment", "Share",
+    "User", "UserStats",
+    "Post", "Reaction", "Comment", "CommentReaction", "Share", "SavedPostCollection", "SavedPost", "TimelineEntry",
     "Story", "StoryView", "StoryTag", "StoryOverlay",
     "Friendship", "Block", "Follow",
-    "Notification", "NotificationType", "Message", "MediaFile",
+    "Notification", "NotificationType", "NotificationArchive", "Conversation", "Message", "MediaFile",
     "Report", "ReportType", "ReportStatus"
 ]
@@ -1,18 +0,0 @@
-"""
-Block model for user blocking functionality
-"""
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
-from datetime import datetime
-from .base import Base
-
-class Block(Base):
-    __tablename__ = "blocks"
-
-    id = Column(Integer, primary_key=True, index=True)
-    blocker_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    blocked_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-    blocker = relationship("User", foreign_keys=[blocker_id], backref="blocked_users")
-    blocked = relationship("User", foreign_keys=[blocked_id], backref="blocked_by")
@@ -1,18 +0,0 @@
-"""
-Follow model for user following functionality
-"""
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
-from datetime import datetime
-from .base import Base
-
-class Follow(Base):
-    __tablename__ = "follows"
-
-    id = Column(Integer, primary_key=True, index=True)
-    follower_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    followed_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-    follower = relationship("User", foreign_keys=[follower_id], backref="following")
-    followed = relationship("User", foreign_keys=[followed_id], backref="followers")
@@ -1,17 +1,27 @@
 """
 Modelos de relacionamentos entre usuários
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint, and_
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
 
 class Friendship(Base):
     __tablename__ = "friendships"
+    __table_args__ = (
+        # Um único registro por par de usuários, em qualquer sentido
+        UniqueConstraint("user_low_id", "user_high_id", name="uq_friendships_pair"),
+        # Listagens por usuário (cobrem status e o outro lado da amizade)
+        Index("ix_friendships_requester", "requester_id", "status", "addressee_id"),
+        Index("ix_friendships_addressee", "addressee_id", "status", "requester_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     requester_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     addressee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Par canônico (menor id, maior id), preenchido a partir de requester/addressee
+    user_low_id = Column(Integer, nullable=False)
+    user_high_id = Column(Integer, nullable=False)
     status = Column(String(20), default="pending")  # pending, accepted, rejected
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
@@ -19,8 +29,28 @@ class Friendship(Base):
     requester = relationship("User", foreign_keys=[requester_id])
     addressee = relationship("User", foreign_keys=[addressee_id])
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.requester_id is not None and self.addressee_id is not None:
+            self.user_low_id, self.user_high_id = self.pair_key(self.requester_id, self.addressee_id)
+
+    @staticmethod
+    def pair_key(user_id: int, other_id: int):
+        """Par canônico (menor id, maior id)"""
+        return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+    @classmethod
+    def between(cls, user_id: int, other_id: int):
+        """Filtro pela amizade entre dois usuários (busca única no índice do par)"""
+        low_id, high_id = cls.pair_key(user_id, other_id)
+        return and_(cls.user_low_id == low_id, cls.user_high_id == high_id)
+
 class Block(Base):
     __tablename__ = "blocks"
+    __table_args__ = (
+        UniqueConstraint("blocker_id", "blocked_id", name="uq_blocks_pair"),
+        Index("ix_blocks_blocked", "blocked_id", "blocker_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     blocker_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -32,6 +62,10 @@ class Block(Base):
 
 class Follow(Base):
     __tablename__ = "follows"
+    __table_args__ = (
+        UniqueConstraint("follower_id", "followed_id", name="uq_follows_pair"),
+        Index("ix_follows_followed", "followed_id", "follower_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     follower_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,7 +1,7 @@
 """
 Modelos de notificações e mensagens
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, Index, UniqueConstraint, and_
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -41,6 +41,20 @@ class NotificationType(enum.Enum):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Caixa de entrada: WHERE recipient_id, is_deleted ORDER BY created_at, id (keyset)
+        Index("ix_notifications_inbox", "recipient_id", "is_deleted", "created_at", "id"),
+        # Não lidas: badge e filtro unread_only
+        Index("ix_notifications_unread", "recipient_id", "is_read", "is_deleted", "created_at"),
+        # Reabertura de grupos do agregador: (recipient_id, notification_type, post_id)
+        Index("ix_notifications_group", "recipient_id", "notification_type", "post_id"),
+        # Job de retenção: apagadas / lidas antigas por created_at
+        Index("ix_notifications_retention", "is_deleted", "is_read", "created_at"),
+        # Expurgo das apagadas pela data da exclusão
+        Index("ix_notifications_deleted", "is_deleted", "deleted_at"),
+        # Exclusão em cascata de stories (story_id não tem FK nem outro índice)
+        Index("ix_notifications_story", "story_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     recipient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -62,6 +76,7 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     is_clicked = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False)
+    deleted_at = Column(DateTime, nullable=True)  # quando foi apagada pelo usuário
 
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -74,10 +89,97 @@ class Notification(Base):
     post = relationship("Post", foreign_keys=[post_id], backref="notifications")
     friendship = relationship("Friendship", foreign_keys=[friendship_id], backref="notifications")
 
+class NotificationArchive(Base):
+    """Notificações lidas antigas movidas pelo job de retenção
+
+    Sem chaves estrangeiras e com created_at na chave primária, para que a
+    tabela possa ser particionada por RANGE(created_at) se crescer demais.
+    """
+    __tablename__ = "notifications_archive"
+    __table_args__ = (
+        Index("ix_notifications_archive_recipient", "recipient_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime, primary_key=True)
+    recipient_id = Column(Integer, nullable=False)
+    sender_id = Column(Integer)
+    notification_type = Column(Enum(NotificationType), nullable=False)
+    title = Column(String(200), nullable=False)
+    message = Column(Text, nullable=False)
+    post_id = Column(Integer, nullable=True)
+    comment_id = Column(Integer, nullable=True)
+    story_id = Column(Integer, nullable=True)
+    friendship_id = Column(Integer, nullable=True)
+    data = Column(Text)
+    is_clicked = Column(Boolean, default=False)
+    read_at = Column(DateTime, nullable=True)
+    clicked_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class Conversation(Base):
+    """Conversa privada entre dois usuários
+
+    Guarda, desnormalizados, a última mensagem e, para cada lado do par, o
+    número de mensagens não lidas e até qual mensagem já leu. A lista de
+    conversas lê só esta tabela.
+    """
+    __tablename__ = "conversations"
+    __table_args__ = (
+        # Uma única conversa por par de usuários
+        UniqueConstraint("user_low_id", "user_high_id", name="uq_conversations_pair"),
+        # Lista de conversas de cada lado, mais recentes primeiro
+        Index("ix_conversations_low_recent", "user_low_id", "last_message_at"),
+        Index("ix_conversations_high_recent", "user_high_id", "last_message_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Par canônico (menor id, maior id)
+    user_low_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_high_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Última mensagem
+    last_message_id = Column(Integer, nullable=True)
+    last_sender_id = Column(Integer, nullable=True)
+    last_message_preview = Column(String(200), nullable=True)
+    last_message_type = Column(String(20), nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+
+    # Estado de leitura de cada lado
+    low_unread_count = Column(Integer, default=0, nullable=False)
+    high_unread_count = Column(Integer, default=0, nullable=False)
+    low_last_read_id = Column(Integer, default=0, nullable=False)
+    high_last_read_id = Column(Integer, default=0, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def pair_key(user_id: int, other_id: int):
+        """Par canônico (menor id, maior id)"""
+        return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+    @classmethod
+    def between(cls, user_id: int, other_id: int):
+        """Filtro pela conversa entre dois usuários (busca única no índice do par)"""
+        low_id, high_id = cls.pair_key(user_id, other_id)
+        return and_(cls.user_low_id == low_id, cls.user_high_id == high_id)
+
+    def side(self, user_id: int) -> str:
+        """Prefixo das colunas do lado do usuário ("low" ou "high")"""
+        return "low" if self.user_low_id == user_id else "high"
+
+    def other_user_id(self, user_id: int) -> int:
+        return self.user_high_id if self.user_low_id == user_id else self.user_low_id
+
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Histórico da conversa paginado por id (keyset)
+        Index("ix_messages_conversation", "conversation_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     recipient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text)
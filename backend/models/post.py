@@ -1,13 +1,21 @@
 """
 Modelos relacionados a posts
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, UniqueConstraint, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Posts/depoimentos de um usuário: WHERE author_id, post_type ORDER BY created_at
+        Index("ix_posts_author_type_created", "author_id", "post_type", "created_at"),
+        # Feed global ordenado por data
+        Index("ix_posts_created", "created_at"),
+        # Lápides aguardando a exclusão em cascata (ver utils/cascade_deletion.py)
+        Index("ix_posts_deleted", "deleted_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -19,15 +27,23 @@ class Post(Base):
     privacy = Column(String(20), default="public")  # public, friends, private
     created_at = Column(DateTime, default=datetime.utcnow)
     reactions_count = Column(Integer, default=0)
+    # Reações por tipo ({"like": 3, "love": 1}), atualizadas com JSON_SET (ver utils/reactions.py)
+    reaction_counts = Column(JSON, nullable=True)
     comments_count = Column(Integer, default=0)
     shares_count = Column(Integer, default=0)
     is_profile_update = Column(Boolean, default=False)
     is_cover_update = Column(Boolean, default=False)
+    # Lápide: o post já saiu do ar e aguarda a remoção em segundo plano
+    deleted_at = Column(DateTime, nullable=True)
     
     author = relationship("User", backref="posts")
 
 class Reaction(Base):
     __tablename__ = "reactions"
+    __table_args__ = (
+        # Uma reação por usuário e post; também serve a contagem por post
+        UniqueConstraint("post_id", "user_id", name="uq_reactions_post_user"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -41,6 +57,14 @@ class Reaction(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Comentários de um post em ordem cronológica
+        Index("ix_comments_post_created", "post_id", "created_at"),
+        # Comentários de primeiro nível de um post (keyset por id)
+        Index("ix_comments_post_thread", "post_id", "parent_id", "id"),
+        # Respostas de um comentário (keyset por id)
+        Index("ix_comments_parent", "parent_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
@@ -48,17 +72,90 @@ class Comment(Base):
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Contadores desnormalizados
+    replies_count = Column(Integer, default=0, nullable=False)
+    reactions_count = Column(Integer, default=0, nullable=False)
+    reaction_counts = Column(JSON, nullable=True)
     
     author = relationship("User", backref="comments")
     post = relationship("Post", backref="comments")
     parent = relationship("Comment", remote_side=[id], backref="replies")
 
+class CommentReaction(Base):
+    __tablename__ = "comment_reactions"
+    __table_args__ = (
+        # Uma reação por usuário e comentário
+        UniqueConstraint("comment_id", "user_id", name="uq_comment_reactions_comment_user"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=False)
+    reaction_type = Column(String(20), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User", backref="comment_reactions")
+    comment = relationship("Comment", backref="reactions")
+
 class Share(Base):
     __tablename__ = "shares"
+    __table_args__ = (
+        # Um compartilhamento por usuário e post; também serve a contagem por post
+        UniqueConstraint("post_id", "user_id", name="uq_shares_post_user"),
+        # Compartilhamentos recentes de quem o usuário segue (feed)
+        Index("ix_shares_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    content = Column(Text, nullable=True)  # comentário de quem compartilhou
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", backref="shares")
+    post = relationship("Post")
+
+class SavedPostCollection(Base):
+    """Pastas/coleções para organizar posts salvos"""
+    __tablename__ = "saved_post_collections"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(100), nullable=False)  # Nome da pasta
+    description = Column(Text)  # Descrição opcional
+    is_default = Column(Boolean, default=False)  # Pasta padrão "Salvos"
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SavedPost(Base):
+    """Posts salvos pelo usuário"""
+    __tablename__ = "saved_posts"
+    __table_args__ = (
+        # "Salvei este post?" para uma página de posts: WHERE user_id AND post_id IN (...)
+        Index("ix_saved_posts_user_post", "user_id", "post_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    collection_id = Column(Integer, ForeignKey("saved_post_collections.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TimelineEntry(Base):
+    """Post no feed de um usuário, gravado no momento da publicação (ver utils/timeline.py)"""
+    __tablename__ = "timeline_entries"
+    __table_args__ = (
+        # Um item por post no feed de cada usuário
+        UniqueConstraint("user_id", "post_id", name="uq_timeline_entries_user_post"),
+        # Leitura do feed: WHERE user_id ORDER BY created_at DESC
+        Index("ix_timeline_entries_user_created", "user_id", "created_at"),
+        # Remoção de um post ou compartilhamento de todos os feeds
+        Index("ix_timeline_entries_post_actor", "post_id", "actor_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    actor_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # autor ou quem compartilhou
+    created_at = Column(DateTime, nullable=False)  # atividade mais recente (post ou compartilhamento)
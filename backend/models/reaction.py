@@ -1,20 +0,0 @@
-"""
-Reaction model
-"""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
-from datetime import datetime
-from core.database import Base
-
-class Reaction(Base):
-    __tablename__ = "reactions"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
-    reaction_type = Column(String(20), nullable=False)  # like, love, haha, wow, sad, angry, care, pride, grateful, celebrating
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    user = relationship("User", backref="reactions")
-    post = relationship("Post", backref="reactions")
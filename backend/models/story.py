@@ -1,13 +1,20 @@
 """
 Modelos relacionados a stories
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
 
 class Story(Base):
     __tablename__ = "stories"
+    __table_args__ = (
+        # Stories ativas: WHERE archived = false AND expires_at > agora
+        Index("ix_stories_active", "archived", "expires_at"),
+        Index("ix_stories_author_created", "author_id", "created_at"),
+        # Lápides aguardando a exclusão em cascata (ver utils/cascade_deletion.py)
+        Index("ix_stories_deleted", "deleted_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -22,11 +29,17 @@ class Story(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime)
     views_count = Column(Integer, default=0)
+    # Lápide: a story já saiu do ar e aguarda a remoção em segundo plano
+    deleted_at = Column(DateTime, nullable=True)
     
     author = relationship("User", backref="stories")
 
 class StoryView(Base):
     __tablename__ = "story_views"
+    __table_args__ = (
+        # Uma visualização por story e usuário ("já vi?" e listagem de quem viu)
+        UniqueConstraint("story_id", "viewer_id", name="uq_story_views_story_viewer"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     story_id = Column(Integer, ForeignKey("stories.id"), nullable=False)
@@ -38,6 +51,9 @@ class StoryView(Base):
 
 class StoryTag(Base):
     __tablename__ = "story_tags"
+    __table_args__ = (
+        Index("ix_story_tags_story", "story_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     story_id = Column(Integer, ForeignKey("stories.id"), nullable=False)
@@ -51,6 +67,9 @@ class StoryTag(Base):
 
 class StoryOverlay(Base):
     __tablename__ = "story_overlays"
+    __table_args__ = (
+        Index("ix_story_overlays_story", "story_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     story_id = Column(Integer, ForeignKey("stories.id"), nullable=False)
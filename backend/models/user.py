@@ -1,7 +1,7 @@
 """
 Modelo de usuário
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Date, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Date, Enum, Index, ForeignKey
 from datetime import datetime
 from core.database import Base
 import enum
@@ -14,6 +14,13 @@ class AccountStatus(enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Busca de usuários (ver utils/user_search.py)
+        Index("ft_users_search", "first_name", "last_name", "username", "bio", mysql_prefix="FULLTEXT"),
+        Index("ix_users_name", "first_name", "last_name"),
+        # Contas excluídas aguardando a remoção em cascata (ver utils/cascade_deletion.py)
+        Index("ix_users_deleted", "deleted_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     display_id = Column(String(20), unique=True, index=True)  # Random ID for URLs
@@ -61,6 +68,8 @@ class User(Base):
     account_status = Column(Enum(AccountStatus), default=AccountStatus.pending)
     account_deactivated = Column(Boolean, default=False)
     deactivated_at = Column(DateTime)
+    # Lápide da exclusão da conta (o login já fica bloqueado por is_active)
+    deleted_at = Column(DateTime, nullable=True)
 
     # Onboarding
     onboarding_completed = Column(Boolean, default=False)
@@ -69,3 +78,14 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_seen = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
+
+class UserStats(Base):
+    """Contadores do perfil, mantidos pelas rotas de escrita (ver utils/user_stats.py)"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    friends_count = Column(Integer, nullable=False, default=0)
+    posts_count = Column(Integer, nullable=False, default=0)
+    followers_count = Column(Integer, nullable=False, default=0)
+    following_count = Column(Integer, nullable=False, default=0)
+    reconciled_at = Column(DateTime, default=datetime.utcnow, index=True)
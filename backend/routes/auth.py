@@ -12,6 +12,7 @@ from core.security_middleware import security_middleware
 from core.config import ACCESS_TOKEN_EXPIRE_MINUTES
 from models import User
 from schemas import LoginRequest, Token, UserCreate, UserResponse
+from utils.identifier_index import identifier_index
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -79,8 +80,7 @@ async def register(request: Request, user: UserCreate, db: Session = Depends(get
         print(f"✅ Required fields validated")
 
         # Verifica se o usuário já existe
-        db_user = db.query(User).filter(User.email == user.email).first()
-        if db_user:
+        if identifier_index.email_exists(db, user.email):
             print(f"❌ Email already registered: {user.email}")
             raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -121,6 +121,7 @@ async def register(request: Request, user: UserCreate, db: Session = Depends(get
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        identifier_index.add_user(db_user.id, db_user.email, db_user.username)
 
         print(f"✅ User {db_user.id} created successfully!")
 
@@ -229,22 +230,17 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 @router.get("/check-email")
 def check_email_exists(email: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
-    return {"exists": user is not None}
+    return {"exists": identifier_index.email_exists(db, email)}
 
 @router.get("/check-username")
 def check_username_exists(username: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    user = db.query(User).filter(
-        User.username == username,
-        User.id != current_user.id  # Exclude current user
-    ).first()
-    return {"exists": user is not None}
+    owner_id = identifier_index.username_owner_id(db, username)
+    return {"exists": owner_id is not None and owner_id != current_user.id}  # Exclude current user
 
 @router.get("/check-username-public")
 def check_username_exists_public(username: str, db: Session = Depends(get_db)):
     """Public route to check username availability during registration"""
-    user = db.query(User).filter(User.username == username).first()
-    return {"exists": user is not None}
+    return {"exists": identifier_index.username_owner_id(db, username) is not None}
 
 @router.get("/verify-token")
 async def verify_token(current_user: User = Depends(get_current_user)):
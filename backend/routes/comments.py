@@ -0,0 +1,157 @@
+"""
+Rotas de comentários
+"""
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from core.database import get_db
+from core.security import get_current_user
+from models import User, Post, Comment, CommentReaction
+from schemas import CommentCreate, CommentResponse, CommentReactionCreate
+from routes.posts import publish_comment
+from utils.comment_tree import comment_tree
+from utils.idempotency import idempotency_cache
+from utils.notification_helpers import create_comment_reaction_notification
+from utils.reactions import reaction_counters
+from utils.visibility import visibility
+
+router = APIRouter(prefix="/comments", tags=["comments"])
+
+def visible_comment_post(db: Session, comment_id: int, viewer_id: int) -> int:
+    """post_id do comentário; 404 se ele não existe ou o post não é visível ao usuário"""
+    post_id = db.query(Comment.post_id).filter(Comment.id == comment_id).scalar()
+    if post_id is None or not visibility.post_visible(db, viewer_id, post_id):
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return post_id
+
+@router.post("/", response_model=CommentResponse)
+async def create_comment(
+    comment_data: CommentCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Criar comentário ou resposta (parent_id) no post informado no corpo"""
+    post = db.query(Post).filter(Post.id == comment_data.post_id).first()
+    if not post or not visibility.can_see_post(db, current_user.id, post):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    return await publish_comment(db, post, current_user, comment_data)
+
+@router.get("/{comment_id}/replies", response_model=List[CommentResponse])
+async def get_comment_replies(
+    comment_id: int,
+    response: Response,
+    after_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(comment_tree.PAGE_SIZE, ge=1, le=comment_tree.MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mais respostas de uma thread
+
+    Comece pelo replies_cursor do comentário e siga o header X-Next-Cursor.
+    """
+    visible_comment_post(db, comment_id, current_user.id)
+
+    replies = comment_tree.replies(db, comment_id, limit, after_id)
+    if len(replies) == limit:
+        response.headers["X-Next-Cursor"] = str(replies[-1].id)
+
+    authors = comment_tree.authors(db, replies)
+    viewer_reactions = comment_tree.viewer_reactions(db, replies, current_user.id)
+    return [comment_tree.serialize(reply, authors, viewer_reactions=viewer_reactions) for reply in replies]
+
+# Reações em comentários
+@router.post("/{comment_id}/reactions")
+async def react_to_comment(
+    comment_id: int,
+    reaction_data: CommentReactionCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Reagir a um comentário (ou trocar a reação); devolve os totais atualizados"""
+    if not reaction_counters.is_valid(reaction_data.reaction_type):
+        raise HTTPException(status_code=400, detail="Invalid reaction type")
+
+    # Só reage quem pode ver o post do comentário
+    post_id = visible_comment_post(db, comment_id, current_user.id)
+
+    scope = f"comment-reaction:{comment_id}"
+    cached = idempotency_cache.get(current_user.id, scope, idempotency_key)
+    if cached is not None:
+        return cached
+
+    result = reaction_counters.upsert(
+        db, CommentReaction, "comment_id", Comment, comment_id, current_user.id, reaction_data.reaction_type
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    previous, comment = result
+
+    if previous is None and comment.author_id != current_user.id:
+        await create_comment_reaction_notification(
+            post_id=post_id,
+            reactor=current_user,
+            comment_author_id=comment.author_id,
+            comment_id=comment_id,
+            reaction_type=reaction_data.reaction_type
+        )
+
+    response = {
+        "message": "Reaction added" if previous is None else "Reaction updated",
+        "reaction_type": reaction_data.reaction_type,
+        "previous_reaction_type": previous,
+        **reaction_counters.totals(comment)
+    }
+    idempotency_cache.store(current_user.id, scope, idempotency_key, response)
+    return response
+
+@router.delete("/{comment_id}/reactions")
+async def remove_comment_reaction(
+    comment_id: int,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Remover a reação do usuário a um comentário"""
+    scope = f"comment-reaction-delete:{comment_id}"
+    cached = idempotency_cache.get(current_user.id, scope, idempotency_key)
+    if cached is not None:
+        return cached
+
+    result = reaction_counters.remove(db, CommentReaction, "comment_id", Comment, comment_id, current_user.id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Reaction not found")
+    previous, comment = result
+
+    response = {
+        "message": "Reaction removed",
+        "previous_reaction_type": previous,
+        **reaction_counters.totals(comment)
+    }
+    idempotency_cache.store(current_user.id, scope, idempotency_key, response)
+    return response
+
+@router.get("/{comment_id}/reactions")
+async def get_comment_reaction_summary(
+    comment_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Reações do comentário por tipo e a reação do usuário atual"""
+    visible_comment_post(db, comment_id, current_user.id)
+
+    comment = db.query(Comment.id, Comment.reactions_count, Comment.reaction_counts).filter(
+        Comment.id == comment_id
+    ).first()
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    return {
+        "total": comment.reactions_count or 0,
+        "by_type": reaction_counters.summary(comment.reaction_counts),
+        "viewer_reaction": reaction_counters.viewer_reactions(
+            db, CommentReaction, CommentReaction.comment_id, [comment_id], current_user.id
+        ).get(comment_id)
+    }
@@ -2,13 +2,18 @@
 Rotas para gerenciamento de seguir/deixar de seguir
 """
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 
 from core.database import get_db
 from core.security import get_current_user
-from models import User, Follow, Block
+from models import User, Follow
 from utils.notification_helpers import create_follow_notification
+from utils.social_graph import social_graph
+from utils.friend_suggestions import friend_suggestions
+from utils.user_stats import user_stats
+from utils.timeline import timeline
 
 router = APIRouter(prefix="/follow", tags=["follow"])
 
@@ -29,21 +34,11 @@ async def follow_user(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verificar se há bloqueio entre os usuários
-    block = db.query(Block).filter(
-        ((Block.blocker_id == current_user.id) & (Block.blocked_id == user_id)) |
-        ((Block.blocker_id == user_id) & (Block.blocked_id == current_user.id))
-    ).first()
-    
-    if block:
+    if social_graph.is_blocked(db, current_user.id, user_id):
         raise HTTPException(status_code=403, detail="Cannot follow due to blocking")
     
     # Verificar se já está seguindo
-    existing_follow = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.followed_id == user_id
-    ).first()
-    
-    if existing_follow:
+    if user_id in social_graph.following(db, current_user.id):
         raise HTTPException(status_code=400, detail="Already following this user")
     
     # Criar novo follow
@@ -53,12 +48,20 @@ async def follow_user(
     )
     
     db.add(follow)
-    db.commit()
+    user_stats.adjust(db, current_user.id, following_count=1)
+    user_stats.adjust(db, user_id, followers_count=1)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Follow simultâneo para o mesmo par (índice único)
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Already following this user")
+    social_graph.on_follow(current_user.id, user_id)
+    timeline.follow(current_user.id, user_id)
 
     # Criar notificação para o usuário seguido
     await create_follow_notification(
-        db=db,
-        follower_id=current_user.id,
+        follower=current_user,
         followed_id=user_id
     )
 
@@ -80,7 +83,11 @@ async def unfollow_user(
         raise HTTPException(status_code=404, detail="Not following this user")
     
     db.delete(follow)
+    user_stats.adjust(db, current_user.id, following_count=-1)
+    user_stats.adjust(db, user_id, followers_count=-1)
     db.commit()
+    social_graph.on_unfollow(current_user.id, user_id)
+    timeline.unfollow(current_user.id, user_id)
     
     return {"message": "User unfollowed successfully"}
 
@@ -94,12 +101,9 @@ async def get_follow_status(
     if current_user.id == user_id:
         return {"is_following": False, "is_self": True}
     
-    follow = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.followed_id == user_id
-    ).first()
+    is_following = user_id in social_graph.following(db, current_user.id)
     
-    return {"is_following": follow is not None, "is_self": False}
+    return {"is_following": is_following, "is_self": False}
 
 @router.get("/followers")
 async def get_followers(
@@ -107,7 +111,8 @@ async def get_followers(
     db: Session = Depends(get_db)
 ):
     """Obter lista de seguidores"""
-    follows = db.query(Follow).filter(Follow.followed_id == current_user.id).all()
+    follows = db.query(Follow).options(joinedload(Follow.follower)).filter(Follow.followed_id == current_user.id).all()
+    mutual = friend_suggestions.mutual_friends(db, current_user.id, [follow.follower_id for follow in follows])
     
     followers = []
     for follow in follows:
@@ -120,7 +125,8 @@ async def get_followers(
             "avatar": follower.avatar,
             "bio": follower.bio,
             "is_verified": follower.is_verified,
-            "followed_at": follow.created_at.isoformat()
+            "followed_at": follow.created_at.isoformat(),
+            "mutual_friends": mutual.get(follower.id, {}).get("count", 0)
         })
     
     return followers
@@ -131,7 +137,8 @@ async def get_following(
     db: Session = Depends(get_db)
 ):
     """Obter lista de usuários que está seguindo"""
-    follows = db.query(Follow).filter(Follow.follower_id == current_user.id).all()
+    follows = db.query(Follow).options(joinedload(Follow.followed)).filter(Follow.follower_id == current_user.id).all()
+    mutual = friend_suggestions.mutual_friends(db, current_user.id, [follow.followed_id for follow in follows])
     
     following = []
     for follow in follows:
@@ -144,7 +151,8 @@ async def get_following(
             "avatar": followed.avatar,
             "bio": followed.bio,
             "is_verified": followed.is_verified,
-            "followed_at": follow.created_at.isoformat()
+            "followed_at": follow.created_at.isoformat(),
+            "mutual_friends": mutual.get(followed.id, {}).get("count", 0)
         })
     
     return following
@@ -161,7 +169,8 @@ async def get_user_followers(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    follows = db.query(Follow).filter(Follow.followed_id == user_id).all()
+    follows = db.query(Follow).options(joinedload(Follow.follower)).filter(Follow.followed_id == user_id).all()
+    mutual = friend_suggestions.mutual_friends(db, current_user.id, [follow.follower_id for follow in follows])
     
     followers = []
     for follow in follows:
@@ -174,7 +183,8 @@ async def get_user_followers(
             "avatar": follower.avatar,
             "bio": follower.bio,
             "is_verified": follower.is_verified,
-            "followed_at": follow.created_at.isoformat()
+            "followed_at": follow.created_at.isoformat(),
+            "mutual_friends": mutual.get(follower.id, {}).get("count", 0)
         })
     
     return followers
@@ -191,7 +201,8 @@ async def get_user_following(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    follows = db.query(Follow).filter(Follow.follower_id == user_id).all()
+    follows = db.query(Follow).options(joinedload(Follow.followed)).filter(Follow.follower_id == user_id).all()
+    mutual = friend_suggestions.mutual_friends(db, current_user.id, [follow.followed_id for follow in follows])
     
     following = []
     for follow in follows:
@@ -204,7 +215,8 @@ async def get_user_following(
             "avatar": followed.avatar,
             "bio": followed.bio,
             "is_verified": followed.is_verified,
-            "followed_at": follow.created_at.isoformat()
+            "followed_at": follow.created_at.isoformat(),
+            "mutual_friends": mutual.get(followed.id, {}).get("count", 0)
         })
     
     return following
@@ -1,16 +1,21 @@
 """
 Rotas para gerenciamento de amizades
 """
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from typing import List
 from datetime import datetime
 
 from core.database import get_db
 from core.security import get_current_user
-from models import User, Friendship, Block
+from models import User, Friendship
 from schemas import UserResponse
 from utils.notification_helpers import create_friend_request_notification, create_friend_request_accepted_notification
+from utils.social_graph import social_graph
+from utils.friend_suggestions import friend_suggestions
+from utils.user_stats import user_stats
+from utils.timeline import timeline
 
 router = APIRouter(prefix="/friendships", tags=["friendships"])
 
@@ -38,18 +43,12 @@ async def send_friend_request(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verificar se há bloqueio entre os usuários
-    block = db.query(Block).filter(
-        ((Block.blocker_id == current_user.id) & (Block.blocked_id == addressee_id)) |
-        ((Block.blocker_id == addressee_id) & (Block.blocked_id == current_user.id))
-    ).first()
-    
-    if block:
+    if social_graph.is_blocked(db, current_user.id, addressee_id):
         raise HTTPException(status_code=403, detail="Cannot send friend request due to blocking")
     
     # Verificar se já existe uma amizade
     existing_friendship = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) & (Friendship.addressee_id == addressee_id)) |
-        ((Friendship.requester_id == addressee_id) & (Friendship.addressee_id == current_user.id))
+        Friendship.between(current_user.id, addressee_id)
     ).first()
     
     if existing_friendship:
@@ -64,6 +63,7 @@ async def send_friend_request(
             existing_friendship.addressee_id = addressee_id
             existing_friendship.updated_at = datetime.utcnow()
             db.commit()
+            social_graph.on_friend_request(current_user.id, addressee_id)
             return {"message": "Friend request sent successfully"}
     
     # Criar nova solicitação de amizade
@@ -74,13 +74,18 @@ async def send_friend_request(
     )
     
     db.add(friendship)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Solicitação simultânea para o mesmo par (índice único)
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Friend request already sent")
     db.refresh(friendship)
+    social_graph.on_friend_request(current_user.id, addressee_id)
 
     # Criar notificação para o destinatário
     await create_friend_request_notification(
-        db=db,
-        requester_id=current_user.id,
+        requester=current_user,
         addressee_id=addressee_id,
         friendship_id=friendship.id
     )
@@ -133,13 +138,18 @@ async def accept_friend_request(
     
     friendship.status = "accepted"
     friendship.updated_at = datetime.utcnow()
+    user_stats.adjust(db, friendship.requester_id, friends_count=1)
+    user_stats.adjust(db, current_user.id, friends_count=1)
     db.commit()
+    social_graph.on_friendship_accepted(friendship.requester_id, current_user.id)
+    timeline.follow(friendship.requester_id, current_user.id)
+    timeline.follow(current_user.id, friendship.requester_id)
+    friend_suggestions.on_friendship_accepted(friendship.requester_id, current_user.id)
 
     # Criar notificação para quem enviou a solicitação
     await create_friend_request_accepted_notification(
-        db=db,
         requester_id=friendship.requester_id,
-        addressee_id=current_user.id,
+        addressee=current_user,
         friendship_id=friendship.id
     )
 
@@ -164,6 +174,7 @@ async def reject_friend_request(
     friendship.status = "rejected"
     friendship.updated_at = datetime.utcnow()
     db.commit()
+    social_graph.on_friend_request_closed(friendship.requester_id, current_user.id)
     
     return {"message": "Friend request rejected"}
 
@@ -173,9 +184,19 @@ async def get_friends(
     db: Session = Depends(get_db)
 ):
     """Obter lista de amigos"""
-    friendships = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) | (Friendship.addressee_id == current_user.id)),
+    # Uma busca em cada índice por usuário em vez de um OR entre colunas
+    friendships = db.query(Friendship).options(
+        joinedload(Friendship.requester), joinedload(Friendship.addressee)
+    ).filter(
+        Friendship.requester_id == current_user.id,
         Friendship.status == "accepted"
+    ).union_all(
+        db.query(Friendship).options(
+            joinedload(Friendship.requester), joinedload(Friendship.addressee)
+        ).filter(
+            Friendship.addressee_id == current_user.id,
+            Friendship.status == "accepted"
+        )
     ).all()
     
     friends = []
@@ -203,8 +224,7 @@ async def remove_friend(
 ):
     """Remover amigo"""
     friendship = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) & (Friendship.addressee_id == friend_id)) |
-        ((Friendship.requester_id == friend_id) & (Friendship.addressee_id == current_user.id)),
+        Friendship.between(current_user.id, friend_id),
         Friendship.status == "accepted"
     ).first()
     
@@ -212,7 +232,13 @@ async def remove_friend(
         raise HTTPException(status_code=404, detail="Friendship not found")
     
     db.delete(friendship)
+    user_stats.adjust(db, current_user.id, friends_count=-1)
+    user_stats.adjust(db, friend_id, friends_count=-1)
     db.commit()
+    social_graph.on_friendship_removed(current_user.id, friend_id)
+    friend_suggestions.on_friendship_removed(current_user.id, friend_id)
+    timeline.unfollow(current_user.id, friend_id)
+    timeline.unfollow(friend_id, current_user.id)
     
     return {"message": "Friend removed successfully"}
 
@@ -227,8 +253,7 @@ async def get_friendship_status(
         return {"status": "self"}
     
     friendship = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) & (Friendship.addressee_id == user_id)) |
-        ((Friendship.requester_id == user_id) & (Friendship.addressee_id == current_user.id))
+        Friendship.between(current_user.id, user_id)
     ).first()
     
     if not friendship:
@@ -244,87 +269,35 @@ async def get_friendship_status(
         "created_at": friendship.created_at.isoformat()
     }
 
+@router.get("/mutual")
+async def get_mutual_friends(
+    user_ids: List[int] = Query(...),
+    sample: int = 0,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Contar amigos em comum com vários usuários numa única chamada"""
+    if len(user_ids) > friend_suggestions.MAX_MUTUAL_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {friend_suggestions.MAX_MUTUAL_BATCH} users per request"
+        )
+
+    mutual = friend_suggestions.mutual_friends(db, current_user.id, user_ids, min(max(sample, 0), 5))
+    return [
+        {
+            "user_id": user_id,
+            "mutual_friends": info["count"],
+            "sample": info["sample"]
+        }
+        for user_id, info in mutual.items()
+    ]
+
 @router.get("/suggestions")
 async def get_friend_suggestions(
     limit: int = 10,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Obter sugestões de amizade baseadas em amigos em comum"""
-    # Obter IDs de amigos atuais
-    current_friends_query = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) | (Friendship.addressee_id == current_user.id)),
-        Friendship.status == "accepted"
-    )
-    
-    friend_ids = []
-    for friendship in current_friends_query:
-        if friendship.requester_id == current_user.id:
-            friend_ids.append(friendship.addressee_id)
-        else:
-            friend_ids.append(friendship.requester_id)
-    
-    # Obter usuários bloqueados
-    blocked_users = db.query(Block).filter(
-        (Block.blocker_id == current_user.id) | (Block.blocked_id == current_user.id)
-    ).all()
-    
-    blocked_ids = set()
-    for block in blocked_users:
-        blocked_ids.add(block.blocker_id)
-        blocked_ids.add(block.blocked_id)
-    
-    # Obter solicitações pendentes
-    pending_requests = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) | (Friendship.addressee_id == current_user.id)),
-        Friendship.status == "pending"
-    ).all()
-    
-    pending_ids = set()
-    for request in pending_requests:
-        pending_ids.add(request.requester_id)
-        pending_ids.add(request.addressee_id)
-    
-    # Excluir próprio usuário, amigos, bloqueados e solicitações pendentes
-    exclude_ids = set([current_user.id] + friend_ids + list(blocked_ids) + list(pending_ids))
-    
-    # Buscar usuários ativos que não estão na lista de exclusão
-    suggested_users = db.query(User).filter(
-        User.is_active == True,
-        ~User.id.in_(exclude_ids)
-    ).limit(limit * 2).all()  # Buscar mais para filtrar depois
-    
-    # Calcular amigos em comum para cada sugestão
-    suggestions = []
-    for user in suggested_users:
-        # Contar amigos em comum
-        user_friends_query = db.query(Friendship).filter(
-            ((Friendship.requester_id == user.id) | (Friendship.addressee_id == user.id)),
-            Friendship.status == "accepted"
-        )
-        
-        user_friend_ids = []
-        for friendship in user_friends_query:
-            if friendship.requester_id == user.id:
-                user_friend_ids.append(friendship.addressee_id)
-            else:
-                user_friend_ids.append(friendship.requester_id)
-        
-        mutual_friends = len(set(friend_ids) & set(user_friend_ids))
-        
-        suggestions.append({
-            "id": user.id,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "username": user.username,
-            "avatar": user.avatar,
-            "bio": user.bio,
-            "location": user.location,
-            "is_verified": user.is_verified,
-            "mutual_friends": mutual_friends
-        })
-    
-    # Ordenar por número de amigos em comum e depois por data de criação
-    suggestions.sort(key=lambda x: (-x["mutual_friends"], x["id"]))
-    
-    return suggestions[:limit]
+    """Obter sugestões de amizade baseadas em amigos de amigos"""
+    return friend_suggestions.suggest(db, current_user, limit)
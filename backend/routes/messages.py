@@ -0,0 +1,215 @@
+"""
+Rotas de mensagens diretas
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+import base64
+
+from core.database import get_db
+from core.security import get_current_user
+from models import User, Conversation, Message
+from schemas import MessageCreate
+from utils.messaging import messaging, user_summary
+from utils.chat_coalescer import chat_coalescer
+from utils.social_graph import social_graph
+
+router = APIRouter(prefix="/messages", tags=["messages"])
+
+class TypingIndicator(BaseModel):
+    recipient_id: int
+    is_typing: bool = True
+
+def encode_cursor(conversation: Conversation) -> str:
+    """Cursor opaco (last_message_at, id) da última conversa da página"""
+    raw = f"{conversation.last_message_at.isoformat()}|{conversation.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """Decodificar cursor em (last_message_at, id)"""
+    try:
+        last_message_at, conversation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(last_message_at), int(conversation_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/conversations")
+async def get_conversations(
+    response: Response,
+    limit: int = Query(30, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Lista de conversas, mais recentes primeiro (paginação por cursor via X-Next-Cursor)"""
+    before = decode_cursor(cursor) if cursor else None
+    conversations = messaging.conversations(db, current_user.id, limit, before)
+
+    if len(conversations) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(conversations[-1])
+
+    # Contatos da página em uma única consulta
+    contact_ids = {conversation.other_user_id(current_user.id) for conversation in conversations}
+    contacts = {}
+    if contact_ids:
+        for contact in db.query(
+            User.id, User.first_name, User.last_name, User.username, User.avatar
+        ).filter(User.id.in_(contact_ids)):
+            contacts[contact.id] = user_summary(contact)
+
+    result = []
+    for conversation in conversations:
+        contact_id = conversation.other_user_id(current_user.id)
+        if contact_id not in contacts:
+            continue
+        side = conversation.side(current_user.id)
+        other_side = conversation.side(contact_id)
+        is_own = conversation.last_sender_id == current_user.id
+        read_mark = getattr(conversation, f"{other_side if is_own else side}_last_read_id") or 0
+        result.append({
+            "id": conversation.id,
+            "user": contacts[contact_id],
+            "last_message": {
+                "id": conversation.last_message_id,
+                "content": conversation.last_message_preview,
+                "message_type": conversation.last_message_type,
+                "created_at": conversation.last_message_at.isoformat(),
+                "is_read": conversation.last_message_id <= read_mark,
+                "is_own": is_own
+            },
+            "unread_count": max(getattr(conversation, f"{side}_unread_count") or 0, 0)
+        })
+
+    return result
+
+@router.get("/conversation/{contact_id}")
+async def get_conversation_messages(
+    contact_id: int,
+    response: Response,
+    before_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Histórico da conversa em ordem cronológica
+
+    Paginação por keyset: para carregar mensagens mais antigas, envie em
+    `before_id` o header X-Next-Cursor da página anterior.
+    """
+    contact = db.query(User).filter(User.id == contact_id).first()
+    if not contact:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    conversation = messaging.find_conversation(db, current_user.id, contact_id)
+    if not conversation:
+        return []
+
+    messages = messaging.history(db, conversation, limit, before_id)
+    if len(messages) == limit:
+        response.headers["X-Next-Cursor"] = str(messages[0].id)
+
+    users = {
+        current_user.id: user_summary(current_user),
+        contact.id: user_summary(contact)
+    }
+    return [messaging.serialize(message, current_user.id, users, conversation) for message in messages]
+
+@router.post("/")
+async def send_message(
+    message_data: MessageCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Enviar mensagem direta"""
+    recipient_id = message_data.recipient_id
+
+    if recipient_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot send a message to yourself")
+
+    if not (message_data.content and message_data.content.strip()) and not message_data.media_url:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    if message_data.content and len(message_data.content) > messaging.MAX_CONTENT_LENGTH:
+        raise HTTPException(status_code=400, detail="Message is too long")
+
+    recipient = db.query(User).filter(User.id == recipient_id, User.is_active == True).first()
+    if not recipient:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if social_graph.is_blocked(db, current_user.id, recipient_id):
+        raise HTTPException(status_code=403, detail="Cannot send message due to blocking")
+
+    message = messaging.send(
+        db, current_user, recipient_id,
+        content=message_data.content,
+        message_type=message_data.message_type,
+        media_url=message_data.media_url,
+        media_metadata=message_data.media_metadata
+    )
+
+    payload = {
+        "id": message.id,
+        "conversation_id": message.conversation_id,
+        "sender": user_summary(current_user),
+        "recipient_id": recipient_id,
+        "content": message.content,
+        "message_type": message.message_type,
+        "media_url": message.media_url,
+        "is_read": False,
+        "created_at": message.created_at.isoformat(),
+        "is_own": True
+    }
+    chat_coalescer.message_sent(current_user.id, recipient_id)
+    await messaging.deliver_message(recipient_id, payload)
+
+    return payload
+
+@router.api_route("/{message_id}/read", methods=["POST", "PUT"])
+async def mark_message_as_read(
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Marcar a mensagem (e todas as anteriores da conversa) como lida
+
+    A gravação e o aviso ao remetente são agrupados pelo chat_coalescer.
+    """
+    message = db.query(Message.id, Message.conversation_id).filter(
+        Message.id == message_id,
+        Message.recipient_id == current_user.id
+    ).first()
+    if not message or not message.conversation_id:
+        raise HTTPException(status_code=404, detail="Message not found")
+
+    chat_coalescer.read(message.conversation_id, current_user.id, message_id)
+
+    return {"message": "Message marked as read"}
+
+@router.post("/conversation/{contact_id}/read")
+async def mark_conversation_as_read(
+    contact_id: int,
+    up_to_id: Optional[int] = Query(None, ge=1),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Marcar a conversa como lida (até up_to_id, ou até a última mensagem)"""
+    conversation = messaging.find_conversation(db, current_user.id, contact_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    last_read_id = up_to_id or conversation.last_message_id or 0
+    chat_coalescer.read(conversation.id, current_user.id, last_read_id)
+
+    return {"message": "Conversation marked as read", "last_read_id": last_read_id}
+
+@router.post("/typing")
+async def send_typing_indicator(
+    typing: TypingIndicator,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Indicador de digitação para o outro participante (agrupado por intervalo)"""
+    chat_coalescer.typing(db, current_user.id, typing.recipient_id, typing.is_typing)
+    return {"message": "Typing indicator sent"}
@@ -1,28 +1,49 @@
 """
 Rotas para gerenciamento de notificações
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+import base64
 import json
 
 from core.database import get_db
 from core.security import get_current_user
 from models import User, Notification, NotificationType
+from utils.notification_counters import unread_counter
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+def encode_cursor(notification: Notification) -> str:
+    """Cursor opaco (created_at, id) da última notificação da página"""
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """Decodificar cursor em (created_at, id)"""
+    try:
+        created_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/")
 async def get_notifications(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
     unread_only: bool = Query(False),
     notification_type: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Obter notificações do usuário"""
+    """Obter notificações do usuário
+
+    Paginação por cursor: envie o header X-Next-Cursor da página anterior em
+    `cursor`. `skip` continua aceito por compatibilidade, mas custa O(skip).
+    """
     query = db.query(Notification).filter(
         Notification.recipient_id == current_user.id,
         Notification.is_deleted == False
@@ -33,10 +54,38 @@ async def get_notifications(
     
     if notification_type:
         query = query.filter(Notification.notification_type == notification_type)
+
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.filter(
+            (Notification.created_at < cursor_created_at) |
+            ((Notification.created_at == cursor_created_at) & (Notification.id < cursor_id))
+        )
+    elif skip:
+        query = query.offset(skip)
     
     notifications = query.order_by(
-        Notification.created_at.desc()
-    ).offset(skip).limit(limit).all()
+        Notification.created_at.desc(),
+        Notification.id.desc()
+    ).limit(limit).all()
+
+    if len(notifications) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(notifications[-1])
+
+    # Remetentes da página em uma única consulta
+    sender_ids = {n.sender_id for n in notifications if n.sender_id}
+    senders = {}
+    if sender_ids:
+        for sender in db.query(
+            User.id, User.first_name, User.last_name, User.username, User.avatar
+        ).filter(User.id.in_(sender_ids)):
+            senders[sender.id] = {
+                "id": sender.id,
+                "first_name": sender.first_name,
+                "last_name": sender.last_name,
+                "username": sender.username,
+                "avatar": sender.avatar
+            }
     
     result = []
     for notification in notifications:
@@ -49,34 +98,25 @@ async def get_notifications(
             "is_clicked": notification.is_clicked,
             "created_at": notification.created_at.isoformat(),
             "read_at": notification.read_at.isoformat() if notification.read_at else None,
-            "sender": None,
+            "sender": senders.get(notification.sender_id),
             "data": json.loads(notification.data) if notification.data else {}
         }
         
-        if notification.sender:
-            notification_data["sender"] = {
-                "id": notification.sender.id,
-                "first_name": notification.sender.first_name,
-                "last_name": notification.sender.last_name,
-                "username": notification.sender.username,
-                "avatar": notification.sender.avatar
-            }
-        
         result.append(notification_data)
     
     return result
 
 @router.get("/count")
 async def get_notification_count(
+    refresh: bool = Query(False),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Obter contagem de notificações não lidas"""
-    unread_count = db.query(Notification).filter(
-        Notification.recipient_id == current_user.id,
-        Notification.is_read == False,
-        Notification.is_deleted == False
-    ).count()
+    """Obter contagem de notificações não lidas (em cache; refresh força recontagem)"""
+    if refresh:
+        unread_count = unread_counter.reconcile(db, current_user.id)
+    else:
+        unread_count = unread_counter.get(db, current_user.id)
     
     return {"unread_count": unread_count}
 
@@ -99,6 +139,10 @@ async def mark_notification_as_read(
         notification.is_read = True
         notification.read_at = datetime.utcnow()
         db.commit()
+
+        if not notification.is_deleted:
+            unread_counter.adjust(current_user.id, -1)
+            await unread_counter.push(current_user.id)
     
     return {"message": "Notification marked as read"}
 
@@ -122,11 +166,16 @@ async def mark_notification_as_clicked(
         notification.clicked_at = datetime.utcnow()
         
         # Marcar como lida também se não estiver
-        if not notification.is_read:
+        was_unread = not notification.is_read
+        if was_unread:
             notification.is_read = True
             notification.read_at = datetime.utcnow()
         
         db.commit()
+
+        if was_unread and not notification.is_deleted:
+            unread_counter.adjust(current_user.id, -1)
+            await unread_counter.push(current_user.id)
     
     return {"message": "Notification marked as clicked"}
 
@@ -146,8 +195,28 @@ async def mark_all_notifications_as_read(
     })
     
     db.commit()
+
+    unread_counter.reset(current_user.id)
+    await unread_counter.push(current_user.id)
     return {"message": "All notifications marked as read"}
 
+@router.delete("/clear-all")
+async def clear_all_notifications(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Limpar todas as notificações"""
+    db.query(Notification).filter(
+        Notification.recipient_id == current_user.id,
+        Notification.is_deleted == False
+    ).update({"is_deleted": True, "deleted_at": datetime.utcnow()})
+    
+    db.commit()
+
+    unread_counter.reset(current_user.id)
+    await unread_counter.push(current_user.id)
+    return {"message": "All notifications cleared"}
+
 @router.delete("/{notification_id}")
 async def delete_notification(
     notification_id: int,
@@ -163,21 +232,13 @@ async def delete_notification(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    was_unread = not notification.is_read and not notification.is_deleted
     notification.is_deleted = True
+    notification.deleted_at = datetime.utcnow()
     db.commit()
-    
-    return {"message": "Notification deleted"}
 
-@router.delete("/clear-all")
-async def clear_all_notifications(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Limpar todas as notificações"""
-    db.query(Notification).filter(
-        Notification.recipient_id == current_user.id,
-        Notification.is_deleted == False
-    ).update({"is_deleted": True})
+    if was_unread:
+        unread_counter.adjust(current_user.id, -1)
+        await unread_counter.push(current_user.id)
     
-    db.commit()
-    return {"message": "All notifications cleared"}
+    return {"message": "Notification deleted"}
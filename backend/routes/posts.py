@@ -1,19 +1,70 @@
 """
 Rotas de posts, reações e comentários
 """
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
 import json
 
 from core.database import get_db
 from core.security import get_current_user
-from models import User, Post, Reaction, Comment, Share
+from models import User, Post, Reaction, Comment
 from schemas import PostCreate, PostResponse, ReactionCreate, CommentCreate, CommentResponse, ShareCreate
-from utils.notification_helpers import create_post_reaction_notification, create_post_comment_notification
+from utils.notification_helpers import (
+    create_post_reaction_notification, create_post_comment_notification, create_comment_reply_notification,
+    create_post_share_notification
+)
+from utils.cascade_deletion import cascade_deletion
+from utils.comment_tree import comment_tree
+from utils.feed import feed
+from utils.idempotency import idempotency_cache
+from utils.reactions import reaction_counters
+from utils.shares import share_service
+from utils.timeline import timeline
+from utils.user_stats import user_stats
+from utils.viewer_state import viewer_state, EMPTY_STATE
+from utils.visibility import visibility
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+def build_post_response(post: Post, state: Optional[Dict] = None) -> PostResponse:
+    """PostResponse com contadores desnormalizados e o estado do usuário (viewer_state)"""
+    return PostResponse(
+        id=post.id,
+        author={
+            "id": post.author.id,
+            "first_name": post.author.first_name,
+            "last_name": post.author.last_name,
+            "avatar": getattr(post.author, 'avatar', None)
+        },
+        content=post.content,
+        post_type=post.post_type,
+        media_type=post.media_type,
+        media_url=post.media_url,
+        created_at=post.created_at,
+        reactions_count=post.reactions_count or 0,
+        comments_count=post.comments_count or 0,
+        shares_count=post.shares_count or 0,
+        reaction_summary=reaction_counters.summary(post.reaction_counts),
+        is_profile_update=post.is_profile_update,
+        is_cover_update=post.is_cover_update,
+        **(state or EMPTY_STATE)
+    )
+
+def build_post_page(
+    db: Session, posts: List[Post], viewer_id: int,
+    shared_by: Optional[Dict[int, List[Dict]]] = None
+) -> List[PostResponse]:
+    """Página de posts com o estado do usuário hidratado em lote"""
+    states = viewer_state.hydrate(db, viewer_id, [post.id for post in posts])
+    shared_by = shared_by or {}
+    return [
+        build_post_response(post, {**states[post.id], "shared_by": shared_by.get(post.id, [])})
+        for post in posts
+    ]
+
 @router.post("/", response_model=PostResponse)
 async def create_post(post: PostCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     # Validação e processamento do conteúdo
@@ -42,221 +93,332 @@ async def create_post(post: PostCreate, current_user: User = Depends(get_current
         is_cover_update=post.is_cover_update
     )
     db.add(db_post)
+    user_stats.adjust(db, current_user.id, posts_count=1)
     db.commit()
     db.refresh(db_post)
+    timeline.publish(db_post.id, current_user.id, db_post.created_at)
     
-    return PostResponse(
-        id=db_post.id,
-        author={
-            "id": db_post.author.id,
-            "first_name": db_post.author.first_name,
-            "last_name": db_post.author.last_name,
-            "avatar": getattr(db_post.author, 'avatar', None)
-        },
-        content=db_post.content,
-        post_type=db_post.post_type,
-        media_type=db_post.media_type,
-        media_url=db_post.media_url,
-        created_at=db_post.created_at,
-        reactions_count=db_post.reactions_count,
-        comments_count=db_post.comments_count,
-        shares_count=db_post.shares_count,
-        is_profile_update=db_post.is_profile_update,
-        is_cover_update=db_post.is_cover_update
-    )
+    return build_post_response(db_post)
+
+def encode_feed_cursor(cursor: Tuple) -> str:
+    """Cursor opaco: ("ranked", as_of, score, id) ou ("recent", before)"""
+    raw = "|".join(value.isoformat() if isinstance(value, datetime) else str(value) for value in cursor)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_feed_cursor(cursor: str):
+    """Decodificar cursor em (modo, posição)"""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if parts[0] == "ranked" and len(parts) == 4:
+            return "ranked", (datetime.fromisoformat(parts[1]), (float(parts[2]), int(parts[3])))
+        if parts[0] == "recent" and len(parts) == 2:
+            return "recent", datetime.fromisoformat(parts[1])
+    except (ValueError, UnicodeDecodeError):
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/", response_model=List[PostResponse])
-async def get_posts(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    posts = db.query(Post).order_by(Post.created_at.desc()).limit(50).all()
-    
-    return [
-        PostResponse(
-            id=post.id,
-            author={
-                "id": post.author.id,
-                "first_name": post.author.first_name,
-                "last_name": post.author.last_name,
-                "avatar": getattr(post.author, 'avatar', None)
-            },
-            content=post.content,
-            post_type=post.post_type,
-            media_type=post.media_type,
-            media_url=post.media_url,
-            created_at=post.created_at,
-            reactions_count=post.reactions_count,
-            comments_count=post.comments_count,
-            shares_count=post.shares_count,
-            is_profile_update=post.is_profile_update,
-            is_cover_update=post.is_cover_update
-        )
-        for post in posts
-    ]
+async def get_posts(
+    response: Response,
+    order: str = Query("ranked", pattern="^(ranked|recent)$"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(feed.PAGE_SIZE, ge=1, le=feed.PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Feed: posts e compartilhamentos de amigos/seguidos
+
+    `order=ranked` (padrão) ordena por relevância; `order=recent`, por data.
+    Para a próxima página envie em `cursor` o header X-Next-Cursor.
+    """
+    mode, position = decode_feed_cursor(cursor) if cursor else (order, None)
+    if mode == "ranked":
+        as_of, after = position or (datetime.utcnow(), None)
+        posts, shared_by, next_cursor = feed.ranked_page(db, current_user.id, limit, as_of, after)
+    else:
+        posts, shared_by, before = feed.page(db, current_user.id, limit, position)
+        next_cursor = ("recent", before) if before else None
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = encode_feed_cursor(next_cursor)
+    return build_post_page(db, posts, current_user.id, shared_by)
 
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get individual post by ID"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = db.query(Post).options(joinedload(Post.author)).filter(Post.id == post_id).first()
 
-    if not post:
+    if not post or not visibility.can_see_post(db, current_user.id, post):
         raise HTTPException(status_code=404, detail="Post not found")
 
-    return PostResponse(
-        id=post.id,
-        author={
-            "id": post.author.id,
-            "first_name": post.author.first_name,
-            "last_name": post.author.last_name,
-            "avatar": getattr(post.author, 'avatar', None)
-        },
-        content=post.content,
-        post_type=post.post_type,
-        media_type=post.media_type,
-        media_url=post.media_url,
-        created_at=post.created_at,
-        reactions_count=db.query(Reaction).filter(Reaction.post_id == post.id).count(),
-        comments_count=db.query(Comment).filter(Comment.post_id == post.id).count(),
-        shares_count=db.query(Share).filter(Share.post_id == post.id).count(),
-        is_profile_update=post.is_profile_update,
-        is_cover_update=post.is_cover_update
-    )
+    return build_post_page(db, [post], current_user.id)[0]
 
 @router.delete("/{post_id}")
 async def delete_post(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.id == post_id).first()
+    """Delete a post
+
+    O post sai do ar na hora (lápide); reações, comentários, compartilhamentos,
+    notificações e a mídia são removidos em segundo plano (ver
+    utils/cascade_deletion.py).
+    """
+    post = db.query(Post).filter(Post.id == post_id, Post.deleted_at.is_(None)).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
     if post.author_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this post")
     
-    # Delete related data
-    db.query(Reaction).filter(Reaction.post_id == post_id).delete()
-    db.query(Comment).filter(Comment.post_id == post_id).delete()
-    db.query(Share).filter(Share.post_id == post_id).delete()
-    
-    db.delete(post)
-    db.commit()
+    cascade_deletion.delete_post(db, post)
     
     return {"message": "Post deleted successfully"}
 
 # Reactions
 @router.post("/{post_id}/reactions")
-async def create_post_reaction(post_id: int, reaction_data: ReactionCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Add or update reaction to a post"""
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+async def create_post_reaction(
+    post_id: int,
+    reaction_data: ReactionCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Add or update reaction to a post
+
+    Repetir o pedido (toque duplo, reenvio) não altera nada; com o header
+    Idempotency-Key a resposta original é devolvida. A resposta já traz os
+    totais atualizados do post.
+    """
+    if not reaction_counters.is_valid(reaction_data.reaction_type):
+        raise HTTPException(status_code=400, detail="Invalid reaction type")
+
+    if not visibility.post_visible(db, current_user.id, post_id):
         raise HTTPException(status_code=404, detail="Post not found")
 
-    # Check if user already reacted
-    existing_reaction = db.query(Reaction).filter(
-        Reaction.post_id == post_id,
-        Reaction.user_id == current_user.id
-    ).first()
+    scope = f"post-reaction:{post_id}"
+    cached = idempotency_cache.get(current_user.id, scope, idempotency_key)
+    if cached is not None:
+        return cached
 
-    if existing_reaction:
-        # Update existing reaction
-        existing_reaction.reaction_type = reaction_data.reaction_type
-        db.commit()
-        return {"message": "Reaction updated"}
-    else:
-        # Create new reaction
-        reaction = Reaction(
+    result = reaction_counters.upsert(
+        db, Reaction, "post_id", Post, post_id, current_user.id, reaction_data.reaction_type
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    previous, post = result
+
+    # Criar notificação para o autor do post (só na primeira reação, e se não for o mesmo usuário)
+    if previous is None and post.author_id != current_user.id:
+        await create_post_reaction_notification(
             post_id=post_id,
-            user_id=current_user.id,
+            reactor=current_user,
+            post_author_id=post.author_id,
             reaction_type=reaction_data.reaction_type
         )
-        db.add(reaction)
-        db.commit()
-
-        # Criar notificação para o autor do post (se não for o mesmo usuário)
-        if post.author_id != current_user.id:
-            await create_post_reaction_notification(
-                db=db,
-                post_id=post_id,
-                reactor_id=current_user.id,
-                post_author_id=post.author_id,
-                reaction_type=reaction_data.reaction_type
-            )
 
-        return {"message": "Reaction added"}
+    response = {
+        "message": "Reaction added" if previous is None else "Reaction updated",
+        "reaction_type": reaction_data.reaction_type,
+        "previous_reaction_type": previous,
+        **reaction_counters.totals(post)
+    }
+    idempotency_cache.store(current_user.id, scope, idempotency_key, response)
+    return response
+
+@router.get("/{post_id}/reactions/user")
+async def get_user_post_reaction(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Reação do usuário atual no post (o PostResponse já traz viewer_reaction)"""
+    if not visibility.post_visible(db, current_user.id, post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
 
-@router.delete("/{post_id}/reactions")
-async def remove_post_reaction(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Remove reaction from a post"""
     reaction = db.query(Reaction).filter(
         Reaction.post_id == post_id,
         Reaction.user_id == current_user.id
     ).first()
+    return {
+        "reaction": {
+            "id": reaction.id,
+            "reaction_type": reaction.reaction_type,
+            "created_at": reaction.created_at.isoformat()
+        } if reaction else None
+    }
 
-    if reaction:
-        db.delete(reaction)
-        db.commit()
-        return {"message": "Reaction removed"}
-    else:
+@router.get("/{post_id}/reactions/summary")
+async def get_post_reaction_summary(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Reações do post por tipo e a reação do usuário atual"""
+    if not visibility.post_visible(db, current_user.id, post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    post = db.query(Post.id, Post.reactions_count, Post.reaction_counts).filter(Post.id == post_id).first()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    return {
+        "total": post.reactions_count or 0,
+        "by_type": reaction_counters.summary(post.reaction_counts),
+        "viewer_reaction": reaction_counters.viewer_reactions(
+            db, Reaction, Reaction.post_id, [post_id], current_user.id
+        ).get(post_id)
+    }
+
+@router.delete("/{post_id}/reactions")
+async def remove_post_reaction(
+    post_id: int,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Remove reaction from a post"""
+    scope = f"post-reaction-delete:{post_id}"
+    cached = idempotency_cache.get(current_user.id, scope, idempotency_key)
+    if cached is not None:
+        return cached
+
+    result = reaction_counters.remove(db, Reaction, "post_id", Post, post_id, current_user.id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Reaction not found")
+    previous, post = result
+
+    response = {
+        "message": "Reaction removed",
+        "previous_reaction_type": previous,
+        **reaction_counters.totals(post)
+    }
+    idempotency_cache.store(current_user.id, scope, idempotency_key, response)
+    return response
+
+# Shares
+@router.post("/{post_id}/shares")
+async def share_post(
+    post_id: int,
+    share_data: ShareCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Compartilhar um post (repetir o pedido não compartilha de novo)
+
+    O compartilhamento aparece no feed de amigos e seguidores de quem compartilhou.
+    """
+    if share_data.content and len(share_data.content) > share_service.MAX_CONTENT_LENGTH:
+        raise HTTPException(status_code=400, detail="Share text is too long")
 
-# Comments
-@router.get("/{post_id}/comments", response_model=List[CommentResponse])
-async def get_post_comments(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get comments for a specific post"""
     post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    if not post or not visibility.can_see_post(db, current_user.id, post):
         raise HTTPException(status_code=404, detail="Post not found")
 
-    comments = db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at.asc()).all()
+    share, created = share_service.share(db, post, current_user.id, share_data.content)
+    if created:
+        timeline.publish(post_id, current_user.id, share.created_at)
 
-    return [
-        CommentResponse(
-            id=comment.id,
-            content=comment.content,
-            author={
-                "id": comment.author.id,
-                "first_name": comment.author.first_name,
-                "last_name": comment.author.last_name,
-                "avatar": getattr(comment.author, 'avatar', None)
-            },
-            created_at=comment.created_at,
-            reactions_count=0
+    if created and post.author_id != current_user.id:
+        await create_post_share_notification(
+            post_id=post_id,
+            sharer=current_user,
+            post_author_id=post.author_id
         )
-        for comment in comments
+
+    db.refresh(post)
+    return {
+        "message": "Post shared" if created else "Post already shared",
+        "share_id": share.id,
+        "created_at": share.created_at.isoformat(),
+        "shares_count": post.shares_count or 0
+    }
+
+@router.delete("/{post_id}/shares")
+async def unshare_post(post_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Desfazer o compartilhamento de um post"""
+    if not share_service.unshare(db, post_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Share not found")
+    return {"message": "Share removed"}
+
+@router.get("/{post_id}/shares")
+async def get_post_shares(
+    post_id: int,
+    response: Response,
+    before_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(share_service.PAGE_SIZE, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Quem compartilhou o post, mais recentes primeiro (cursor em X-Next-Cursor)"""
+    if not visibility.post_visible(db, current_user.id, post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    shares = share_service.sharers(db, post_id, limit, before_id)
+    if len(shares) == limit:
+        response.headers["X-Next-Cursor"] = str(shares[-1].id)
+
+    users = feed.sharers(db, {share.id: [share.user_id] for share in shares})
+    return [
+        {
+            "id": share.id,
+            "user": users[share.id][0] if users.get(share.id) else None,
+            "content": share.content,
+            "created_at": share.created_at.isoformat()
+        }
+        for share in shares
     ]
 
+# Comments
+@router.get("/{post_id}/comments", response_model=List[CommentResponse])
+async def get_post_comments(
+    post_id: int,
+    response: Response,
+    after_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(comment_tree.PAGE_SIZE, ge=1, le=comment_tree.MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Comentários de primeiro nível com as primeiras respostas de cada thread
+
+    Paginação por keyset: envie em `after_id` o header X-Next-Cursor da
+    página anterior. Mais respostas de uma thread: GET /comments/{id}/replies.
+    """
+    if not visibility.post_visible(db, current_user.id, post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    comments = comment_tree.page(db, post_id, current_user.id, limit, after_id)
+    if len(comments) == limit:
+        response.headers["X-Next-Cursor"] = str(comments[-1]["id"])
+
+    return comments
+
 @router.post("/{post_id}/comments", response_model=CommentResponse)
 async def create_comment(post_id: int, comment_data: CommentCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Create a comment on a post"""
+    """Create a comment (or a reply, with parent_id) on a post"""
     post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    if not post or not visibility.can_see_post(db, current_user.id, post):
         raise HTTPException(status_code=404, detail="Post not found")
 
-    comment = Comment(
-        content=comment_data.content,
-        post_id=post_id,
-        author_id=current_user.id
-    )
+    return await publish_comment(db, post, current_user, comment_data)
 
-    db.add(comment)
-    db.commit()
-    db.refresh(comment)
+async def publish_comment(db: Session, post: Post, author: User, comment_data: CommentCreate):
+    """Gravar o comentário, notificar e montar a resposta (usado também por /comments)"""
+    if not comment_data.content.strip():
+        raise HTTPException(status_code=400, detail="Comment cannot be empty")
 
-    # Criar notificação para o autor do post (se não for o mesmo usuário)
-    if post.author_id != current_user.id:
+    try:
+        comment = comment_tree.create(db, post, author, comment_data.content, comment_data.parent_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Parent comment not found")
+
+    # Notificar o autor do comentário respondido e o autor do post (nunca o próprio usuário)
+    notified = {author.id}
+    if comment.parent_id:
+        parent_author_id = db.query(Comment.author_id).filter(Comment.id == comment.parent_id).scalar()
+        if parent_author_id not in notified:
+            notified.add(parent_author_id)
+            await create_comment_reply_notification(
+                post_id=post.id,
+                replier=author,
+                comment_author_id=parent_author_id,
+                comment_id=comment.id
+            )
+    if post.author_id not in notified:
         await create_post_comment_notification(
-            db=db,
-            post_id=post_id,
-            commenter_id=current_user.id,
+            post_id=post.id,
+            commenter=author,
             post_author_id=post.author_id,
             comment_id=comment.id
         )
 
-    return CommentResponse(
-        id=comment.id,
-        content=comment.content,
-        author={
-            "id": current_user.id,
-            "first_name": current_user.first_name,
-            "last_name": current_user.last_name,
-            "avatar": getattr(current_user, 'avatar', None)
-        },
-        created_at=comment.created_at,
-        reactions_count=0
-    )
+    return comment_tree.serialize(comment, comment_tree.authors(db, [comment]))
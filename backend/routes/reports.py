@@ -9,6 +9,10 @@ from core.database import get_db
 from core.security import get_current_user
 from models import User
 from models.report import Report, ReportType, ReportStatus
+from utils.social_graph import social_graph
+from utils.friend_suggestions import friend_suggestions
+from utils.user_stats import user_stats
+from utils.timeline import timeline
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -114,12 +118,7 @@ async def block_user(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verificar se já está bloqueado
-    existing_block = db.query(Block).filter(
-        Block.blocker_id == current_user.id,
-        Block.blocked_id == user_id
-    ).first()
-    
-    if existing_block:
+    if user_id in social_graph.blocking(db, current_user.id):
         raise HTTPException(status_code=400, detail="User already blocked")
     
     # Criar bloqueio
@@ -133,11 +132,13 @@ async def block_user(
     # Remover amizade se existir
     from models import Friendship
     friendship = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) & (Friendship.addressee_id == user_id)) |
-        ((Friendship.requester_id == user_id) & (Friendship.addressee_id == current_user.id))
+        Friendship.between(current_user.id, user_id)
     ).first()
     
     if friendship:
+        if friendship.status == "accepted":
+            user_stats.adjust(db, current_user.id, friends_count=-1)
+            user_stats.adjust(db, user_id, friends_count=-1)
         db.delete(friendship)
     
     # Remover follows se existir
@@ -154,10 +155,18 @@ async def block_user(
     
     if follow1:
         db.delete(follow1)
+        user_stats.adjust(db, current_user.id, following_count=-1)
+        user_stats.adjust(db, user_id, followers_count=-1)
     if follow2:
         db.delete(follow2)
+        user_stats.adjust(db, user_id, following_count=-1)
+        user_stats.adjust(db, current_user.id, followers_count=-1)
     
     db.commit()
+    social_graph.on_block(current_user.id, user_id)
+    friend_suggestions.on_friendship_removed(current_user.id, user_id)
+    timeline.unfollow(current_user.id, user_id)
+    timeline.unfollow(user_id, current_user.id)
     
     return {"message": "User blocked successfully"}
 
@@ -180,6 +189,7 @@ async def unblock_user(
     
     db.delete(block)
     db.commit()
+    social_graph.on_unblock(current_user.id, user_id)
     
     return {"message": "User unblocked successfully"}
 
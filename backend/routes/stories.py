@@ -1,20 +1,21 @@
 """
 Rotas para stories
 """
-import os
 from typing import List, Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import and_, desc
 
 from core.database import get_db
-from models.story import Story, StoryView, StoryTag, StoryOverlay
+from models.story import Story, StoryView
 from models.user import User
 from schemas.story import StoryCreate, StoryResponse, StoryWithEditor
 from utils.auth import get_current_user
+from utils.cascade_deletion import cascade_deletion
 from utils.files import save_uploaded_file
+from utils.visibility import visibility
 
 router = APIRouter(prefix="/stories", tags=["stories"])
 
@@ -141,23 +142,28 @@ async def get_stories(
     try:
         now = datetime.utcnow()
         
-        # Buscar stories não expiradas
-        stories = db.query(Story).join(User).filter(
+        # Buscar stories não expiradas que o usuário pode ver
+        stories = db.query(Story).join(User).options(contains_eager(Story.author)).filter(
             and_(
                 Story.expires_at > now,
                 Story.archived == False
-            )
+            ),
+            visibility.story_filter(db, current_user.id)
         ).order_by(desc(Story.created_at)).all()
         
+        # Stories já visualizadas pelo usuário atual (uma consulta para todas)
+        viewed_ids = set()
+        if stories:
+            viewed_ids = {
+                story_id for (story_id,) in db.query(StoryView.story_id).filter(
+                    StoryView.viewer_id == current_user.id,
+                    StoryView.story_id.in_([story.id for story in stories])
+                )
+            }
+        
         result = []
         for story in stories:
-            # Verificar se o usuário atual já visualizou esta story
-            viewed = db.query(StoryView).filter(
-                and_(
-                    StoryView.story_id == story.id,
-                    StoryView.viewer_id == current_user.id
-                )
-            ).first() is not None
+            viewed = story.id in viewed_ids
             
             story_data = {
                 "id": story.id,
@@ -195,8 +201,8 @@ async def view_story(
     
     try:
         # Verificar se a story existe
-        story = db.query(Story).filter(Story.id == story_id).first()
-        if not story:
+        story = db.query(Story).filter(Story.id == story_id, Story.deleted_at.is_(None)).first()
+        if not story or not visibility.can_see_stories(db, current_user.id, story.author):
             raise HTTPException(status_code=404, detail="Story não encontrada")
         
         # Verificar se já foi visualizada
@@ -222,6 +228,8 @@ async def view_story(
         
         return {"success": True, "message": "Visualização registrada"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         print(f"❌ Erro ao registrar visualização: {str(e)}")
@@ -236,9 +244,11 @@ async def get_story(
     """Buscar uma story específica"""
     
     try:
-        story = db.query(Story).join(User).filter(Story.id == story_id).first()
+        story = db.query(Story).join(User).options(contains_eager(Story.author)).filter(
+            Story.id == story_id, Story.deleted_at.is_(None)
+        ).first()
         
-        if not story:
+        if not story or not visibility.can_see_stories(db, current_user.id, story.author):
             raise HTTPException(status_code=404, detail="Story não encontrada")
         
         # Verificar se expirou
@@ -263,6 +273,8 @@ async def get_story(
             "views_count": story.views_count
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Erro ao buscar story: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar story")
@@ -273,36 +285,30 @@ async def delete_story(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Deletar uma story (apenas o autor pode deletar)"""
+    """Deletar uma story (apenas o autor pode deletar)
+
+    A story sai do ar na hora (lápide); visualizações, marcações, overlays e o
+    arquivo de mídia são removidos em segundo plano (ver utils/cascade_deletion.py).
+    """
     
     try:
         story = db.query(Story).filter(
             and_(
                 Story.id == story_id,
-                Story.author_id == current_user.id
+                Story.author_id == current_user.id,
+                Story.deleted_at.is_(None)
             )
         ).first()
         
         if not story:
             raise HTTPException(status_code=404, detail="Story não encontrada ou você não tem permissão")
         
-        # Deletar arquivo de mídia se existir
-        if story.media_url:
-            file_path = f"uploads{story.media_url}"
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        
-        # Deletar visualizações e tags relacionadas
-        db.query(StoryView).filter(StoryView.story_id == story_id).delete()
-        db.query(StoryTag).filter(StoryTag.story_id == story_id).delete()
-        db.query(StoryOverlay).filter(StoryOverlay.story_id == story_id).delete()
-        
-        # Deletar a story
-        db.delete(story)
-        db.commit()
+        cascade_deletion.delete_story(db, story)
         
         return {"success": True, "message": "Story deletada com sucesso"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         print(f"❌ Erro ao deletar story: {str(e)}")
@@ -2,16 +2,24 @@
 Rotas de usuários e perfis
 """
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from typing import List
 import os
 import uuid
 from pathlib import Path
 
 from core.database import get_db
-from core.security import get_current_user
-from models import User, Post, Friendship
-from schemas import UserResponse, PostResponse
+from core.security import get_current_user, verify_password
+from models import User, Post
+from schemas import UserResponse, PostResponse, AccountDelete
+from utils.cascade_deletion import cascade_deletion
+from utils.social_graph import social_graph
+from utils.friend_suggestions import friend_suggestions
+from utils.user_search import user_search
+from utils.user_stats import user_stats
+from utils.timeline import timeline
+from utils.visibility import visibility
+from routes.posts import build_post_page
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -21,7 +29,7 @@ async def search_users(
     location: str = None,
     verified_only: bool = False,
     limit: int = 20,
-    sort: str = "id",
+    sort: str = "relevance",
     order: str = "asc",
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -32,16 +40,9 @@ async def search_users(
         User.id != current_user.id
     )
 
-    # Filtro de busca por texto
+    # Filtro de busca por texto (índice FULLTEXT; ordena por relevância se sort=relevance)
     if search.strip():
-        search_filter = (
-            User.first_name.ilike(f"%{search}%") |
-            User.last_name.ilike(f"%{search}%") |
-            User.email.ilike(f"%{search}%") |
-            User.username.ilike(f"%{search}%") |
-            User.bio.ilike(f"%{search}%")
-        )
-        query = query.filter(search_filter)
+        query = user_search.apply(db, query, search, order_by_relevance=sort == "relevance")
 
     # Filtro por localização
     if location:
@@ -51,22 +52,15 @@ async def search_users(
     if verified_only:
         query = query.filter(User.is_verified == True)
 
-    # Obter usuários bloqueados para excluir dos resultados
-    from models import Block
-    blocked_users = db.query(Block).filter(
-        (Block.blocker_id == current_user.id) | (Block.blocked_id == current_user.id)
-    ).all()
-
-    blocked_ids = set()
-    for block in blocked_users:
-        blocked_ids.add(block.blocker_id)
-        blocked_ids.add(block.blocked_id)
-
+    # Excluir usuários bloqueados dos resultados
+    blocked_ids = social_graph.blocked_either(db, current_user.id)
     if blocked_ids:
         query = query.filter(~User.id.in_(blocked_ids))
 
     # Aplicar ordenação
-    if sort == "created_at":
+    if sort == "relevance" and search.strip():
+        pass  # já ordenado pela busca
+    elif sort == "created_at":
         if order == "desc":
             query = query.order_by(User.created_at.desc())
         else:
@@ -83,6 +77,7 @@ async def search_users(
             query = query.order_by(User.id.asc())
 
     users = query.limit(limit).all()
+    mutual = friend_suggestions.mutual_friends(db, current_user.id, [user.id for user in users])
 
     return [
         {
@@ -95,7 +90,8 @@ async def search_users(
             "avatar": getattr(user, 'avatar', None),
             "location": user.location,
             "is_verified": user.is_verified,
-            "created_at": user.created_at.isoformat()
+            "created_at": user.created_at.isoformat(),
+            "mutual_friends": mutual[user.id]["count"]
         }
         for user in users
     ]
@@ -107,43 +103,8 @@ async def discover_users(
     db: Session = Depends(get_db)
 ):
     """Descobrir novos usuários (usuários reais cadastrados)"""
-    # Obter IDs de amigos atuais
-    current_friends_query = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) | (Friendship.addressee_id == current_user.id)),
-        Friendship.status == "accepted"
-    )
-
-    friend_ids = []
-    for friendship in current_friends_query:
-        if friendship.requester_id == current_user.id:
-            friend_ids.append(friendship.addressee_id)
-        else:
-            friend_ids.append(friendship.requester_id)
-
-    # Obter usuários bloqueados
-    from models import Block
-    blocked_users = db.query(Block).filter(
-        (Block.blocker_id == current_user.id) | (Block.blocked_id == current_user.id)
-    ).all()
-
-    blocked_ids = set()
-    for block in blocked_users:
-        blocked_ids.add(block.blocker_id)
-        blocked_ids.add(block.blocked_id)
-
-    # Obter solicitações pendentes
-    pending_requests = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) | (Friendship.addressee_id == current_user.id)),
-        Friendship.status == "pending"
-    ).all()
-
-    pending_ids = set()
-    for request in pending_requests:
-        pending_ids.add(request.requester_id)
-        pending_ids.add(request.addressee_id)
-
     # Excluir próprio usuário, amigos, bloqueados e solicitações pendentes
-    exclude_ids = set([current_user.id] + friend_ids + list(blocked_ids) + list(pending_ids))
+    exclude_ids = social_graph.excluded_from_suggestions(db, current_user.id)
 
     # Buscar usuários ativos que não estão na lista de exclusão
     # Priorizar usuários com mais informações no perfil
@@ -152,6 +113,7 @@ async def discover_users(
         ~User.id.in_(exclude_ids),
         User.onboarding_completed == True  # Apenas usuários que completaram o onboarding
     ).order_by(User.created_at.desc()).limit(limit).all()
+    mutual = friend_suggestions.mutual_friends(db, current_user.id, [user.id for user in discovered_users])
 
     result = []
     for user in discovered_users:
@@ -165,25 +127,47 @@ async def discover_users(
             "location": user.location,
             "is_verified": user.is_verified,
             "created_at": user.created_at.isoformat(),
-            "mutual_friends": 0  # Será calculado pelo frontend se necessário
+            "mutual_friends": mutual[user.id]["count"]
         })
 
     return result
 
+@router.get("/typeahead")
+async def typeahead_users(
+    q: str = "",
+    limit: int = 8,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sugestões rápidas para a busca inline (prefixo de nome ou username)"""
+    return user_search.typeahead(
+        db, q, min(max(limit, 1), 20),
+        exclude_ids=social_graph.blocked_either(db, current_user.id) | {current_user.id},
+        boost_ids=social_graph.friends(db, current_user.id)
+    )
+
 @router.get("/{user_id}")
 async def get_user_by_id(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    """Cartão básico do usuário (e-mail, nascimento etc. só no /profile, conforme a privacidade)"""
+    user = db.query(User).filter(User.id == user_id, User.is_active == True, User.deleted_at.is_(None)).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
+    if not visibility.can_view_profile(db, current_user.id, user):
+        return {
+            "id": user.id,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "avatar": user.avatar,
+            "is_private": True
+        }
+
     return {
         "id": user.id,
         "first_name": user.first_name,
         "last_name": user.last_name,
-        "email": user.email,
-        "bio": getattr(user, 'bio', None),
-        "avatar": getattr(user, 'avatar', None),
-        "birth_date": user.birth_date.isoformat() if user.birth_date else None,
+        "bio": user.bio,
+        "avatar": user.avatar,
         "created_at": user.created_at.isoformat()
     }
 
@@ -195,27 +179,24 @@ async def get_user_profile(user_id: int, current_user: User = Depends(get_curren
         raise HTTPException(status_code=404, detail="User not found")
 
     # Verificar se são amigos para mostrar informações privadas
-    friendship = db.query(Friendship).filter(
-        ((Friendship.requester_id == current_user.id) & (Friendship.addressee_id == user_id)) |
-        ((Friendship.requester_id == user_id) & (Friendship.addressee_id == current_user.id)),
-        Friendship.status == "accepted"
-    ).first()
-
-    is_friend = friendship is not None
+    is_friend = social_graph.are_friends(db, current_user.id, user_id)
     is_own_profile = current_user.id == user_id
 
-    # Calcular estatísticas
-    friends_count = db.query(Friendship).filter(
-        ((Friendship.requester_id == user_id) | (Friendship.addressee_id == user_id)),
-        Friendship.status == "accepted"
-    ).count()
-
-    posts_count = db.query(Post).filter(Post.author_id == user_id).count()
+    # Perfil restrito: apenas o cartão básico
+    if not visibility.can_view_profile(db, current_user.id, user):
+        return {
+            "id": user.id,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "username": user.username,
+            "avatar": user.avatar,
+            "is_own_profile": False,
+            "is_friend": is_friend,
+            "is_private": True
+        }
 
-    # Calcular contadores de seguidor
-    from models import Follow
-    followers_count = db.query(Follow).filter(Follow.followed_id == user_id).count()
-    following_count = db.query(Follow).filter(Follow.follower_id == user_id).count()
+    # Estatísticas pré-calculadas (tabela user_stats)
+    stats = user_stats.get(db, user_id)
 
     # Determinar visibilidade das informações com base nas configurações de privacidade
     def can_see_field(field_visibility):
@@ -243,10 +224,7 @@ async def get_user_profile(user_id: int, current_user: User = Depends(get_curren
         "education": user.education,
         "is_verified": user.is_verified,
         "created_at": user.created_at.isoformat(),
-        "friends_count": friends_count,
-        "posts_count": posts_count,
-        "followers_count": followers_count,
-        "following_count": following_count,
+        **stats,
         "is_own_profile": is_own_profile,
         "is_friend": is_friend
     }
@@ -266,63 +244,38 @@ async def get_user_profile(user_id: int, current_user: User = Depends(get_curren
 
 @router.get("/{user_id}/posts", response_model=List[PostResponse])
 async def get_user_posts(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    posts = db.query(Post).filter(
+    posts = db.query(Post).join(User, User.id == Post.author_id).options(contains_eager(Post.author)).filter(
         Post.author_id == user_id,
-        Post.post_type == "post"
+        Post.post_type == "post",
+        visibility.post_filter(db, current_user.id, on_profile=True)
     ).order_by(Post.created_at.desc()).limit(50).all()
     
-    return [
-        PostResponse(
-            id=post.id,
-            author={
-                "id": post.author.id,
-                "first_name": post.author.first_name,
-                "last_name": post.author.last_name,
-                "avatar": getattr(post.author, 'avatar', None)
-            },
-            content=post.content,
-            post_type=post.post_type,
-            media_type=post.media_type,
-            media_url=post.media_url,
-            created_at=post.created_at,
-            reactions_count=0,
-            comments_count=0,
-            shares_count=0,
-            is_profile_update=post.is_profile_update,
-            is_cover_update=post.is_cover_update
-        )
-        for post in posts
-    ]
+    return build_post_page(db, posts, current_user.id)
 
 @router.get("/{user_id}/testimonials", response_model=List[PostResponse])
 async def get_user_testimonials(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    testimonials = db.query(Post).filter(
+    testimonials = db.query(Post).join(User, User.id == Post.author_id).options(contains_eager(Post.author)).filter(
         Post.author_id == user_id,
-        Post.post_type == "testimonial"
+        Post.post_type == "testimonial",
+        visibility.post_filter(db, current_user.id, on_profile=True)
     ).order_by(Post.created_at.desc()).limit(50).all()
     
-    return [
-        PostResponse(
-            id=post.id,
-            author={
-                "id": post.author.id,
-                "first_name": post.author.first_name,
-                "last_name": post.author.last_name,
-                "avatar": getattr(post.author, 'avatar', None)
-            },
-            content=post.content,
-            post_type=post.post_type,
-            media_type=post.media_type,
-            media_url=post.media_url,
-            created_at=post.created_at,
-            reactions_count=0,
-            comments_count=0,
-            shares_count=0,
-            is_profile_update=post.is_profile_update,
-            is_cover_update=post.is_cover_update
-        )
-        for post in testimonials
-    ]
+    return build_post_page(db, testimonials, current_user.id)
+
+@router.delete("/me")
+async def delete_account(data: AccountDelete, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Excluir a conta do usuário (pede a senha)
+
+    A conta sai do ar na hora; posts, stories, mensagens, amizades e o resto
+    do que referencia o usuário são removidos em segundo plano (ver
+    utils/cascade_deletion.py).
+    """
+    if not verify_password(data.password, current_user.password_hash):
+        raise HTTPException(status_code=400, detail="Incorrect password")
+
+    cascade_deletion.delete_account(db, current_user)
+
+    return {"message": "Account deleted successfully"}
 
 @router.post("/me/avatar")
 async def upload_user_avatar(file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -367,7 +320,9 @@ async def upload_user_avatar(file: UploadFile = File(...), current_user: User =
             is_profile_update=True
         )
         db.add(profile_post)
+        user_stats.adjust(db, current_user.id, posts_count=1)
         db.commit()
+        timeline.publish(profile_post.id, current_user.id, profile_post.created_at)
 
         return {
             "message": "Avatar updated successfully",
@@ -420,7 +375,9 @@ async def upload_user_cover_photo(file: UploadFile = File(...), current_user: Us
             is_cover_update=True
         )
         db.add(cover_post)
+        user_stats.adjust(db, current_user.id, posts_count=1)
         db.commit()
+        timeline.publish(cover_post.id, current_user.id, cover_post.created_at)
 
         return {
             "message": "Cover photo updated successfully",
@@ -1,13 +1,13 @@
 """
 Schemas/DTOs da aplicação
 """
-from .auth import LoginRequest, Token, PasswordUpdate
+from .auth import LoginRequest, Token, PasswordUpdate, AccountDelete
 from .user import (
     UserBase, UserCreate, UserResponse, UserProfileUpdate,
     PrivacySettings, NotificationSettings
 )
 from .post import (
-    PostCreate, PostResponse, ReactionCreate, 
+    PostCreate, PostResponse, ReactionCreate, CommentReactionCreate,
     CommentCreate, CommentResponse, ShareCreate
 )
 from .story import (
@@ -22,12 +22,12 @@ from .misc import (
 
 __all__ = [
     # Auth
-    "LoginRequest", "Token", "PasswordUpdate",
+    "LoginRequest", "Token", "PasswordUpdate", "AccountDelete",
     # User
     "UserBase", "UserCreate", "UserResponse", "UserProfileUpdate",
     "PrivacySettings", "NotificationSettings",
     # Post
-    "PostCreate", "PostResponse", "ReactionCreate", 
+    "PostCreate", "PostResponse", "ReactionCreate", "CommentReactionCreate",
     "CommentCreate", "CommentResponse", "ShareCreate",
     # Story
     "StoryCreate", "StoryResponse", "StoryTagCreate",
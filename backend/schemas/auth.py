@@ -14,3 +14,6 @@ class Token(BaseModel):
 class PasswordUpdate(BaseModel):
     current_password: str
     new_password: str
+
+class AccountDelete(BaseModel):
+    password: str
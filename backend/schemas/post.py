@@ -26,6 +26,13 @@ class PostResponse(BaseModel):
     reactions_count: int
     comments_count: int
     shares_count: int
+    # Reações por tipo e a reação do usuário atual
+    reaction_summary: Dict[str, int] = {}
+    viewer_reaction: Optional[str] = None
+    viewer_shared: bool = False
+    viewer_saved: bool = False
+    # Amigos/seguidos que compartilharam o post (itens do feed vindos de compartilhamentos)
+    shared_by: List[Dict[str, Any]] = []
     is_profile_update: Optional[bool] = False
     is_cover_update: Optional[bool] = False
     
@@ -36,6 +43,9 @@ class ReactionCreate(BaseModel):
     post_id: int
     reaction_type: str
 
+class CommentReactionCreate(BaseModel):
+    reaction_type: str
+
 class CommentCreate(BaseModel):
     content: str
     post_id: int
@@ -46,11 +56,18 @@ class CommentResponse(BaseModel):
     content: str
     author: Dict[str, Any]
     created_at: datetime
+    parent_id: Optional[int] = None
     reactions_count: int = 0
+    reaction_summary: Dict[str, int] = {}
+    viewer_reaction: Optional[str] = None
+    replies_count: int = 0
     replies: List['CommentResponse'] = []
+    # Cursor para carregar mais respostas (GET /comments/{id}/replies?after_id=)
+    replies_cursor: Optional[int] = None
     
     class Config:
         from_attributes = True
 
 class ShareCreate(BaseModel):
     post_id: int
+    content: Optional[str] = None
@@ -10,9 +10,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import create_engine, text, Column, Integer, String, Boolean, DateTime, Text, ForeignKey
-from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy import text
 
 # Importar configurações básicas
 try:
@@ -22,39 +20,8 @@ except ImportError:
     print("Certifique-se de estar no diretório backend e que o arquivo core/database.py existe.")
     sys.exit(1)
 
-# Definir os modelos inline para evitar problemas de importação
-class SavedPostCollection(Base):
-    """Pastas/coleções para organizar posts salvos"""
-    __tablename__ = "saved_post_collections"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    name = Column(String(100), nullable=False)  # Nome da pasta
-    description = Column(Text)  # Descrição opcional
-    is_default = Column(Boolean, default=False)  # Pasta padrão "Salvos"
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-
-class SavedPost(Base):
-    """Posts salvos pelo usuário"""
-    __tablename__ = "saved_posts"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
-    collection_id = Column(Integer, ForeignKey("saved_post_collections.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-class CommentReaction(Base):
-    """Reações específicas para comentários"""
-    __tablename__ = "comment_reactions"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=False)
-    reaction_type = Column(String(20), nullable=False)  # like, love, haha, wow, sad, angry
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+# Os modelos agora fazem parte de models (models/post.py)
+from models import SavedPostCollection, SavedPost, CommentReaction
 
 def create_social_features_tables():
     """Criar as novas tabelas para funcionalidades sociais"""
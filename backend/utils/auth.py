@@ -74,6 +74,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise credentials_exception
     
     user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    # Conta excluída: o token deixa de valer na hora (ver utils/cascade_deletion.py)
+    if user is None or user.deleted_at is not None:
         raise credentials_exception
     return user
@@ -0,0 +1,382 @@
+"""
+Exclusão em cascata de posts, stories e contas
+
+Apagar é marcar: a rota grava a lápide (deleted_at) junto com os ajustes de
+contadores e responde na hora; a partir daí o item some das listagens e das
+checagens de acesso (ver utils/visibility.py). Um worker de background remove
+os dependentes em lotes de BATCH_SIZE — cada lote uma transação curta, com
+pausa entre eles —, apaga os arquivos de mídia e, por último, a própria linha.
+
+A fila é a própria lápide: o worker procura linhas com deleted_at, então um
+restart retoma de onde parou e uma passada interrompida (MAX_BATCHES_PER_RUN)
+continua na seguinte. Cada etapa só seleciona o que ainda existe, e a linha
+principal só é removida depois de uma volta completa pelas etapas sem
+encontrar dependentes — o que foi gravado em paralelo (uma reação de última
+hora) é pego nessa volta.
+
+Na exclusão de uma conta, os posts e stories do usuário recebem lápide (e
+seguem pelas filas acima) e o resto do que o referencia é removido, ajustando
+os contadores de terceiros: reações, comentários e compartilhamentos em posts
+alheios, amigos e seguidores. A linha do usuário sai quando não restam posts
+nem stories dele.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime
+from functools import partial
+from typing import Callable, List, Optional
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from core.database import advisory_lock_async
+from models import (
+    User, UserStats, Post, Reaction, Comment, CommentReaction, Share, SavedPostCollection, SavedPost,
+    TimelineEntry, Story, StoryView, StoryTag, StoryOverlay, Friendship, Block, Follow,
+    Notification, NotificationArchive, Conversation, Message, MediaFile, Report
+)
+from utils.files import delete_uploaded_file
+from utils.identifier_index import identifier_index
+from utils.reactions import reaction_counters
+from utils.social_graph import social_graph
+from utils.user_stats import user_stats
+
+
+class CascadeDeletion:
+    def __init__(self):
+        self.wakeup: Optional[asyncio.Event] = None
+        self.worker_task: Optional[asyncio.Task] = None
+        self.running = False
+        # Estatísticas
+        self.stats = {
+            'posts_tombstoned': 0,
+            'stories_tombstoned': 0,
+            'accounts_tombstoned': 0,
+            'posts_purged': 0,
+            'stories_purged': 0,
+            'accounts_purged': 0,
+            'rows_deleted': 0,
+            'files_deleted': 0,
+            'failures': 0,
+            'runs': 0,
+        }
+        # Configurações
+        self.RUN_INTERVAL = 60  # segundos entre passadas sem exclusões novas
+        self.BATCH_SIZE = 500
+        self.BATCH_PAUSE = 0.1  # segundos entre lotes
+        self.MAX_BATCHES_PER_RUN = 200
+        self.MAX_ITEMS_PER_RUN = 100  # lápides de cada tipo por passada
+
+    # Lápides (chamadas pelas rotas; fazem o commit)
+
+    def delete_post(self, db: Session, post: Post):
+        post.deleted_at = datetime.utcnow()
+        user_stats.adjust(db, post.author_id, posts_count=-1)
+        db.commit()
+        self.stats['posts_tombstoned'] += 1
+        self._wake()
+
+    def delete_story(self, db: Session, story: Story):
+        story.deleted_at = datetime.utcnow()
+        db.commit()
+        self.stats['stories_tombstoned'] += 1
+        self._wake()
+
+    def delete_account(self, db: Session, user: User):
+        """Tirar a conta do ar (login e rotas autenticadas deixam de aceitá-la)"""
+        now = datetime.utcnow()
+        user.deleted_at = now
+        user.is_active = False
+        user.account_deactivated = True
+        user.deactivated_at = user.deactivated_at or now
+        db.commit()
+        self.stats['accounts_tombstoned'] += 1
+        self._wake()
+
+    def _wake(self):
+        if self.wakeup:
+            self.wakeup.set()
+
+    # Worker
+
+    async def run(self):
+        """Loop do worker: uma passada a cada exclusão nova ou RUN_INTERVAL"""
+        while self.running:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.RUN_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"❌ Exclusão em cascata: falha na passada: {e}")
+
+    async def run_once(self) -> dict:
+        """Processar as lápides pendentes (limitado a MAX_BATCHES_PER_RUN lotes)"""
+        # Uma única instância entre processos; o lote roda na conexão que segura o lock
+        async with advisory_lock_async("cascade_deletion") as db:
+            if db is None:
+                return {'skipped': True}
+
+            budget = self.MAX_BATCHES_PER_RUN
+            for kind, model in (("post", Post), ("story", Story), ("account", User)):
+                for entity_id in await asyncio.to_thread(self._tombstoned, db, model):
+                    if budget <= 0:
+                        break
+                    try:
+                        budget = await self._purge(db, kind, entity_id, budget)
+                    except Exception as e:
+                        db.rollback()
+                        self.stats['failures'] += 1
+                        print(f"❌ Exclusão em cascata: falha em {kind} {entity_id}: {e}")
+
+        self.stats['runs'] += 1
+        return {'skipped': False, 'batches': self.MAX_BATCHES_PER_RUN - budget}
+
+    def _tombstoned(self, db: Session, model) -> List[int]:
+        return db.execute(
+            select(model.id).where(model.deleted_at.isnot(None)).order_by(
+                model.deleted_at
+            ).limit(self.MAX_ITEMS_PER_RUN)
+        ).scalars().all()
+
+    async def _purge(self, db: Session, kind: str, entity_id: int, budget: int) -> int:
+        """Remover os dependentes de uma lápide e, no fim, a linha; devolve o orçamento restante"""
+        steps = getattr(self, f"_{kind}_steps")(entity_id)
+        finish = getattr(self, f"_finish_{kind}")
+        while True:
+            found = 0
+            for step in steps:
+                while budget > 0:
+                    removed = await asyncio.to_thread(step, db)
+                    if not removed:
+                        break
+                    found += removed
+                    budget -= 1
+                    await asyncio.sleep(self.BATCH_PAUSE)
+                if budget <= 0:
+                    return 0
+            if not found:
+                await asyncio.to_thread(finish, db, entity_id)
+                return budget
+
+    def _batch(
+        self, db: Session, model, conditions: list,
+        on_delete: Optional[Callable] = None, file_column: Optional[str] = None
+    ) -> int:
+        """Apagar um lote de linhas (uma transação); on_delete ajusta contadores antes"""
+        rows = db.execute(select(model.__table__).where(*conditions).limit(self.BATCH_SIZE)).all()
+        if not rows:
+            return 0
+
+        if on_delete:
+            on_delete(db, rows)
+        db.execute(delete(model).where(model.id.in_([row.id for row in rows])))
+        db.commit()
+        self.stats['rows_deleted'] += len(rows)
+        if file_column:
+            self._delete_files(getattr(row, file_column) for row in rows)
+        return len(rows)
+
+    def _tombstone_batch(self, db: Session, model, author_id: int) -> int:
+        """Dar lápide a um lote de posts ou stories de uma conta excluída"""
+        ids = db.execute(
+            select(model.id).where(model.author_id == author_id, model.deleted_at.is_(None)).limit(self.BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            return 0
+        db.execute(update(model).where(model.id.in_(ids)).values(deleted_at=datetime.utcnow()))
+        db.commit()
+        return len(ids)
+
+    def _delete_files(self, urls):
+        for url in urls:
+            try:
+                if delete_uploaded_file(url):
+                    self.stats['files_deleted'] += 1
+            except OSError as e:
+                print(f"❌ Exclusão em cascata: falha ao apagar arquivo {url}: {e}")
+
+    # Post
+
+    def _post_steps(self, post_id: int) -> List[Callable]:
+        comments = select(Comment.id).where(Comment.post_id == post_id)
+        return [partial(self._batch, model=model, conditions=conditions) for model, conditions in (
+            (CommentReaction, [CommentReaction.comment_id.in_(comments)]),
+            # Respostas antes dos comentários de primeiro nível (parent_id)
+            (Comment, [Comment.post_id == post_id, Comment.parent_id.isnot(None)]),
+            (Comment, [Comment.post_id == post_id]),
+            (Reaction, [Reaction.post_id == post_id]),
+            (Share, [Share.post_id == post_id]),
+            (SavedPost, [SavedPost.post_id == post_id]),
+            (TimelineEntry, [TimelineEntry.post_id == post_id]),
+            (Notification, [Notification.post_id == post_id]),
+        )]
+
+    def _finish_post(self, db: Session, post_id: int):
+        post = db.execute(select(Post.author_id, Post.media_url).where(Post.id == post_id)).first()
+        if post is None:
+            return
+        # Foto de perfil/capa ainda em uso: o arquivo é do perfil, não só do post
+        in_use = post.media_url and db.execute(
+            select(func.count()).select_from(User).where(
+                User.id == post.author_id,
+                or_(User.avatar == post.media_url, User.cover_photo == post.media_url)
+            )
+        ).scalar()
+        db.execute(delete(Post).where(Post.id == post_id))
+        db.commit()
+        self.stats['posts_purged'] += 1
+        if not in_use:
+            self._delete_files([post.media_url])
+
+    # Story
+
+    def _story_steps(self, story_id: int) -> List[Callable]:
+        return [partial(self._batch, model=model, conditions=conditions) for model, conditions in (
+            (StoryView, [StoryView.story_id == story_id]),
+            (StoryTag, [StoryTag.story_id == story_id]),
+            (StoryOverlay, [StoryOverlay.story_id == story_id]),
+            (Notification, [Notification.story_id == story_id]),
+        )]
+
+    def _finish_story(self, db: Session, story_id: int):
+        media_url = db.execute(select(Story.media_url).where(Story.id == story_id)).scalar()
+        db.execute(delete(Story).where(Story.id == story_id))
+        db.commit()
+        self.stats['stories_purged'] += 1
+        self._delete_files([media_url])
+
+    # Conta
+
+    def _account_steps(self, user_id: int) -> List[Callable]:
+        own_comments = select(Comment.id).where(Comment.author_id == user_id)
+        thread_comments = select(Comment.id).where(
+            or_(Comment.author_id == user_id, Comment.parent_id.in_(own_comments))
+        )
+        friendships = select(Friendship.id).where(
+            or_(Friendship.requester_id == user_id, Friendship.addressee_id == user_id)
+        )
+
+        def step(model, *conditions, on_delete=None, file_column=None):
+            return partial(
+                self._batch, model=model, conditions=list(conditions),
+                on_delete=on_delete, file_column=file_column
+            )
+
+        return [
+            partial(self._tombstone_batch, model=Post, author_id=user_id),
+            partial(self._tombstone_batch, model=Story, author_id=user_id),
+            step(Reaction, Reaction.user_id == user_id, on_delete=self._uncount_reactions),
+            step(CommentReaction, CommentReaction.user_id == user_id, on_delete=self._uncount_comment_reactions),
+            step(CommentReaction, CommentReaction.comment_id.in_(thread_comments)),
+            # Respostas aos comentários do usuário, depois os comentários dele
+            step(Comment, Comment.parent_id.in_(own_comments), on_delete=self._uncount_comments),
+            step(Comment, Comment.author_id == user_id, on_delete=self._uncount_comments),
+            step(Share, Share.user_id == user_id, on_delete=self._uncount_shares),
+            step(TimelineEntry, or_(TimelineEntry.user_id == user_id, TimelineEntry.actor_id == user_id)),
+            step(SavedPost, SavedPost.user_id == user_id),
+            step(SavedPostCollection, SavedPostCollection.user_id == user_id),
+            step(StoryView, StoryView.viewer_id == user_id),
+            step(StoryTag, StoryTag.tagged_user_id == user_id),
+            step(Notification, or_(
+                Notification.recipient_id == user_id,
+                Notification.sender_id == user_id,
+                Notification.friendship_id.in_(friendships)
+            )),
+            step(NotificationArchive, or_(
+                NotificationArchive.recipient_id == user_id,
+                NotificationArchive.sender_id == user_id
+            )),
+            step(Friendship, Friendship.id.in_(friendships), on_delete=partial(self._unlink_friends, user_id=user_id)),
+            step(Follow, or_(Follow.follower_id == user_id, Follow.followed_id == user_id), on_delete=self._unlink_follows),
+            step(Block, or_(Block.blocker_id == user_id, Block.blocked_id == user_id), on_delete=self._unlink_blocks),
+            step(Message, or_(Message.sender_id == user_id, Message.recipient_id == user_id), file_column="media_url"),
+            step(Conversation, or_(Conversation.user_low_id == user_id, Conversation.user_high_id == user_id)),
+            step(Report, or_(Report.reporter_id == user_id, Report.reported_user_id == user_id)),
+            step(MediaFile, MediaFile.uploaded_by == user_id, file_column="file_path"),
+        ]
+
+    def _finish_account(self, db: Session, user_id: int):
+        """Remover a linha do usuário quando os posts e stories dele já saíram"""
+        for model in (Post, Story):
+            if db.execute(select(model.id).where(model.author_id == user_id).limit(1)).first():
+                return
+        account = db.execute(
+            select(User.email, User.username, User.avatar, User.cover_photo).where(User.id == user_id)
+        ).first()
+        db.execute(delete(UserStats).where(UserStats.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+        self.stats['accounts_purged'] += 1
+        social_graph.invalidate(user_id)
+        if account:
+            identifier_index.remove_user(user_id, account.email, account.username)
+            self._delete_files((account.avatar, account.cover_photo))
+
+    # Ajustes de contadores de terceiros (na transação do lote)
+
+    def _uncount_reactions(self, db: Session, rows):
+        for row in rows:
+            reaction_counters.apply(db, Post, row.post_id, removed=row.reaction_type)
+
+    def _uncount_comment_reactions(self, db: Session, rows):
+        for row in rows:
+            reaction_counters.apply(db, Comment, row.comment_id, removed=row.reaction_type)
+
+    def _uncount_comments(self, db: Session, rows):
+        for post_id, count in Counter(row.post_id for row in rows).items():
+            db.execute(update(Post).where(Post.id == post_id).values(
+                comments_count=func.coalesce(Post.comments_count, 0) - count
+            ))
+        deleted = {row.id for row in rows}
+        for parent_id, count in Counter(
+            row.parent_id for row in rows if row.parent_id and row.parent_id not in deleted
+        ).items():
+            db.execute(update(Comment).where(Comment.id == parent_id).values(
+                replies_count=Comment.replies_count - count
+            ))
+
+    def _uncount_shares(self, db: Session, rows):
+        for post_id, count in Counter(row.post_id for row in rows).items():
+            db.execute(update(Post).where(Post.id == post_id).values(
+                shares_count=func.coalesce(Post.shares_count, 0) - count
+            ))
+
+    def _unlink_friends(self, db: Session, rows, user_id: int):
+        for row in rows:
+            other_id = row.addressee_id if row.requester_id == user_id else row.requester_id
+            if row.status == "accepted":
+                user_stats.adjust(db, other_id, friends_count=-1)
+            social_graph.on_friendship_removed(user_id, other_id)
+
+    def _unlink_follows(self, db: Session, rows):
+        for row in rows:
+            user_stats.adjust(db, row.followed_id, followers_count=-1)
+            user_stats.adjust(db, row.follower_id, following_count=-1)
+            social_graph.on_unfollow(row.follower_id, row.followed_id)
+
+    def _unlink_blocks(self, db: Session, rows):
+        for row in rows:
+            social_graph.on_unblock(row.blocker_id, row.blocked_id)
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global da exclusão em cascata
+cascade_deletion = CascadeDeletion()
+
+# Função para iniciar o worker de exclusão em cascata
+def start_cascade_deletion():
+    cascade_deletion.running = True
+    cascade_deletion.wakeup = asyncio.Event()
+    cascade_deletion.worker_task = asyncio.create_task(cascade_deletion.run())
+
+# Função para parar o worker (as lápides pendentes ficam para o próximo início)
+async def stop_cascade_deletion():
+    cascade_deletion.running = False
+    if cascade_deletion.worker_task:
+        cascade_deletion.wakeup.set()
+        await cascade_deletion.worker_task
+        cascade_deletion.worker_task = None
@@ -0,0 +1,194 @@
+"""
+Agrupamento de eventos de digitação e de leitura do chat
+
+O chat dispara um evento de digitação a cada tecla e uma confirmação de
+leitura por mensagem. As rotas e o WebSocket só registram o estado mais
+recente em memória; uma task descarrega a cada TICK:
+
+- digitação: um estado por (remetente, destinatário) — o par identifica a
+  conversa. Só vai um frame quando o estado muda, ou para renovar um
+  "digitando" antes que o cliente o expire (3 s no ChatPage);
+- leitura: uma marca d'água por (conversa, leitor). Todas as leituras do
+  intervalo viram uma única escrita no banco (messaging.mark_read) e um
+  único frame message_read.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from core.websockets import manager
+from models import Conversation
+from utils.messaging import messaging
+from utils.social_graph import social_graph
+
+
+class ChatCoalescer:
+    def __init__(self):
+        # (remetente, destinatário) -> último estado de digitação recebido
+        self.pending_typing: Dict[Tuple[int, int], bool] = {}
+        # (remetente, destinatário) -> (estado entregue, momento da entrega)
+        self.delivered_typing: Dict[Tuple[int, int], Tuple[bool, float]] = {}
+        # (conversa, leitor) -> maior id lido no intervalo
+        self.pending_reads: Dict[Tuple[int, int], int] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.worker_task: Optional[asyncio.Task] = None
+        self.running = False
+        # Estatísticas
+        self.stats = {
+            'typing_events': 0,
+            'typing_frames': 0,
+            'read_events': 0,
+            'read_writes': 0,
+            'read_frames': 0,
+            'failed_reads': 0,
+            'failed_flushes': 0,
+        }
+        # Configurações
+        self.TICK = 0.5  # segundos
+        self.TYPING_REFRESH = 2.5  # reenvia "digitando" antes do timeout de 3 s do cliente
+        self.TYPING_STATE_TTL = 30  # segundos até esquecer um estado entregue
+
+    def typing(self, db: Session, sender_id: int, recipient_id: int, is_typing: bool) -> bool:
+        """Registrar o estado de digitação (nunca entre usuários com bloqueio)"""
+        if sender_id == recipient_id or social_graph.is_blocked(db, sender_id, recipient_id):
+            return False
+        self.pending_typing[(sender_id, recipient_id)] = is_typing
+        self.stats['typing_events'] += 1
+        return True
+
+    def message_sent(self, sender_id: int, recipient_id: int):
+        """A mensagem chegou antes: um "digitando" ainda pendente não é mais enviado"""
+        self.pending_typing.pop((sender_id, recipient_id), None)
+
+    def read(self, conversation_id: int, reader_id: int, up_to_id: int):
+        """Registrar leitura até up_to_id (fica só a maior do intervalo)"""
+        key = (conversation_id, reader_id)
+        if up_to_id > self.pending_reads.get(key, 0):
+            self.pending_reads[key] = up_to_id
+        self.stats['read_events'] += 1
+
+    async def run(self):
+        """Loop do worker: descarrega a cada TICK"""
+        while self.running:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.TICK)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.stats['failed_flushes'] += 1
+                print(f"❌ Chat: falha ao descarregar eventos: {e}")
+
+    async def flush(self):
+        await self.flush_typing()
+        await self.flush_reads()
+
+    async def flush_typing(self):
+        now = time.monotonic()
+        pending, self.pending_typing = self.pending_typing, {}
+
+        for (sender_id, recipient_id), is_typing in pending.items():
+            key = (sender_id, recipient_id)
+            delivered = self.delivered_typing.get(key)
+            if delivered and delivered[0] == is_typing and (
+                not is_typing or now - delivered[1] < self.TYPING_REFRESH
+            ):
+                continue
+            self.delivered_typing[key] = (is_typing, now)
+            if recipient_id not in manager.active_connections:
+                continue
+            await manager.send_typing_indicator(recipient_id, {
+                "sender_id": sender_id,
+                "is_typing": is_typing
+            })
+            self.stats['typing_frames'] += 1
+
+        # Evitar crescimento indefinido dos estados entregues
+        if len(self.delivered_typing) > 10000:
+            self.delivered_typing = {
+                key: state for key, state in self.delivered_typing.items()
+                if now - state[1] < self.TYPING_STATE_TTL
+            }
+
+    async def flush_reads(self):
+        if not self.pending_reads:
+            return
+        pending, self.pending_reads = self.pending_reads, {}
+
+        try:
+            receipts, failed = await asyncio.to_thread(self._persist_reads, pending)
+        except Exception:
+            self._requeue_reads(pending)
+            raise
+        # Conversas que falharam voltam para o próximo tick
+        self._requeue_reads(failed)
+        for recipient_id, read_data in receipts:
+            await manager.send_message_read(recipient_id, read_data)
+            self.stats['read_frames'] += 1
+
+    def _requeue_reads(self, reads: Dict[Tuple[int, int], int]):
+        for key, up_to_id in reads.items():
+            if up_to_id > self.pending_reads.get(key, 0):
+                self.pending_reads[key] = up_to_id
+
+    def _persist_reads(
+        self, pending: Dict[Tuple[int, int], int]
+    ) -> Tuple[List[Tuple[int, dict]], Dict[Tuple[int, int], int]]:
+        """Uma escrita por conversa; devolve os frames (destinatário, dados) a enviar e as leituras que falharam"""
+        receipts = []
+        failed = {}
+        db = SessionLocal()
+        try:
+            for (conversation_id, reader_id), up_to_id in pending.items():
+                try:
+                    conversation = db.get(Conversation, conversation_id)
+                    if not conversation:
+                        continue
+                    last_read_id = messaging.mark_read(db, conversation, reader_id, up_to_id)
+                except Exception as e:
+                    db.rollback()
+                    failed[(conversation_id, reader_id)] = up_to_id
+                    self.stats['failed_reads'] += 1
+                    print(f"❌ Chat: falha ao gravar leitura da conversa {conversation_id}: {e}")
+                    continue
+                if last_read_id is None:
+                    continue
+                self.stats['read_writes'] += 1
+                receipts.append((conversation.other_user_id(reader_id), {
+                    "conversation_id": conversation.id,
+                    "reader_id": reader_id,
+                    "last_read_id": last_read_id
+                }))
+        finally:
+            db.close()
+        return receipts, failed
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'pending_typing': len(self.pending_typing),
+            'pending_reads': len(self.pending_reads),
+        }
+
+# Instância global do agrupador do chat
+chat_coalescer = ChatCoalescer()
+
+# Função para iniciar o worker do chat
+def start_chat_coalescer():
+    chat_coalescer.running = True
+    chat_coalescer.wakeup = asyncio.Event()
+    chat_coalescer.worker_task = asyncio.create_task(chat_coalescer.run())
+
+# Função para parar o worker gravando as leituras pendentes
+async def stop_chat_coalescer():
+    chat_coalescer.running = False
+    if chat_coalescer.worker_task:
+        chat_coalescer.wakeup.set()
+        await chat_coalescer.worker_task
+        chat_coalescer.worker_task = None
+    await chat_coalescer.flush_reads()
@@ -0,0 +1,177 @@
+"""
+Árvore de comentários
+
+Comentários têm dois níveis: os de primeiro nível de um post e as respostas.
+Uma resposta a uma resposta entra na mesma thread (parent_id aponta sempre
+para o comentário de primeiro nível).
+
+Uma página da árvore custa quatro consultas, independente do tamanho:
+1. comentários de primeiro nível por keyset (post_id, parent_id, id);
+2. as primeiras REPLIES_PREVIEW respostas de cada thread da página, numa
+   única consulta com ROW_NUMBER() por parent_id;
+3. os autores de tudo o que foi carregado;
+4. a reação do usuário em cada comentário carregado.
+
+replies_count (por comentário) e comments_count (por post) são mantidos na
+mesma transação da escrita.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from models import User, Post, Comment, CommentReaction
+from utils.reactions import reaction_counters
+
+
+class CommentTree:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'pages': 0,
+            'reply_pages': 0,
+            'created': 0,
+        }
+        # Configurações
+        self.PAGE_SIZE = 20
+        self.MAX_PAGE_SIZE = 50
+        self.REPLIES_PREVIEW = 3
+
+    def top_level(self, db: Session, post_id: int, limit: int, after_id: Optional[int] = None) -> List[Comment]:
+        """Comentários de primeiro nível, mais antigos primeiro"""
+        query = db.query(Comment).filter(Comment.post_id == post_id, Comment.parent_id.is_(None))
+        if after_id:
+            query = query.filter(Comment.id > after_id)
+        self.stats['pages'] += 1
+        return query.order_by(Comment.id.asc()).limit(limit).all()
+
+    def replies(self, db: Session, parent_id: int, limit: int, after_id: Optional[int] = None) -> List[Comment]:
+        """Respostas de uma thread ("carregar mais")"""
+        query = db.query(Comment).filter(Comment.parent_id == parent_id)
+        if after_id:
+            query = query.filter(Comment.id > after_id)
+        self.stats['reply_pages'] += 1
+        return query.order_by(Comment.id.asc()).limit(limit).all()
+
+    def first_replies(self, db: Session, parent_ids: List[int]) -> Dict[int, List[Comment]]:
+        """As primeiras REPLIES_PREVIEW respostas de cada thread, numa única consulta"""
+        grouped: Dict[int, List[Comment]] = {parent_id: [] for parent_id in parent_ids}
+        if not parent_ids:
+            return grouped
+
+        ranked = select(
+            Comment.id,
+            func.row_number().over(partition_by=Comment.parent_id, order_by=Comment.id).label("position")
+        ).where(Comment.parent_id.in_(parent_ids)).subquery()
+        reply = aliased(Comment)
+        rows = db.query(reply).join(ranked, ranked.c.id == reply.id).filter(
+            ranked.c.position <= self.REPLIES_PREVIEW
+        ).order_by(reply.id.asc()).all()
+
+        for row in rows:
+            grouped[row.parent_id].append(row)
+        return grouped
+
+    def authors(self, db: Session, comments: Iterable[Comment]) -> Dict[int, Dict[str, Any]]:
+        """Autores dos comentários em uma única consulta"""
+        author_ids = {comment.author_id for comment in comments}
+        if not author_ids:
+            return {}
+        return {
+            author.id: {
+                "id": author.id,
+                "first_name": author.first_name,
+                "last_name": author.last_name,
+                "avatar": author.avatar
+            }
+            for author in db.query(
+                User.id, User.first_name, User.last_name, User.avatar
+            ).filter(User.id.in_(author_ids))
+        }
+
+    def viewer_reactions(self, db: Session, comments: Iterable[Comment], viewer_id: int) -> Dict[int, str]:
+        return reaction_counters.viewer_reactions(
+            db, CommentReaction, CommentReaction.comment_id, [comment.id for comment in comments], viewer_id
+        )
+
+    def serialize(
+        self, comment: Comment, authors: Dict[int, Dict[str, Any]],
+        replies: Optional[List[Comment]] = None,
+        viewer_reactions: Optional[Dict[int, str]] = None
+    ) -> Dict[str, Any]:
+        replies = replies or []
+        viewer_reactions = viewer_reactions or {}
+        replies_count = comment.replies_count or 0
+        return {
+            "id": comment.id,
+            "content": comment.content,
+            "author": authors.get(comment.author_id),
+            "created_at": comment.created_at,
+            "parent_id": comment.parent_id,
+            "reactions_count": comment.reactions_count or 0,
+            "reaction_summary": reaction_counters.summary(comment.reaction_counts),
+            "viewer_reaction": viewer_reactions.get(comment.id),
+            "replies_count": replies_count,
+            "replies": [self.serialize(reply, authors, viewer_reactions=viewer_reactions) for reply in replies],
+            "replies_cursor": replies[-1].id if replies and len(replies) < replies_count else None
+        }
+
+    def page(
+        self, db: Session, post_id: int, viewer_id: int, limit: int,
+        after_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Página da árvore: comentários de primeiro nível com a prévia das respostas"""
+        comments = self.top_level(db, post_id, limit, after_id)
+        replies = self.first_replies(db, [comment.id for comment in comments if comment.replies_count])
+        loaded = comments + [reply for thread in replies.values() for reply in thread]
+        authors = self.authors(db, loaded)
+        viewer_reactions = self.viewer_reactions(db, loaded, viewer_id)
+        return [
+            self.serialize(comment, authors, replies.get(comment.id), viewer_reactions)
+            for comment in comments
+        ]
+
+    def create(
+        self, db: Session, post: Post, author: User, content: str,
+        parent_id: Optional[int] = None
+    ) -> Comment:
+        """Criar comentário (ou resposta) e atualizar os contadores na mesma transação
+
+        Levanta ValueError se o comentário pai não pertence ao post.
+        """
+        if parent_id:
+            parent = db.query(Comment.id, Comment.post_id, Comment.parent_id).filter(
+                Comment.id == parent_id
+            ).first()
+            if not parent or parent.post_id != post.id:
+                raise ValueError("Parent comment not found")
+            # Respostas a respostas ficam na thread do comentário de primeiro nível
+            parent_id = parent.parent_id or parent.id
+
+        comment = Comment(
+            content=content,
+            post_id=post.id,
+            author_id=author.id,
+            parent_id=parent_id,
+            replies_count=0,
+            reactions_count=0
+        )
+        db.add(comment)
+
+        db.execute(
+            update(Post).where(Post.id == post.id).values(comments_count=func.coalesce(Post.comments_count, 0) + 1)
+        )
+        if parent_id:
+            db.execute(
+                update(Comment).where(Comment.id == parent_id).values(replies_count=Comment.replies_count + 1)
+            )
+        db.commit()
+        db.refresh(comment)
+        self.stats['created'] += 1
+        return comment
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global da árvore de comentários
+comment_tree = CommentTree()
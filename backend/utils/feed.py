@@ -0,0 +1,234 @@
+"""
+Feed de posts
+
+O feed de cada usuário é a sua timeline (utils/timeline.py), gravada no
+momento da publicação: a leitura é uma faixa de timeline_entries pela data da
+atividade, mais a hidratação dos posts da página.
+
+Junto com a timeline entram, na leitura:
+- posts e compartilhamentos recentes dos autores com muitos seguidores que o
+  usuário segue (eles não fazem fan-out para seguidores);
+- na primeira página, se a timeline ainda não a enche, posts recentes de
+  qualquer autor (usuário novo, sem conexões).
+
+Só entram na página os posts que o usuário pode ver (utils/visibility.py),
+filtrados na própria consulta de hidratação.
+
+Um post compartilhado por vários amigos aparece uma única vez, na data do
+compartilhamento mais recente, com até MAX_SHARERS autores em shared_by.
+
+A ordem padrão é por relevância (ranked_page, ver utils/feed_ranking.py);
+a cronológica (page) usa keyset na data da atividade: o cursor é a atividade
+do último item da página.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, contains_eager
+
+from models import User, Post, Share
+from utils.feed_ranking import feed_ranker
+from utils.social_graph import social_graph
+from utils.timeline import timeline
+from utils.visibility import visibility
+
+
+class Feed:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'pages': 0,
+            'share_items': 0,
+            'celebrity_merges': 0,
+            'discovery_fills': 0,
+            'ranked_hits': 0,
+        }
+        # Configurações
+        self.PAGE_SIZE = 50
+        self.MAX_SHARERS = 3
+        self.CANDIDATES = 500
+        self.RANKED_TTL = 900  # 15 minutos de cache da ordem
+        self.MAX_RANKED_SESSIONS = 5000
+        # Etapa de ranking (qualquer objeto com rank(db, viewer_id, activity, as_of))
+        self.ranker = feed_ranker
+        # (usuário, as_of) -> ((score, id) ranqueados, atividade mais antiga se há mais itens, momento), LRU
+        self.ranked: "OrderedDict[Tuple[int, datetime], Tuple[List[Tuple[float, int]], Optional[datetime], float]]" = OrderedDict()
+
+    def sources(self, db: Session, viewer_id: int) -> Set[int]:
+        """Usuários cujos compartilhamentos entram no feed"""
+        return social_graph.following(db, viewer_id) | social_graph.friends(db, viewer_id) | {viewer_id}
+
+    def candidates(
+        self, db: Session, viewer_id: int, sources: Set[int], limit: int,
+        before: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Dict[int, datetime]:
+        """Itens mais recentes do feed: post_id -> data da atividade
+
+        before é o cursor da ordem cronológica (exclusivo); until fixa o
+        instante do ranking (inclusivo) em todas as fontes.
+        """
+        def bounded(query, column):
+            if before:
+                query = query.where(column < before)
+            if until:
+                query = query.where(column <= until)
+            return query
+
+        entries = timeline.entries(db, viewer_id, limit, before, until)
+        if not entries and before is None and timeline.seed(db, viewer_id, sources):
+            entries = timeline.entries(db, viewer_id, limit, before, until)
+        activity = dict(entries)
+
+        # Autores sem fan-out para seguidores: mesclados na leitura
+        celebrities = timeline.celebrities(db, social_graph.following(db, viewer_id))
+        if celebrities:
+            self.stats['celebrity_merges'] += 1
+            for query in (
+                select(Post.id, Post.created_at).where(Post.author_id.in_(celebrities), Post.deleted_at.is_(None)),
+                select(Share.post_id, Share.created_at).where(Share.user_id.in_(celebrities)),
+            ):
+                query = bounded(query, query.selected_columns[1])
+                for post_id, created_at in db.execute(query.order_by(query.selected_columns[1].desc()).limit(limit)):
+                    if created_at > activity.get(post_id, datetime.min):
+                        activity[post_id] = created_at
+
+        # Descoberta: completa a primeira página com posts recentes
+        if before is None and len(activity) < limit:
+            self.stats['discovery_fills'] += 1
+            for post_id, created_at in db.execute(
+                bounded(select(Post.id, Post.created_at).where(Post.deleted_at.is_(None)), Post.created_at).order_by(
+                    Post.created_at.desc()
+                ).limit(limit)
+            ):
+                activity.setdefault(post_id, created_at)
+        return activity
+
+    def newest(self, activity: Dict[int, datetime]) -> Dict[int, datetime]:
+        """Só os CANDIDATES itens mais recentes
+
+        A timeline e os autores com muitos seguidores rendem até CANDIDATES
+        itens cada; o que passar do corte fica para a continuação cronológica,
+        que começa (exclusive) no mais antigo que sobrou. Itens na mesma data
+        do corte saem todos, para não serem pulados por ela.
+        """
+        if len(activity) <= self.CANDIDATES:
+            return activity
+        ordered = sorted(activity.items(), key=lambda item: item[1], reverse=True)
+        cutoff = ordered[self.CANDIDATES][1]
+        kept = [item for item in ordered[:self.CANDIDATES] if item[1] > cutoff]
+        return dict(kept or ordered[:self.CANDIDATES])
+
+    def hydrate(
+        self, db: Session, viewer_id: int, ordered: List[int], sources: Set[int]
+    ) -> Tuple[List[Post], Dict[int, List[Dict[str, Any]]]]:
+        """Posts visíveis da página, na ordem dada, e quem entre amigos e seguidos os compartilhou"""
+        posts = {}
+        if ordered:
+            for post in db.query(Post).join(User, User.id == Post.author_id).options(
+                contains_eager(Post.author)
+            ).filter(Post.id.in_(ordered), visibility.post_filter(db, viewer_id)):
+                posts[post.id] = post
+        page = [posts[post_id] for post_id in ordered if post_id in posts]
+
+        sharer_ids: Dict[int, List[int]] = {}
+        if page:
+            for post_id, user_id in db.query(Share.post_id, Share.user_id).filter(
+                Share.post_id.in_([post.id for post in page]),
+                Share.user_id.in_(sources)
+            ).order_by(Share.created_at.desc()):
+                ids = sharer_ids.setdefault(post_id, [])
+                if len(ids) < self.MAX_SHARERS:
+                    ids.append(user_id)
+        shared_by = self.sharers(db, sharer_ids)
+
+        self.stats['pages'] += 1
+        self.stats['share_items'] += len(shared_by)
+        return page, shared_by
+
+    def page(
+        self, db: Session, viewer_id: int, limit: int, before: Optional[datetime] = None
+    ) -> Tuple[List[Post], Dict[int, List[Dict[str, Any]]], Optional[datetime]]:
+        """Página em ordem cronológica: (posts, shared_by por post, cursor da próxima página)"""
+        sources = self.sources(db, viewer_id)
+        activity = self.candidates(db, viewer_id, sources, limit, before)
+        ordered = sorted(activity, key=lambda post_id: activity[post_id], reverse=True)[:limit]
+        page, shared_by = self.hydrate(db, viewer_id, ordered, sources)
+        # O cursor segue os candidatos: posts invisíveis só encurtam a página
+        next_cursor = activity[ordered[-1]] if len(ordered) == limit else None
+        return page, shared_by, next_cursor
+
+    def ranked_page(
+        self, db: Session, viewer_id: int, limit: int, as_of: datetime,
+        after: Optional[Tuple[float, int]] = None
+    ) -> Tuple[List[Post], Dict[int, List[Dict[str, Any]]], Optional[Tuple]]:
+        """Página ordenada por relevância (ver utils/feed_ranking.py)
+
+        Os CANDIDATES itens mais recentes até as_of são ranqueados e a página
+        seguinte continua depois do (score, id) do último item, levado no
+        cursor: qualquer processo refaz o mesmo ranking a partir de as_of, sem
+        depender de estado guardado. A ordem fica em cache por RANKED_TTL só
+        para poupar o recálculo. Esgotados os candidatos, o feed continua em
+        ordem cronológica a partir do candidato mais antigo.
+
+        O cursor devolvido é ("ranked", as_of, score, id), ("recent", before) ou None.
+        """
+        sources = self.sources(db, viewer_id)
+        key = (viewer_id, as_of)
+        cached = self.ranked.get(key)
+        if cached is not None and time.monotonic() - cached[2] < self.RANKED_TTL:
+            ordered, oldest = cached[0], cached[1]
+            self.ranked.move_to_end(key)
+            self.stats['ranked_hits'] += 1
+        else:
+            candidates = self.candidates(db, viewer_id, sources, self.CANDIDATES, until=as_of)
+            activity = self.newest(candidates)
+            ordered = self.ranker.rank(db, viewer_id, activity, as_of)
+            # A continuação cronológica parte do mais antigo ranqueado, se pode haver mais itens
+            oldest = min(activity.values()) if activity and len(candidates) >= self.CANDIDATES else None
+            self.ranked[key] = (ordered, oldest, time.monotonic())
+            while len(self.ranked) > self.MAX_RANKED_SESSIONS:
+                self.ranked.popitem(last=False)
+
+        start = 0
+        if after is not None:
+            # Keyset: ordered é decrescente em (score, id)
+            start = next((index for index, item in enumerate(ordered) if item < after), len(ordered))
+        page_items = ordered[start:start + limit]
+        page, shared_by = self.hydrate(db, viewer_id, [post_id for _, post_id in page_items], sources)
+        if start + limit < len(ordered):
+            next_cursor = ("ranked", as_of, *page_items[-1])
+        elif oldest is not None:
+            next_cursor = ("recent", oldest)
+        else:
+            next_cursor = None
+        return page, shared_by, next_cursor
+
+    def sharers(self, db: Session, sharer_ids: Dict[int, List[int]]) -> Dict[int, List[Dict[str, Any]]]:
+        """Resumo de quem compartilhou cada post (uma consulta)"""
+        user_ids = {user_id for ids in sharer_ids.values() for user_id in ids}
+        if not user_ids:
+            return {}
+        users = {
+            user.id: {
+                "id": user.id,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "avatar": user.avatar
+            }
+            for user in db.query(User.id, User.first_name, User.last_name, User.avatar).filter(
+                User.id.in_(user_ids)
+            )
+        }
+        return {
+            post_id: [users[user_id] for user_id in ids if user_id in users]
+            for post_id, ids in sharer_ids.items()
+        }
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global do feed
+feed = Feed()
@@ -0,0 +1,135 @@
+"""
+Ordenação do feed por relevância
+
+Etapa de ranking aplicada sobre os candidatos do feed (os CANDIDATES itens
+mais recentes da timeline, ver utils/feed.py). Cada candidato recebe
+
+    score = (1 + AFFINITY_WEIGHT * afinidade + ENGAGEMENT_WEIGHT * engajamento)
+            * 0.5 ** (idade_em_horas / HALF_LIFE_HOURS)
+
+- afinidade: interações recentes do usuário com o autor (reações, comentários
+  e stories vistas), em log1p; três consultas agrupadas por autor, mantidas
+  em cache por AFFINITY_TTL;
+- engajamento: log1p das reações, comentários e compartilhamentos do post.
+
+Os pesos e a pontuação ficam numa tabela de features montada em uma passada
+sobre o lote, sem consultas por item. Outra estratégia de ordenação pode ser
+plugada trocando feed.ranker por um objeto com o mesmo rank().
+"""
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import Post, Reaction, Comment, Story, StoryView
+
+
+class FeedRanker:
+    def __init__(self):
+        # user_id -> (autor -> afinidade), LRU
+        self.affinities: "OrderedDict[int, Dict[int, float]]" = OrderedDict()
+        self.loaded_at: Dict[int, float] = {}
+        # Estatísticas
+        self.stats = {
+            'ranked_batches': 0,
+            'ranked_items': 0,
+            'affinity_loads': 0,
+            'affinity_hits': 0,
+        }
+        # Configurações
+        self.HALF_LIFE_HOURS = 12.0
+        self.AFFINITY_WEIGHT = 1.0
+        self.ENGAGEMENT_WEIGHT = 0.35
+        self.REACTION_WEIGHT = 1.0
+        self.COMMENT_WEIGHT = 2.0
+        self.STORY_VIEW_WEIGHT = 0.5
+        self.AFFINITY_WINDOW = timedelta(days=30)
+        self.AFFINITY_TTL = 600  # 10 minutos
+        self.MAX_USERS = 20000
+
+    def affinity(self, db: Session, user_id: int) -> Dict[int, float]:
+        """Afinidade do usuário com cada autor com quem interagiu na janela"""
+        cached = self.affinities.get(user_id)
+        if cached is not None and time.monotonic() - self.loaded_at[user_id] < self.AFFINITY_TTL:
+            self.affinities.move_to_end(user_id)
+            self.stats['affinity_hits'] += 1
+            return cached
+
+        since = datetime.utcnow() - self.AFFINITY_WINDOW
+        interactions: Dict[int, float] = {}
+        for weight, query in (
+            (self.REACTION_WEIGHT, select(Post.author_id, func.count()).join(
+                Reaction, Reaction.post_id == Post.id
+            ).where(Reaction.user_id == user_id, Reaction.created_at >= since).group_by(Post.author_id)),
+            (self.COMMENT_WEIGHT, select(Post.author_id, func.count()).join(
+                Comment, Comment.post_id == Post.id
+            ).where(Comment.author_id == user_id, Comment.created_at >= since).group_by(Post.author_id)),
+            (self.STORY_VIEW_WEIGHT, select(Story.author_id, func.count()).join(
+                StoryView, StoryView.story_id == Story.id
+            ).where(StoryView.viewer_id == user_id, StoryView.viewed_at >= since).group_by(Story.author_id)),
+        ):
+            for author_id, count in db.execute(query):
+                interactions[author_id] = interactions.get(author_id, 0.0) + weight * count
+        interactions.pop(user_id, None)
+
+        affinity = {author_id: math.log1p(total) for author_id, total in interactions.items()}
+        self.affinities[user_id] = affinity
+        self.loaded_at[user_id] = time.monotonic()
+        while len(self.affinities) > self.MAX_USERS:
+            evicted, _ = self.affinities.popitem(last=False)
+            self.loaded_at.pop(evicted, None)
+        self.stats['affinity_loads'] += 1
+        return affinity
+
+    def invalidate(self, user_id: int):
+        self.affinities.pop(user_id, None)
+        self.loaded_at.pop(user_id, None)
+
+    def rank(
+        self, db: Session, viewer_id: int, activity: Dict[int, datetime], as_of: datetime
+    ) -> List[Tuple[float, int]]:
+        """(score, id) dos candidatos do mais para o menos relevante (empate: maior id primeiro)
+
+        A idade é medida em relação a as_of, então o mesmo lote ranqueado com o
+        mesmo as_of dá a mesma ordem.
+        """
+        scores = self.scores(db, viewer_id, activity, as_of)
+        return sorted(((score, post_id) for post_id, score in scores.items()), reverse=True)
+
+    def scores(
+        self, db: Session, viewer_id: int, activity: Dict[int, datetime], as_of: datetime
+    ) -> Dict[int, float]:
+        """Pontuação de cada candidato"""
+        if not activity:
+            return {}
+        affinity = self.affinity(db, viewer_id)
+        features = db.execute(
+            select(Post.id, Post.author_id, Post.reactions_count, Post.comments_count, Post.shares_count).where(
+                Post.id.in_(list(activity))
+            )
+        ).all()
+
+        decay = math.log(0.5) / (self.HALF_LIFE_HOURS * 3600)
+        scores = {}
+        for post_id, author_id, reactions, comments, shares in features:
+            age = max((as_of - activity[post_id]).total_seconds(), 0.0)
+            engagement = math.log1p((reactions or 0) + 2 * (comments or 0) + 3 * (shares or 0))
+            scores[post_id] = (
+                1.0
+                + self.AFFINITY_WEIGHT * affinity.get(author_id, 0.0)
+                + self.ENGAGEMENT_WEIGHT * engagement
+            ) * math.exp(decay * age)
+
+        self.stats['ranked_batches'] += 1
+        self.stats['ranked_items'] += len(scores)
+        return scores
+
+    def get_stats(self):
+        return {**self.stats, 'cached_users': len(self.affinities)}
+
+# Instância global do ranking do feed
+feed_ranker = FeedRanker()
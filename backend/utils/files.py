@@ -111,3 +111,21 @@ def ensure_upload_directories():
     
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
+
+def delete_uploaded_file(url: str) -> bool:
+    """Delete a file saved under UPLOAD_DIR, given its URL ("/uploads/...") or path
+
+    External URLs and paths outside UPLOAD_DIR are ignored. Returns True if a
+    file was removed.
+    """
+    if not url:
+        return False
+    root = Path(UPLOAD_DIR).resolve()
+    relative = url.lstrip("/")
+    if not relative.startswith(f"{UPLOAD_DIR}/"):
+        return False
+    file_path = (root.parent / relative).resolve()
+    if root not in file_path.parents or not file_path.is_file():
+        return False
+    file_path.unlink()
+    return True
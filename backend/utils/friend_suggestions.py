@@ -0,0 +1,224 @@
+"""
+Sugestões de amizade por amigos de amigos
+
+Os candidatos são os vizinhos a 2 saltos do usuário, contados com uma única
+consulta sobre as amizades aceitas dos seus amigos. A pontuação combina o
+número de amigos em comum com bônus por follow (em qualquer sentido) e
+mesma localização. As contagens ficam em cache por usuário e são
+atualizadas incrementalmente quando uma amizade é aceita; remoções apenas
+invalidam as entradas afetadas.
+"""
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import User, Friendship
+from utils.social_graph import social_graph
+
+
+class FriendSuggestions:
+    def __init__(self):
+        # user_id -> (candidato -> amigos em comum, momento do cálculo) (LRU)
+        self.results: "OrderedDict[int, Tuple[Counter, float]]" = OrderedDict()
+        # Estatísticas
+        self.stats = {
+            'hits': 0,
+            'computations': 0,
+            'incremental_updates': 0,
+        }
+        # Configurações
+        self.RESULT_TTL = 1800  # 30 minutos
+        self.MAX_USERS = 20000
+        self.MUTUAL_WEIGHT = 10
+        self.FOLLOW_BONUS = 5
+        self.LOCATION_BONUS = 3
+        self.CANDIDATE_FACTOR = 3  # candidatos carregados por sugestão pedida
+        self.MAX_MUTUAL_BATCH = 100
+
+    def mutual_counts(self, db: Session, user_id: int) -> Counter:
+        """Contagem de amigos em comum com cada vizinho a 2 saltos"""
+        cached = self.results.get(user_id)
+        if cached and time.monotonic() - cached[1] < self.RESULT_TTL:
+            self.results.move_to_end(user_id)
+            self.stats['hits'] += 1
+            return cached[0]
+        return self.compute(db, user_id)
+
+    def compute(self, db: Session, user_id: int) -> Counter:
+        """Recalcular os candidatos com uma única consulta agregada"""
+        friend_ids = social_graph.friends(db, user_id)
+        counts = Counter()
+
+        if friend_ids:
+            # Cada lado da união credita só a outra ponta da amizade: um par de
+            # amigos do usuário conta uma vez para cada um
+            for (candidate_id,) in db.query(Friendship.addressee_id).filter(
+                Friendship.requester_id.in_(friend_ids),
+                Friendship.status == "accepted"
+            ).union_all(db.query(Friendship.requester_id).filter(
+                Friendship.addressee_id.in_(friend_ids),
+                Friendship.status == "accepted"
+            )):
+                counts[candidate_id] += 1
+            counts.pop(user_id, None)
+
+        self.results[user_id] = (counts, time.monotonic())
+        self.results.move_to_end(user_id)
+        self.stats['computations'] += 1
+
+        while len(self.results) > self.MAX_USERS:
+            self.results.popitem(last=False)
+
+        return counts
+
+    def suggest(self, db: Session, user: User, limit: int = 10) -> List[Dict[str, Any]]:
+        """Sugestões ordenadas por pontuação, completadas com outros usuários se faltarem"""
+        exclude_ids = social_graph.excluded_from_suggestions(db, user.id)
+        following = social_graph.following(db, user.id)
+        followers = social_graph.followers(db, user.id)
+        counts = self.mutual_counts(db, user.id)
+
+        def base_score(candidate_id: int) -> int:
+            score = counts.get(candidate_id, 0) * self.MUTUAL_WEIGHT
+            if candidate_id in following or candidate_id in followers:
+                score += self.FOLLOW_BONUS
+            return score
+
+        candidate_ids = (set(counts) | following | followers) - exclude_ids
+        ranked_ids = sorted(candidate_ids, key=lambda c: (-base_score(c), c))
+        ranked_ids = ranked_ids[:limit * self.CANDIDATE_FACTOR]
+
+        candidates = db.query(User).filter(
+            User.id.in_(ranked_ids),
+            User.is_active == True
+        ).all() if ranked_ids else []
+
+        # Completar com usuários da mesma localização e depois quaisquer outros
+        if len(candidates) < limit:
+            seen_ids = exclude_ids | {c.id for c in candidates}
+            fill_query = db.query(User).filter(User.is_active == True, ~User.id.in_(seen_ids))
+            if user.location:
+                candidates += fill_query.filter(User.location == user.location).limit(limit - len(candidates)).all()
+                seen_ids |= {c.id for c in candidates}
+                fill_query = db.query(User).filter(User.is_active == True, ~User.id.in_(seen_ids))
+            if len(candidates) < limit:
+                candidates += fill_query.limit(limit - len(candidates)).all()
+
+        def score(candidate: User) -> int:
+            value = base_score(candidate.id)
+            if user.location and candidate.location == user.location:
+                value += self.LOCATION_BONUS
+            return value
+
+        candidates.sort(key=lambda c: (-score(c), c.id))
+
+        return [
+            {
+                "id": candidate.id,
+                "first_name": candidate.first_name,
+                "last_name": candidate.last_name,
+                "username": candidate.username,
+                "avatar": candidate.avatar,
+                "bio": candidate.bio,
+                "location": candidate.location,
+                "is_verified": candidate.is_verified,
+                "mutual_friends": counts.get(candidate.id, 0)
+            }
+            for candidate in candidates[:limit]
+        ]
+
+    def mutual_friends(
+        self, db: Session, user_id: int, target_ids: Iterable[int], sample_size: int = 0
+    ) -> Dict[int, Dict[str, Any]]:
+        """Amigos em comum com vários usuários de uma vez
+
+        As contagens saem do cache de vizinhos a 2 saltos; as amostras (se
+        pedidas) custam uma consulta agrupada e uma busca dos usuários.
+        """
+        target_ids = [t for t in dict.fromkeys(target_ids) if t != user_id]
+        counts = self.mutual_counts(db, user_id)
+        result = {
+            target_id: {"count": counts.get(target_id, 0), "sample": []}
+            for target_id in target_ids
+        }
+        if not sample_size or not target_ids:
+            return result
+
+        friend_ids = social_graph.friends(db, user_id)
+        samples: Dict[int, List[int]] = {}
+        # Cada lado da união devolve o par (alvo, amigo em comum) explicitamente
+        for target_id, mutual_id in db.query(Friendship.requester_id, Friendship.addressee_id).filter(
+            Friendship.requester_id.in_(target_ids),
+            Friendship.status == "accepted",
+            Friendship.addressee_id.in_(friend_ids)
+        ).union_all(db.query(Friendship.addressee_id, Friendship.requester_id).filter(
+            Friendship.addressee_id.in_(target_ids),
+            Friendship.status == "accepted",
+            Friendship.requester_id.in_(friend_ids)
+        )) if friend_ids else []:
+            target_sample = samples.setdefault(target_id, [])
+            if len(target_sample) < sample_size and mutual_id not in target_sample:
+                target_sample.append(mutual_id)
+
+        sample_ids = {mutual_id for sample in samples.values() for mutual_id in sample}
+        users = {
+            user.id: user
+            for user in db.query(User).filter(User.id.in_(sample_ids))
+        } if sample_ids else {}
+
+        for target_id, sample in samples.items():
+            result[target_id]["sample"] = [
+                {
+                    "id": users[mutual_id].id,
+                    "first_name": users[mutual_id].first_name,
+                    "last_name": users[mutual_id].last_name,
+                    "avatar": users[mutual_id].avatar
+                }
+                for mutual_id in sample if mutual_id in users
+            ]
+        return result
+
+    # Atualização incremental (chamar depois dos hooks do social_graph)
+
+    def on_friendship_accepted(self, user_id: int, other_id: int):
+        """Nova amizade: cada lado herda os amigos do outro como candidatos"""
+        for a, b in ((user_id, other_id), (other_id, user_id)):
+            cached = self.results.get(a)
+            if cached:
+                b_entry = social_graph.entries.get(b)
+                if b_entry is None:
+                    self.invalidate(a)
+                else:
+                    for candidate_id in b_entry['friends']:
+                        if candidate_id != a:
+                            cached[0][candidate_id] += 1
+                    self.stats['incremental_updates'] += 1
+
+            # Os demais amigos de a ganham b como amigo em comum
+            a_entry = social_graph.entries.get(a)
+            if a_entry is None:
+                continue
+            for friend_id in a_entry['friends']:
+                friend_cached = self.results.get(friend_id)
+                if friend_id != b and friend_cached:
+                    friend_cached[0][b] += 1
+
+    def on_friendship_removed(self, user_id: int, other_id: int):
+        """Amizade desfeita: invalidar os dois lados e os amigos de cada um"""
+        for a in (user_id, other_id):
+            self.invalidate(a)
+            entry = social_graph.entries.get(a)
+            if entry:
+                for friend_id in entry['friends']:
+                    self.invalidate(friend_id)
+
+    def invalidate(self, user_id: int):
+        self.results.pop(user_id, None)
+
+    def get_stats(self):
+        return {**self.stats, 'users_cached': len(self.results)}
+
+# Instância global do motor de sugestões
+friend_suggestions = FriendSuggestions()
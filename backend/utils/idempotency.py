@@ -0,0 +1,54 @@
+"""
+Chaves de idempotência
+
+Clientes podem enviar o header Idempotency-Key em escritas que costumam ser
+repetidas (toque duplo, reenvio após timeout). A primeira resposta para
+(usuário, rota, chave) fica guardada por KEY_TTL; repetições recebem a mesma
+resposta sem tocar no banco.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class IdempotencyCache:
+    def __init__(self):
+        # (usuário, rota, chave) -> (resposta, momento)
+        self.responses: "OrderedDict[Tuple[int, str, str], Tuple[Any, float]]" = OrderedDict()
+        # Estatísticas
+        self.stats = {
+            'hits': 0,
+            'stored': 0,
+        }
+        # Configurações
+        self.KEY_TTL = 600  # 10 minutos
+        self.MAX_KEYS = 50000
+        self.MAX_KEY_LENGTH = 128
+
+    def get(self, user_id: int, scope: str, key: Optional[str]) -> Optional[Any]:
+        """Resposta já dada para a chave (None se não há chave ou ela expirou)"""
+        if not key or len(key) > self.MAX_KEY_LENGTH:
+            return None
+        cached = self.responses.get((user_id, scope, key))
+        if not cached:
+            return None
+        if time.monotonic() - cached[1] >= self.KEY_TTL:
+            del self.responses[(user_id, scope, key)]
+            return None
+        self.stats['hits'] += 1
+        return cached[0]
+
+    def store(self, user_id: int, scope: str, key: Optional[str], response: Any):
+        if not key or len(key) > self.MAX_KEY_LENGTH:
+            return
+        self.responses[(user_id, scope, key)] = (response, time.monotonic())
+        self.responses.move_to_end((user_id, scope, key))
+        self.stats['stored'] += 1
+        while len(self.responses) > self.MAX_KEYS:
+            self.responses.popitem(last=False)
+
+    def get_stats(self):
+        return {**self.stats, 'keys': len(self.responses)}
+
+# Instância global das chaves de idempotência
+idempotency_cache = IdempotencyCache()
@@ -0,0 +1,213 @@
+"""
+Índice em memória de usernames e e-mails
+
+Atende as checagens de disponibilidade do cadastro e da edição de perfil sem
+ir ao banco a cada tecla:
+- um filtro de Bloom sobre usernames e e-mails responde "com certeza
+  disponível" sem consulta;
+- uma lista ordenada de usernames (com o dono de cada um) responde o caso
+  positivo e as buscas por prefixo do typeahead;
+- e-mails positivos no Bloom são confirmados no banco, já que não guardamos
+  os endereços.
+
+O índice é montado no startup com uma leitura em streaming da tabela users e
+depois recebe os cadastros/renomeações deste processo; uma varredura
+incremental por id captura cadastros feitos por outras instâncias. Enquanto
+não estiver pronto, as checagens vão direto ao banco. A unicidade real
+continua garantida pelos índices únicos da tabela.
+"""
+import asyncio
+import hashlib
+import math
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models import User
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class IdentifierIndex:
+    def __init__(self):
+        self.ready = False
+        self.usernames: List[str] = []  # ordenada, em minúsculas
+        self.username_owner: Dict[str, int] = {}
+        self.last_user_id = 0
+        # Estatísticas
+        self.stats = {
+            'bloom_negatives': 0,
+            'index_answers': 0,
+            'db_fallbacks': 0,
+        }
+        # Configurações
+        self.EXPECTED_IDENTIFIERS = 4_000_000  # usernames + e-mails
+        self.BLOOM_ERROR_RATE = 0.01
+        self.SCAN_BATCH = 10000
+        self.REFRESH_INTERVAL = 60  # segundos entre varreduras incrementais
+        self.bloom = BloomFilter(self.EXPECTED_IDENTIFIERS, self.BLOOM_ERROR_RATE)
+
+    @staticmethod
+    def normalize(value: str) -> str:
+        return value.strip().lower()
+
+    # Construção
+
+    def rebuild(self):
+        """Montar o índice do zero com uma leitura em streaming (roda em thread)"""
+        bloom = BloomFilter(self.EXPECTED_IDENTIFIERS, self.BLOOM_ERROR_RATE)
+        owners: Dict[str, int] = {}
+        last_user_id = 0
+
+        db = SessionLocal()
+        try:
+            for user_id, username, email in db.query(
+                User.id, User.username, User.email
+            ).order_by(User.id).yield_per(self.SCAN_BATCH):
+                bloom.add("e:" + self.normalize(email))
+                if username:
+                    bloom.add("u:" + self.normalize(username))
+                    owners[self.normalize(username)] = user_id
+                last_user_id = user_id
+        finally:
+            db.close()
+
+        self.bloom = bloom
+        self.username_owner = owners
+        self.usernames = sorted(owners)
+        self.last_user_id = last_user_id
+        self.ready = True
+
+    def refresh(self):
+        """Incorporar usuários criados depois da última leitura (roda em thread)"""
+        db = SessionLocal()
+        try:
+            for user_id, username, email in db.query(
+                User.id, User.username, User.email
+            ).filter(User.id > self.last_user_id).order_by(User.id).yield_per(self.SCAN_BATCH):
+                self.add_user(user_id, email, username)
+        finally:
+            db.close()
+
+    # Hooks de escrita
+
+    def add_user(self, user_id: int, email: str, username: Optional[str] = None):
+        """Registrar um usuário recém-cadastrado"""
+        self.bloom.add("e:" + self.normalize(email))
+        if username:
+            self.rename(user_id, None, username)
+        self.last_user_id = max(self.last_user_id, user_id)
+
+    def rename(self, user_id: int, old_username: Optional[str], new_username: Optional[str]):
+        """Trocar o username de um usuário (o antigo sai da lista; o Bloom não remove)"""
+        if old_username:
+            old_key = self.normalize(old_username)
+            if self.username_owner.get(old_key) == user_id:
+                del self.username_owner[old_key]
+                position = bisect_left(self.usernames, old_key)
+                if position < len(self.usernames) and self.usernames[position] == old_key:
+                    self.usernames.pop(position)
+        if new_username:
+            new_key = self.normalize(new_username)
+            self.bloom.add("u:" + new_key)
+            if new_key not in self.username_owner:
+                insort(self.usernames, new_key)
+            self.username_owner[new_key] = user_id
+
+    def remove_user(self, user_id: int, email: str, username: Optional[str] = None):
+        """Tirar um usuário apagado da lista de usernames
+
+        O Bloom não remove: o e-mail (confirmado no banco) e o username
+        (confirmado em username_owner) ficam só como falso positivo.
+        """
+        if username:
+            self.rename(user_id, username, None)
+
+    # Consultas
+
+    def username_owner_id(self, db: Session, username: str) -> Optional[int]:
+        """Id do dono do username, ou None se estiver livre"""
+        key = self.normalize(username)
+        if not self.ready:
+            self.stats['db_fallbacks'] += 1
+            return db.query(User.id).filter(User.username == username).scalar()
+        if "u:" + key not in self.bloom:
+            self.stats['bloom_negatives'] += 1
+            return None
+        self.stats['index_answers'] += 1
+        return self.username_owner.get(key)
+
+    def email_exists(self, db: Session, email: str) -> bool:
+        key = self.normalize(email)
+        if self.ready and "e:" + key not in self.bloom:
+            self.stats['bloom_negatives'] += 1
+            return False
+        self.stats['db_fallbacks'] += 1
+        return db.query(User.id).filter(User.email == email).first() is not None
+
+    def username_prefix(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Usernames que começam com o prefixo, em ordem alfabética"""
+        key = self.normalize(prefix)
+        if not key or not self.ready:
+            return []
+        results = []
+        position = bisect_left(self.usernames, key)
+        while position < len(self.usernames) and len(results) < limit:
+            username = self.usernames[position]
+            if not username.startswith(key):
+                break
+            results.append((username, self.username_owner[username]))
+            position += 1
+        return results
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'ready': self.ready,
+            'usernames': len(self.usernames),
+        }
+
+# Instância global do índice
+identifier_index = IdentifierIndex()
+
+# Montar o índice e mantê-lo atualizado com cadastros de outras instâncias
+async def identifier_index_task():
+    """Task de construção e atualização incremental do índice"""
+    try:
+        await asyncio.to_thread(identifier_index.rebuild)
+        print(f"✅ Índice de usernames/e-mails pronto: {identifier_index.get_stats()}")
+    except Exception as e:
+        print(f"❌ Erro ao montar índice de usernames/e-mails: {e}")
+        return
+
+    while True:
+        await asyncio.sleep(identifier_index.REFRESH_INTERVAL)
+        try:
+            await asyncio.to_thread(identifier_index.refresh)
+        except Exception as e:
+            print(f"❌ Erro ao atualizar índice de usernames/e-mails: {e}")
+
+# Função para iniciar a task do índice
+def start_identifier_index():
+    asyncio.create_task(identifier_index_task())
@@ -0,0 +1,237 @@
+"""
+Mensagens diretas
+
+Cada par de usuários tem uma linha em conversations com a última mensagem e,
+para cada lado, as não lidas e a última mensagem lida (marca d'água). Enviar
+uma mensagem grava a mensagem e atualiza a conversa na mesma transação; a
+lista de conversas lê apenas conversations pelos índices de cada lado, sem
+agrupar mensagens.
+
+Leituras são confirmadas em lote: marcar a mensagem N como lida marca todas
+as anteriores da conversa (um UPDATE por faixa de id). As leituras e a
+digitação passam pelo chat_coalescer, que agrupa os eventos por intervalo.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.websockets import manager
+from models import User, Conversation, Message
+
+# Texto da prévia para mensagens sem conteúdo de texto
+MEDIA_PREVIEWS = {
+    "image": "📷 Foto",
+    "video": "🎥 Vídeo",
+    "audio": "🎤 Áudio",
+    "file": "📎 Arquivo",
+    "sticker": "Figurinha",
+}
+
+
+def user_summary(user: User) -> Dict[str, Any]:
+    return {
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "username": user.username,
+        "avatar": user.avatar
+    }
+
+
+class Messaging:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'sent': 0,
+            'conversations_created': 0,
+            'read_receipts': 0,
+            'read_receipts_skipped': 0,
+        }
+        # Configurações
+        self.PREVIEW_LENGTH = 200
+        self.MAX_CONTENT_LENGTH = 5000
+
+    def preview(self, content: Optional[str], message_type: str) -> str:
+        if content and message_type == "text":
+            return content[:self.PREVIEW_LENGTH]
+        return MEDIA_PREVIEWS.get(message_type, (content or "")[:self.PREVIEW_LENGTH])
+
+    def find_conversation(self, db: Session, user_id: int, other_id: int) -> Optional[Conversation]:
+        return db.query(Conversation).filter(Conversation.between(user_id, other_id)).first()
+
+    def get_or_create_conversation(self, db: Session, user_id: int, other_id: int) -> Conversation:
+        """Conversa do par, criada na primeira mensagem"""
+        conversation = self.find_conversation(db, user_id, other_id)
+        if conversation:
+            return conversation
+
+        low_id, high_id = Conversation.pair_key(user_id, other_id)
+        try:
+            with db.begin_nested():
+                conversation = Conversation(
+                    user_low_id=low_id, user_high_id=high_id,
+                    low_unread_count=0, high_unread_count=0,
+                    low_last_read_id=0, high_last_read_id=0
+                )
+                db.add(conversation)
+            self.stats['conversations_created'] += 1
+            return conversation
+        except IntegrityError:
+            # Criada em paralelo pela outra ponta
+            return self.find_conversation(db, user_id, other_id)
+
+    def send(
+        self, db: Session, sender: User, recipient_id: int, content: Optional[str],
+        message_type: str = "text", media_url: Optional[str] = None,
+        media_metadata: Optional[str] = None
+    ) -> Message:
+        """Gravar a mensagem e atualizar a conversa na mesma transação"""
+        conversation = self.get_or_create_conversation(db, sender.id, recipient_id)
+        now = datetime.utcnow()
+
+        message = Message(
+            conversation_id=conversation.id,
+            sender_id=sender.id,
+            recipient_id=recipient_id,
+            content=content,
+            message_type=message_type,
+            media_url=media_url,
+            media_metadata=media_metadata,
+            is_read=False,
+            created_at=now,
+            updated_at=now
+        )
+        db.add(message)
+        db.flush()
+
+        # Não lidas do destinatário incrementadas no banco (sem ler-modificar-gravar)
+        unread_column = getattr(Conversation, f"{conversation.side(recipient_id)}_unread_count")
+        db.execute(
+            update(Conversation).where(Conversation.id == conversation.id).values({
+                Conversation.last_message_id: message.id,
+                Conversation.last_sender_id: sender.id,
+                Conversation.last_message_preview: self.preview(content, message_type),
+                Conversation.last_message_type: message_type,
+                Conversation.last_message_at: now,
+                unread_column: unread_column + 1,
+            })
+        )
+        db.commit()
+        self.stats['sent'] += 1
+        return message
+
+    def conversations(
+        self, db: Session, user_id: int, limit: int,
+        before: Optional[tuple] = None
+    ) -> List[Conversation]:
+        """Conversas do usuário, mais recentes primeiro
+
+        Uma consulta: a união das buscas pelos dois índices de lado
+        (user_low_id / user_high_id, last_message_at). `before` é o cursor
+        (last_message_at, id) da última conversa da página anterior.
+        """
+        arms = []
+        for user_column in (Conversation.user_low_id, Conversation.user_high_id):
+            arm = db.query(Conversation).filter(
+                user_column == user_id,
+                Conversation.last_message_at.isnot(None)
+            )
+            if before:
+                before_at, before_id = before
+                arm = arm.filter(
+                    (Conversation.last_message_at < before_at) |
+                    ((Conversation.last_message_at == before_at) & (Conversation.id < before_id))
+                )
+            arms.append(arm)
+
+        return arms[0].union_all(arms[1]).order_by(
+            Conversation.last_message_at.desc(),
+            Conversation.id.desc()
+        ).limit(limit).all()
+
+    def history(
+        self, db: Session, conversation: Conversation, limit: int,
+        before_id: Optional[int] = None
+    ) -> List[Message]:
+        """Página do histórico (keyset por id), em ordem cronológica"""
+        query = db.query(Message).filter(Message.conversation_id == conversation.id)
+        if before_id:
+            query = query.filter(Message.id < before_id)
+        messages = query.order_by(Message.id.desc()).limit(limit).all()
+        messages.reverse()
+        return messages
+
+    def serialize(
+        self, message: Message, viewer_id: int, users: Dict[int, Dict[str, Any]],
+        conversation: Conversation
+    ) -> Dict[str, Any]:
+        """Mensagem no formato do chat; is_read vem da marca d'água do destinatário"""
+        recipient_mark = getattr(conversation, f"{conversation.side(message.recipient_id)}_last_read_id") or 0
+        return {
+            "id": message.id,
+            "conversation_id": message.conversation_id,
+            "sender": users.get(message.sender_id),
+            "recipient_id": message.recipient_id,
+            "content": message.content,
+            "message_type": message.message_type,
+            "media_url": message.media_url,
+            "is_read": message.id <= recipient_mark,
+            "created_at": message.created_at.isoformat(),
+            "is_own": message.sender_id == viewer_id
+        }
+
+    def mark_read(self, db: Session, conversation: Conversation, reader_id: int, up_to_id: int) -> Optional[int]:
+        """Marcar como lidas todas as mensagens recebidas até up_to_id
+
+        Devolve a nova marca d'água, ou None se ela já cobria up_to_id (nenhuma
+        escrita é feita).
+        """
+        side = conversation.side(reader_id)
+        last_read_column = getattr(Conversation, f"{side}_last_read_id")
+        unread_column = getattr(Conversation, f"{side}_unread_count")
+        previous_mark = getattr(conversation, f"{side}_last_read_id") or 0
+        up_to_id = min(up_to_id, conversation.last_message_id or 0)
+        if up_to_id <= previous_mark:
+            self.stats['read_receipts_skipped'] += 1
+            return None
+
+        # Uma faixa do índice (conversation_id, id)
+        db.execute(
+            update(Message).where(
+                Message.conversation_id == conversation.id,
+                Message.recipient_id == reader_id,
+                Message.id > previous_mark,
+                Message.id <= up_to_id
+            ).values(is_read=True),
+            execution_options={"synchronize_session": False}
+        )
+        remaining = db.execute(
+            select(func.count()).where(
+                Message.conversation_id == conversation.id,
+                Message.recipient_id == reader_id,
+                Message.id > up_to_id
+            )
+        ).scalar()
+        # Só avança a marca (duas leituras simultâneas não a fazem voltar)
+        db.execute(
+            update(Conversation).where(
+                Conversation.id == conversation.id,
+                last_read_column < up_to_id
+            ).values({last_read_column: up_to_id, unread_column: remaining})
+        )
+        db.commit()
+        db.refresh(conversation)
+        self.stats['read_receipts'] += 1
+        return up_to_id
+
+    async def deliver_message(self, recipient_id: int, payload: Dict[str, Any]):
+        await manager.send_message(recipient_id, {**payload, "is_own": False})
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global das mensagens diretas
+messaging = Messaging()
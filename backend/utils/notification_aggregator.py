@@ -0,0 +1,264 @@
+"""
+Agregação de notificações
+
+Coalesce notificações com a mesma chave (destinatário, tipo, post) dentro de
+uma janela de tempo numa única linha agrupada ("Ana e mais 312 pessoas
+reagiram ao seu post"), atualizada no lugar em vez de gerar novas linhas.
+Usado pelo worker do outbox, nunca no caminho da requisição.
+"""
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, tuple_, update
+
+from models import Notification, NotificationType
+
+# Tipos agregáveis e a frase usada na mensagem agrupada
+GROUP_PHRASES = {
+    NotificationType.POST_REACTION: "reagiram ao seu post",
+    NotificationType.POST_COMMENT: "comentaram no seu post",
+    NotificationType.POST_SHARE: "compartilharam seu post",
+}
+
+
+def build_notification_payload(intent: Dict[str, Any]) -> str:
+    """Serializar o payload WebSocket de uma intenção (sem id e created_at)"""
+    return json.dumps({
+        "type": intent['notification_type'].value,
+        "title": intent['title'],
+        "message": intent['message'],
+        "is_read": False,
+        "sender": intent['sender'],
+        "data": intent['extra'] or {}
+    })
+
+
+class NotificationAggregator:
+    def __init__(self):
+        # Grupos abertos: (recipient_id, notification_type, post_id) -> estado
+        self.open_groups: Dict[Tuple, Dict[str, Any]] = {}
+        # Estatísticas
+        self.stats = {
+            'coalesced': 0,
+            'groups_updated': 0,
+        }
+        # Configurações
+        self.WINDOW = timedelta(hours=6)  # janela deslizante desde a última atividade
+        self.MAX_RECENT_ACTORS = 3
+        self.MAX_OPEN_GROUPS = 100000
+
+    def group_key(self, intent: Dict[str, Any]) -> Optional[Tuple]:
+        """Chave de agrupamento, ou None se a intenção não é agregável"""
+        if intent['notification_type'] not in GROUP_PHRASES or intent['post_id'] is None:
+            return None
+        return (intent['recipient_id'], intent['notification_type'], intent['post_id'])
+
+    def coalesce(self, db, batch: List[Dict[str, Any]], now: datetime):
+        """Agrupar o lote: devolve (intenções a inserir, intenções já atualizadas no lugar)
+
+        As atualizações dos grupos existentes são executadas aqui com um único
+        executemany; o commit fica a cargo do chamador.
+        """
+        self.prune(now)
+
+        to_insert = []
+        keyed: Dict[Tuple, List[Dict[str, Any]]] = OrderedDict()
+        for intent in batch:
+            key = self.group_key(intent)
+            if key is None:
+                to_insert.append(intent)
+            else:
+                keyed.setdefault(key, []).append(intent)
+
+        missing = [key for key in keyed if key not in self.open_groups]
+        if missing:
+            self._load_groups(db, missing, now)
+
+        updates = []
+        for key, intents in keyed.items():
+            group = self.open_groups.get(key)
+            self.stats['coalesced'] += len(intents) - 1
+
+            if group is None:
+                group = self._new_group()
+                merged = self._merge(group, intents, now)
+                merged['group_key'] = key
+                to_insert.append(merged)
+            else:
+                self.stats['coalesced'] += 1
+                merged = self._merge(group, intents, now)
+                merged['notification_id'] = group['id']
+                updates.append(merged)
+
+        if updates:
+            to_insert.extend(self._apply_updates(db, updates, now))
+            updates = [intent for intent in updates if 'group_key' not in intent]
+
+        return to_insert, updates
+
+    def register(self, intents: List[Dict[str, Any]], ids: List[Optional[int]]):
+        """Abrir grupos para as linhas agrupáveis recém-inseridas"""
+        for intent, notification_id in zip(intents, ids):
+            key = intent.pop('group_key', None)
+            if key is None or notification_id is None:
+                continue
+            group = intent.pop('group_state')
+            group['id'] = notification_id
+            if len(self.open_groups) < self.MAX_OPEN_GROUPS:
+                self.open_groups[key] = group
+
+    def discard(self, intents: List[Dict[str, Any]]):
+        """Esquecer os grupos das intenções (recarregados do banco no próximo lote)"""
+        for intent in intents:
+            key = self.group_key(intent)
+            if key is not None:
+                self.open_groups.pop(key, None)
+
+    def prune(self, now: datetime):
+        """Fechar grupos sem atividade dentro da janela"""
+        cutoff = now - self.WINDOW
+        expired = [key for key, group in self.open_groups.items() if group['last_activity'] < cutoff]
+        for key in expired:
+            del self.open_groups[key]
+
+    def _new_group(self) -> Dict[str, Any]:
+        return {
+            'id': None,
+            'actor_ids': set(),
+            'actor_count': 0,
+            'recent_actors': [],
+            'last_activity': None,
+        }
+
+    def _load_groups(self, db, keys: List[Tuple], now: datetime):
+        """Reabrir grupos persistidos (ex.: após restart) com uma única consulta"""
+        rows = db.execute(
+            select(
+                Notification.id,
+                Notification.recipient_id,
+                Notification.notification_type,
+                Notification.post_id,
+                Notification.sender_id,
+                Notification.data,
+                Notification.created_at,
+            ).where(
+                tuple_(
+                    Notification.recipient_id,
+                    Notification.notification_type,
+                    Notification.post_id
+                ).in_(keys),
+                Notification.created_at >= now - self.WINDOW,
+                Notification.is_deleted == False
+            ).order_by(Notification.id)
+        ).all()
+
+        # A linha mais recente de cada chave vence
+        for row in rows:
+            data = json.loads(row.data) if row.data else {}
+            recent_actors = data.get('recent_actors') or []
+            actor_ids = {actor['id'] for actor in recent_actors}
+            if row.sender_id:
+                actor_ids.add(row.sender_id)
+            self.open_groups[(row.recipient_id, row.notification_type, row.post_id)] = {
+                'id': row.id,
+                'actor_ids': actor_ids,
+                'actor_count': data.get('actor_count', 1),
+                'recent_actors': recent_actors,
+                'last_activity': row.created_at,
+            }
+
+    def _merge(self, group: Dict[str, Any], intents: List[Dict[str, Any]], now: datetime) -> Dict[str, Any]:
+        """Incorporar intenções ao grupo e gerar a intenção agrupada resultante"""
+        for intent in intents:
+            actor = intent['sender']
+            if not actor:
+                continue
+            name = f"{actor['first_name']} {actor['last_name']}"
+            if actor['id'] not in group['actor_ids']:
+                group['actor_ids'].add(actor['id'])
+                group['actor_count'] += 1
+            group['recent_actors'] = [
+                {"id": actor['id'], "name": name}
+            ] + [a for a in group['recent_actors'] if a['id'] != actor['id']][:self.MAX_RECENT_ACTORS - 1]
+        group['last_activity'] = now
+
+        latest = intents[-1]
+        merged = dict(latest)
+        merged['group_state'] = group
+        if group['actor_count'] > 1 and group['recent_actors']:
+            others = group['actor_count'] - 1
+            merged['message'] = (
+                f"{group['recent_actors'][0]['name']} e mais {others} "
+                f"{'pessoa' if others == 1 else 'pessoas'} {GROUP_PHRASES[latest['notification_type']]}"
+            )
+        merged['extra'] = {
+            **(latest['extra'] or {}),
+            "actor_count": group['actor_count'],
+            "recent_actors": group['recent_actors'],
+        }
+        merged['data'] = json.dumps(merged['extra'])
+        merged['payload'] = build_notification_payload(merged)
+        return merged
+
+    def _apply_updates(self, db, updates: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+        """Atualizar as linhas agrupadas no lugar; devolve as que precisam ser reinseridas"""
+        # Grupos já lidos ou apagados voltam como não lidos (afeta o contador de não lidas)
+        group_ids = [intent['notification_id'] for intent in updates]
+        revived = set(db.execute(
+            select(Notification.id).where(
+                Notification.id.in_(group_ids),
+                (Notification.is_read == True) | (Notification.is_deleted == True)
+            )
+        ).scalars())
+        for intent in updates:
+            intent['revived'] = intent['notification_id'] in revived
+
+        table = Notification.__table__
+        result = db.execute(
+            update(table).where(table.c.id == bindparam('group_id')).values(
+                sender_id=bindparam('new_sender_id'),
+                message=bindparam('new_message'),
+                data=bindparam('new_data'),
+                is_read=False,
+                read_at=None,
+                is_deleted=False,
+                deleted_at=None,
+                created_at=now,
+            ),
+            [
+                {
+                    'group_id': intent['notification_id'],
+                    'new_sender_id': intent['sender_id'],
+                    'new_message': intent['message'],
+                    'new_data': intent['data'],
+                }
+                for intent in updates
+            ]
+        )
+        self.stats['groups_updated'] += len(updates)
+
+        if result.rowcount >= len(updates):
+            for intent in updates:
+                intent.pop('group_state', None)
+            return []
+
+        # Alguma linha agrupada sumiu (ex.: expurgada): reabrir esses grupos com um insert
+        existing = set(db.execute(
+            select(Notification.id).where(Notification.id.in_(group_ids))
+        ).scalars())
+        reinsert = []
+        for intent in updates:
+            if intent['notification_id'] in existing:
+                intent.pop('group_state', None)
+                continue
+            key = self.group_key(intent)
+            self.open_groups.pop(key, None)
+            intent.pop('notification_id')
+            intent['group_key'] = key
+            reinsert.append(intent)
+        return reinsert
+
+# Instância global do agregador
+notification_aggregator = NotificationAggregator()
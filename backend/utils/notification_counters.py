@@ -0,0 +1,102 @@
+"""
+Contadores de notificações não lidas em cache
+
+Evita o COUNT(*) sobre notifications a cada poll do badge: o contador de
+cada usuário é carregado uma vez, ajustado pelas rotas e pelo outbox a cada
+mudança e enviado via WebSocket. Entradas mais velhas que
+RECONCILE_INTERVAL são recontadas no banco, corrigindo qualquer desvio
+(ex.: várias instâncias da API).
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.websockets import manager
+from models import Notification
+
+
+class UnreadCounter:
+    def __init__(self):
+        # user_id -> (contagem, momento da última reconciliação)
+        self.counts: Dict[int, Tuple[int, float]] = {}
+        # Estatísticas
+        self.stats = {
+            'hits': 0,
+            'reconciliations': 0,
+        }
+        # Configurações
+        self.RECONCILE_INTERVAL = 300  # 5 minutos
+
+    def count_unread(self, db: Session, user_id: int) -> int:
+        """Contar não lidas diretamente no banco"""
+        return db.query(func.count(Notification.id)).filter(
+            Notification.recipient_id == user_id,
+            Notification.is_read == False,
+            Notification.is_deleted == False
+        ).scalar()
+
+    def get(self, db: Session, user_id: int) -> int:
+        """Obter contagem do cache, reconciliando se estiver velha"""
+        cached = self.counts.get(user_id)
+        if cached and time.monotonic() - cached[1] < self.RECONCILE_INTERVAL:
+            self.stats['hits'] += 1
+            return cached[0]
+        return self.reconcile(db, user_id)
+
+    def reconcile(self, db: Session, user_id: int) -> int:
+        """Recontar no banco e substituir o valor em cache"""
+        count = self.count_unread(db, user_id)
+        self.counts[user_id] = (count, time.monotonic())
+        self.stats['reconciliations'] += 1
+        return count
+
+    def adjust(self, user_id: int, delta: int):
+        """Somar delta ao contador (ignorado se o usuário não estiver em cache)"""
+        cached = self.counts.get(user_id)
+        if cached:
+            self.counts[user_id] = (max(cached[0] + delta, 0), cached[1])
+
+    def reset(self, user_id: int):
+        """Zerar o contador (marcar todas como lidas / limpar todas)"""
+        self.counts[user_id] = (0, time.monotonic())
+
+    def frame(self, user_id: int) -> Optional[str]:
+        """Frame WebSocket com a contagem atual, se conhecida"""
+        cached = self.counts.get(user_id)
+        if cached is None:
+            return None
+        return json.dumps({"type": "notification_count", "unread_count": cached[0]})
+
+    async def push(self, user_id: int):
+        """Enviar a contagem atual via WebSocket"""
+        frame = self.frame(user_id)
+        if frame and user_id in manager.active_connections:
+            await manager.send_personal_message(frame, user_id)
+
+    def clear_expired(self):
+        """Descartar entradas que já precisariam de reconciliação"""
+        now = time.monotonic()
+        expired = [
+            user_id for user_id, (_, loaded_at) in self.counts.items()
+            if now - loaded_at >= self.RECONCILE_INTERVAL
+        ]
+        for user_id in expired:
+            del self.counts[user_id]
+
+# Instância global dos contadores
+unread_counter = UnreadCounter()
+
+# Limpar contadores expirados periodicamente
+async def cleanup_counters_task():
+    """Task para limpeza periódica dos contadores"""
+    while True:
+        await asyncio.sleep(unread_counter.RECONCILE_INTERVAL)
+        unread_counter.clear_expired()
+
+# Função para iniciar a task de limpeza
+def start_counter_cleanup():
+    asyncio.create_task(cleanup_counters_task())
@@ -0,0 +1,298 @@
+"""
+Outbox de notificações
+
+As rotas apenas enfileiram intenções de notificação (sem tocar no banco);
+uma task de background agrupa as intenções (ver notification_aggregator),
+persiste o lote com um único INSERT multi-linha e depois entrega cada notificação via
+WebSocket com o payload já serializado, limitando a taxa de envio por
+destinatário.
+
+Um lote que falha ao persistir volta para a fila após RETRY_BACKOFF segundos
+(dobrando a cada tentativa); depois de MAX_ATTEMPTS tentativas as intenções
+são descartadas e registradas no log.
+"""
+import asyncio
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from core.database import SessionLocal
+from core.websockets import manager
+from models import Notification
+from utils.notification_aggregator import notification_aggregator
+from utils.notification_counters import unread_counter
+
+
+class NotificationOutbox:
+    def __init__(self):
+        # Intenções aguardando persistência
+        self.pending: List[Dict[str, Any]] = []
+        # Lotes que falharam, aguardando nova tentativa: (quando, intenções)
+        self.retrying: List[Tuple[float, List[Dict[str, Any]]]] = []
+        self.wakeup: Optional[asyncio.Event] = None
+        self.worker_task: Optional[asyncio.Task] = None
+        self.running = False
+        # Rate limit de pushes: último envio e frames adiados por destinatário
+        self.last_push: Dict[int, float] = {}
+        self.deferred: Dict[int, Dict[int, str]] = defaultdict(dict)
+        # Estatísticas
+        self.stats = {
+            'enqueued': 0,
+            'inserted': 0,
+            'delivered': 0,
+            'deferred': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'retried': 0,
+            'dropped': 0,
+        }
+        # Configurações
+        self.FLUSH_INTERVAL = 0.5  # segundos
+        self.BATCH_SIZE = 500
+        self.PUSH_INTERVAL = 2.0  # segundos entre pushes para o mesmo destinatário
+        self.MAX_ATTEMPTS = 5
+        self.RETRY_BACKOFF = 1.0  # segundos até a primeira nova tentativa
+
+    def enqueue(self, intent: Dict[str, Any]):
+        """Enfileirar uma intenção de notificação (sem I/O)"""
+        self.pending.append(intent)
+        self.stats['enqueued'] += 1
+
+        if self.wakeup and len(self.pending) >= self.BATCH_SIZE:
+            self.wakeup.set()
+
+    async def run(self):
+        """Loop do worker: descarrega a fila a cada intervalo ou quando enche"""
+        while self.running:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+            await self.deliver_deferred()
+
+    async def flush(self, include_waiting: bool = False):
+        """Persistir e entregar tudo o que estiver pendente
+
+        include_waiting: também tenta já os lotes que aguardam o backoff.
+        """
+        now = time.monotonic()
+        ready, waiting = [], []
+        for retry_at, batch in self.retrying:
+            if include_waiting or retry_at <= now:
+                ready.extend(batch)
+            else:
+                waiting.append((retry_at, batch))
+        self.retrying = waiting
+        self.pending[:0] = ready
+
+        while self.pending:
+            batch = self.pending[:self.BATCH_SIZE]
+            del self.pending[:self.BATCH_SIZE]
+
+            try:
+                delivered = await asyncio.to_thread(self._persist, batch)
+            except Exception as e:
+                self.stats['failed_batches'] += 1
+                self._retry_later(batch, e)
+                continue
+
+            # Novas linhas e grupos reabertos contam como não lidas
+            unread_deltas = defaultdict(int)
+            for intent, _ in delivered:
+                if 'notification_id' not in intent or intent.get('revived'):
+                    unread_deltas[intent['recipient_id']] += 1
+            for recipient_id, delta in unread_deltas.items():
+                unread_counter.adjust(recipient_id, delta)
+
+            for intent, notification_id in delivered:
+                if notification_id is None:
+                    continue
+                await self._push(intent['recipient_id'], notification_id, self._frame(intent, notification_id))
+
+            for recipient_id in unread_deltas:
+                frame = unread_counter.frame(recipient_id)
+                if frame:
+                    await self._push_count(recipient_id, frame)
+
+    def _retry_later(self, batch: List[Dict[str, Any]], error: Exception):
+        """Reenfileirar um lote que falhou (com backoff) ou descartá-lo após MAX_ATTEMPTS"""
+        # Grupos tocados pelo lote podem ter ficado diferentes do banco: recarregar
+        notification_aggregator.discard(batch)
+
+        retry, dropped = [], []
+        for intent in batch:
+            intent['attempts'] = intent.get('attempts', 0) + 1
+            (retry if intent['attempts'] < self.MAX_ATTEMPTS else dropped).append(intent)
+
+        if retry:
+            delay = self.RETRY_BACKOFF * 2 ** (max(intent['attempts'] for intent in retry) - 1)
+            self.retrying.append((time.monotonic() + delay, retry))
+            self.stats['retried'] += len(retry)
+            print(f"⚠️ Outbox: falha ao persistir lote de {len(batch)} notificações, nova tentativa em {delay:.0f}s: {error}")
+        if dropped:
+            self.log_dropped(dropped, f"após {self.MAX_ATTEMPTS} tentativas: {error}")
+
+    def log_dropped(self, intents: List[Dict[str, Any]], reason: str):
+        self.stats['dropped'] += len(intents)
+        summary = ", ".join(
+            f"{intent['notification_type'].value}→{intent['recipient_id']}" for intent in intents[:20]
+        )
+        print(f"❌ Outbox: {len(intents)} notificações descartadas {reason} [{summary}]")
+
+    async def _push(self, recipient_id: int, notification_id: int, frame: str):
+        """Enviar um frame respeitando o intervalo mínimo por destinatário"""
+        if recipient_id not in manager.active_connections:
+            return
+
+        now = time.monotonic()
+        if now - self.last_push.get(recipient_id, 0) < self.PUSH_INTERVAL:
+            # Um grupo atualizado várias vezes no intervalo gera um único frame
+            self.deferred[recipient_id][notification_id] = frame
+            self.stats['deferred'] += 1
+            return
+
+        self.last_push[recipient_id] = now
+        await manager.send_personal_message(frame, recipient_id)
+        self.stats['delivered'] += 1
+
+    async def _push_count(self, recipient_id: int, frame: str):
+        """Enviar o contador de não lidas fora do rate limit
+
+        Com notificações adiadas para o destinatário, o contador (chave 0) vai
+        junto e depois delas, para o badge não chegar antes da notificação.
+        """
+        if recipient_id not in manager.active_connections:
+            return
+        frames = self.deferred.get(recipient_id)
+        if frames:
+            frames.pop(0, None)
+            frames[0] = frame
+            return
+        await manager.send_personal_message(frame, recipient_id)
+        self.stats['delivered'] += 1
+
+    async def deliver_deferred(self):
+        """Enviar os frames adiados cujo intervalo já passou"""
+        now = time.monotonic()
+        ready = [
+            recipient_id for recipient_id in self.deferred
+            if now - self.last_push.get(recipient_id, 0) >= self.PUSH_INTERVAL
+        ]
+        for recipient_id in ready:
+            frames = self.deferred.pop(recipient_id)
+            if recipient_id not in manager.active_connections:
+                continue
+            self.last_push[recipient_id] = now
+            for frame in frames.values():
+                await manager.send_personal_message(frame, recipient_id)
+                self.stats['delivered'] += 1
+
+        # Evitar crescimento indefinido do mapa de últimos envios
+        if len(self.last_push) > 10000:
+            self.last_push = {
+                recipient_id: pushed_at for recipient_id, pushed_at in self.last_push.items()
+                if now - pushed_at < self.PUSH_INTERVAL
+            }
+
+    def _persist(self, batch: List[Dict[str, Any]]):
+        """Agrupar o lote, inserir as novas linhas com um único INSERT e obter os ids"""
+        # DATETIME no MySQL não guarda microssegundos
+        created_at = datetime.utcnow().replace(microsecond=0)
+
+        db = SessionLocal()
+        try:
+            to_insert, updated = notification_aggregator.coalesce(db, batch, created_at)
+            ids = self._insert(db, to_insert, created_at) if to_insert else []
+            db.commit()
+        finally:
+            db.close()
+
+        notification_aggregator.register(to_insert, ids)
+
+        self.stats['batches'] += 1
+        self.stats['inserted'] += len(to_insert)
+        for intent in to_insert + updated:
+            intent['created_at'] = created_at
+
+        return list(zip(to_insert, ids)) + [(intent, intent['notification_id']) for intent in updated]
+
+    def _insert(self, db, intents: List[Dict[str, Any]], created_at: datetime) -> List[int]:
+        """Inserir as intenções num INSERT multi-linha e devolver os ids, na ordem do lote
+
+        Com o número de linhas conhecido, o InnoDB reserva um bloco consecutivo
+        de auto-incremento para o comando (em qualquer innodb_autoinc_lock_mode)
+        e LAST_INSERT_ID() é o primeiro id do bloco; o SQLite devolve o último.
+        Os ids saem do próprio INSERT, sem reler as linhas.
+        """
+        result = db.execute(insert(Notification).values(self._rows(intents, created_at)))
+        first_id = result.lastrowid
+        if db.bind.dialect.name != "mysql":
+            first_id -= len(intents) - 1
+        return list(range(first_id, first_id + len(intents)))
+
+    def _rows(self, intents: List[Dict[str, Any]], created_at: datetime) -> List[Dict[str, Any]]:
+        """Linhas do INSERT multi-linha"""
+        return [
+            {
+                'recipient_id': intent['recipient_id'],
+                'sender_id': intent['sender_id'],
+                'notification_type': intent['notification_type'],
+                'title': intent['title'],
+                'message': intent['message'],
+                'post_id': intent['post_id'],
+                'comment_id': intent['comment_id'],
+                'story_id': intent['story_id'],
+                'friendship_id': intent['friendship_id'],
+                'data': intent['data'],
+                'is_read': False,
+                'is_clicked': False,
+                'is_deleted': False,
+                'created_at': created_at,
+            }
+            for intent in intents
+        ]
+
+    def _frame(self, intent: Dict[str, Any], notification_id: int) -> str:
+        """Montar o frame WebSocket a partir do payload pré-serializado"""
+        # payload é um objeto JSON sem o id; inserimos id e created_at na frente
+        return (
+            '{"type": "notification", "data": {"id": %d, "created_at": %s, %s}'
+            % (notification_id, json.dumps(intent['created_at'].isoformat()), intent['payload'][1:])
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obter estatísticas do outbox"""
+        return {
+            **self.stats,
+            **notification_aggregator.stats,
+            'pending': len(self.pending),
+            'retrying': sum(len(batch) for _, batch in self.retrying),
+            'open_groups': len(notification_aggregator.open_groups),
+        }
+
+# Instância global do outbox
+notification_outbox = NotificationOutbox()
+
+# Função para iniciar o worker do outbox
+def start_notification_outbox():
+    notification_outbox.running = True
+    notification_outbox.wakeup = asyncio.Event()
+    notification_outbox.worker_task = asyncio.create_task(notification_outbox.run())
+
+# Função para parar o worker descarregando o que restou na fila
+async def stop_notification_outbox():
+    notification_outbox.running = False
+    if notification_outbox.worker_task:
+        notification_outbox.wakeup.set()
+        await notification_outbox.worker_task
+        notification_outbox.worker_task = None
+    await notification_outbox.flush(include_waiting=True)
+    for _, batch in notification_outbox.retrying:
+        notification_outbox.log_dropped(batch, "no encerramento")
+    notification_outbox.retrying = []
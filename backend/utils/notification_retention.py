@@ -0,0 +1,143 @@
+"""
+Retenção de notificações
+
+Job de background que remove, em lotes pequenos e com pausa entre eles:
+- notificações apagadas pelo usuário (is_deleted) há mais de SOFT_DELETED_GRACE
+  (pela data da exclusão, deleted_at);
+- notificações lidas mais antigas que READ_RETENTION, movidas antes para
+  notifications_archive (se ARCHIVE_READ estiver ativo).
+Cada lote é uma transação curta guiada por ix_notifications_deleted ou
+ix_notifications_retention, para não segurar locks nem competir com o tráfego
+normal.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy import delete, insert, literal, select
+
+from core.database import advisory_lock_async
+from models import Notification, NotificationArchive
+
+ARCHIVE_COLUMNS = [
+    "id", "created_at", "recipient_id", "sender_id", "notification_type",
+    "title", "message", "post_id", "comment_id", "story_id", "friendship_id",
+    "data", "is_clicked", "read_at", "clicked_at",
+]
+
+
+class NotificationRetention:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'runs': 0,
+            'purged_deleted': 0,
+            'archived_read': 0,
+            'last_run_at': None,
+        }
+        # Configurações
+        self.RUN_INTERVAL = 3600  # 1 hora
+        self.SOFT_DELETED_GRACE = timedelta(days=1)
+        self.READ_RETENTION = timedelta(days=90)
+        self.ARCHIVE_READ = True
+        self.BATCH_SIZE = 1000
+        self.BATCH_PAUSE = 0.2  # segundos entre lotes
+        self.MAX_BATCHES_PER_RUN = 500
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Executar uma passada completa (limitada a MAX_BATCHES_PER_RUN lotes)"""
+        now = datetime.utcnow()
+        deleted_cutoff = now - self.SOFT_DELETED_GRACE
+        read_cutoff = now - self.READ_RETENTION
+
+        # Uma única instância do job entre processos
+        async with advisory_lock_async("notification_retention") as db:
+            if db is None:
+                return {'skipped': True}
+            batches = await self._run_batches(db, deleted_cutoff, read_cutoff)
+
+        self.stats['runs'] += 1
+        self.stats['last_run_at'] = now.isoformat()
+        return {'skipped': False, 'batches': batches}
+
+    async def _run_batches(self, db, deleted_cutoff: datetime, read_cutoff: datetime) -> int:
+        """Processar lotes com pausa entre eles; devolve quantos lotes rodaram"""
+        batches = 0
+        while batches < self.MAX_BATCHES_PER_RUN:
+            removed = await asyncio.to_thread(self._purge_deleted_batch, db, deleted_cutoff)
+            self.stats['purged_deleted'] += removed
+            if removed == 0:
+                break
+            batches += 1
+            await asyncio.sleep(self.BATCH_PAUSE)
+
+        while batches < self.MAX_BATCHES_PER_RUN:
+            moved = await asyncio.to_thread(self._archive_read_batch, db, read_cutoff)
+            self.stats['archived_read'] += moved
+            if moved == 0:
+                break
+            batches += 1
+            await asyncio.sleep(self.BATCH_PAUSE)
+
+        return batches
+
+    def _purge_deleted_batch(self, db, cutoff: datetime) -> int:
+        """Remover definitivamente um lote de notificações apagadas"""
+        ids = db.execute(
+            select(Notification.id).where(
+                Notification.is_deleted == True,
+                Notification.deleted_at < cutoff
+            ).limit(self.BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            return 0
+
+        db.execute(delete(Notification).where(Notification.id.in_(ids)))
+        db.commit()
+        return len(ids)
+
+    def _archive_read_batch(self, db, cutoff: datetime) -> int:
+        """Mover (ou remover) um lote de notificações lidas antigas"""
+        ids = db.execute(
+            select(Notification.id).where(
+                Notification.is_deleted == False,
+                Notification.is_read == True,
+                Notification.created_at < cutoff
+            ).limit(self.BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            return 0
+
+        if self.ARCHIVE_READ:
+            source = Notification.__table__
+            db.execute(
+                insert(NotificationArchive.__table__).from_select(
+                    ARCHIVE_COLUMNS + ["archived_at"],
+                    select(
+                        *[source.c[column] for column in ARCHIVE_COLUMNS],
+                        literal(datetime.utcnow())
+                    ).where(source.c.id.in_(ids))
+                )
+            )
+        db.execute(delete(Notification).where(Notification.id.in_(ids)))
+        db.commit()
+        return len(ids)
+
+# Instância global do job de retenção
+notification_retention = NotificationRetention()
+
+# Executar o job periodicamente
+async def retention_task():
+    """Task para a retenção periódica de notificações"""
+    while True:
+        await asyncio.sleep(notification_retention.RUN_INTERVAL)
+        try:
+            result = await notification_retention.run_once()
+            if not result['skipped']:
+                print(f"🧹 Retenção de notificações: {notification_retention.stats}")
+        except Exception as e:
+            print(f"❌ Erro no job de retenção de notificações: {e}")
+
+# Função para iniciar o job de retenção
+def start_notification_retention():
+    asyncio.create_task(retention_task())
@@ -0,0 +1,216 @@
+"""
+Contadores de reações por tipo
+
+Posts e comentários guardam, além do total (reactions_count), um objeto JSON
+com as reações por tipo em reaction_counts ({"like": 3, "love": 1}). Cada
+reação criada, trocada ou removida vira um único UPDATE com JSON_SET sobre o
+valor atual da linha — sem ler-modificar-gravar, então reações simultâneas
+não se perdem. Listagens montam o resumo a partir da própria linha e buscam a
+reação do usuário para a página inteira numa única consulta.
+
+Gravação (upsert/remove): a reação é gravada com um único
+INSERT ... ON DUPLICATE KEY UPDATE sobre a chave única (alvo, user_id), que
+também devolve o tipo anterior (variável de sessão @previous_reaction).
+Na mesma transação vêm o ajuste dos contadores e a leitura dos totais
+atualizados, e a linha do post/comentário — a mais disputada em posts
+virais — só é travada no fim, logo antes do commit.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Integer, cast, func, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+REACTION_TYPES = (
+    "like", "love", "haha", "wow", "sad", "angry",
+    "care", "pride", "grateful", "celebrating",
+)
+
+
+class ReactionCounters:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'counter_updates': 0,
+            'viewer_lookups': 0,
+            'upserts': 0,
+            'unchanged': 0,
+            'removals': 0,
+        }
+
+    def is_valid(self, reaction_type: str) -> bool:
+        return reaction_type in REACTION_TYPES
+
+    def _count_at(self, counts_column, reaction_type: str):
+        return func.coalesce(cast(func.json_extract(counts_column, f"$.{reaction_type}"), Integer), 0)
+
+    def apply(
+        self, db: Session, model, target_id: int,
+        removed: Optional[str] = None, added: Optional[str] = None
+    ):
+        """Ajustar total e contagem por tipo na transação atual (o commit é do chamador)
+
+        removed/added: tipo da reação que saiu/entrou (trocar de reação passa os dois).
+        """
+        if removed == added:
+            return
+
+        counts_column = model.reaction_counts
+        arguments = [func.coalesce(counts_column, func.json_object())]
+        for reaction_type, delta in ((removed, -1), (added, 1)):
+            if reaction_type:
+                arguments += [f"$.{reaction_type}", self._count_at(counts_column, reaction_type) + delta]
+
+        total_delta = (1 if added else 0) - (1 if removed else 0)
+        values = {counts_column: func.json_set(*arguments)}
+        if total_delta:
+            values[model.reactions_count] = func.coalesce(model.reactions_count, 0) + total_delta
+
+        db.execute(update(model).where(model.id == target_id).values(values))
+        self.stats['counter_updates'] += 1
+
+    def summary(self, counts: Optional[Dict[str, Any]]) -> Dict[str, int]:
+        """Tipos com reações, do mais para o menos usado"""
+        if not counts:
+            return {}
+        return dict(sorted(
+            ((reaction_type, int(count)) for reaction_type, count in counts.items() if count and int(count) > 0),
+            key=lambda item: -item[1]
+        ))
+
+    def viewer_reactions(
+        self, db: Session, reaction_model, target_column, target_ids: Iterable[int], user_id: int
+    ) -> Dict[int, str]:
+        """Reação do usuário em cada item da página (uma consulta)"""
+        target_ids = list(set(target_ids))
+        if not target_ids:
+            return {}
+        self.stats['viewer_lookups'] += 1
+        return {
+            target_id: reaction_type
+            for target_id, reaction_type in db.query(target_column, reaction_model.reaction_type).filter(
+                reaction_model.user_id == user_id,
+                target_column.in_(target_ids)
+            )
+        }
+
+    def _previous_and_write(
+        self, db: Session, reaction_model, target_column: str, target_id: int,
+        user_id: int, reaction_type: str
+    ) -> Optional[str]:
+        """Gravar a reação e devolver o tipo anterior (None se ela é nova)"""
+        now = datetime.utcnow()
+        if db.bind.dialect.name == "mysql":
+            table = reaction_model.__tablename__
+            db.execute(text("SET @previous_reaction = NULL"))
+            # updated_at antes de reaction_type: o MySQL aplica as atribuições em ordem
+            db.execute(text(f"""
+                INSERT INTO {table} ({target_column}, user_id, reaction_type, created_at, updated_at)
+                VALUES (:target_id, :user_id, :reaction_type, :now, :now)
+                ON DUPLICATE KEY UPDATE
+                    updated_at = IF(reaction_type = VALUES(reaction_type), updated_at, VALUES(updated_at)),
+                    reaction_type = IF((@previous_reaction := reaction_type) IS NULL,
+                                       VALUES(reaction_type), VALUES(reaction_type))
+            """), {"target_id": target_id, "user_id": user_id, "reaction_type": reaction_type, "now": now})
+            return db.execute(text("SELECT @previous_reaction")).scalar()
+
+        # Outros bancos (desenvolvimento): leitura seguida de INSERT ou UPDATE
+        target = getattr(reaction_model, target_column)
+        filters = (target == target_id, reaction_model.user_id == user_id)
+        previous = db.execute(select(reaction_model.reaction_type).where(*filters)).scalar()
+        if previous is None:
+            try:
+                with db.begin_nested():
+                    db.add(reaction_model(**{
+                        target_column: target_id, "user_id": user_id,
+                        "reaction_type": reaction_type, "created_at": now, "updated_at": now
+                    }))
+                return None
+            except IntegrityError:
+                previous = db.execute(select(reaction_model.reaction_type).where(*filters)).scalar()
+        if previous != reaction_type:
+            db.execute(update(reaction_model).where(*filters).values(reaction_type=reaction_type, updated_at=now))
+        return previous
+
+    def _totals(self, db: Session, target_model, target_id: int):
+        conditions = [target_model.id == target_id]
+        if hasattr(target_model, "deleted_at"):
+            # Alvo com lápide (ver utils/cascade_deletion.py) conta como inexistente
+            conditions.append(target_model.deleted_at.is_(None))
+        return db.execute(
+            select(target_model.reactions_count, target_model.reaction_counts, target_model.author_id).where(
+                *conditions
+            )
+        ).first()
+
+    def upsert(
+        self, db: Session, reaction_model, target_column: str, target_model,
+        target_id: int, user_id: int, reaction_type: str
+    ) -> Optional[Tuple[Optional[str], Any]]:
+        """Criar ou trocar a reação do usuário e ajustar os contadores (faz o commit)
+
+        Devolve (tipo anterior, linha do alvo com os totais e o author_id) ou
+        None se o alvo não existe.
+        """
+        try:
+            previous = self._previous_and_write(db, reaction_model, target_column, target_id, user_id, reaction_type)
+        except IntegrityError:
+            # Chave estrangeira: o post/comentário não existe
+            db.rollback()
+            return None
+
+        if previous == reaction_type:
+            self.stats['unchanged'] += 1
+        else:
+            self.apply(db, target_model, target_id, removed=previous, added=reaction_type)
+
+        totals = self._totals(db, target_model, target_id)
+        if totals is None:
+            db.rollback()
+            return None
+        db.commit()
+        self.stats['upserts'] += 1
+        return previous, totals
+
+    def remove(
+        self, db: Session, reaction_model, target_column: str, target_model,
+        target_id: int, user_id: int
+    ) -> Optional[Tuple[str, Any]]:
+        """Remover a reação do usuário (faz o commit); None se não havia reação
+
+        Os contadores só mudam se este DELETE removeu a linha: dois pedidos
+        simultâneos não decrementam duas vezes.
+        """
+        filters = (getattr(reaction_model, target_column) == target_id, reaction_model.user_id == user_id)
+        previous = db.execute(select(reaction_model.reaction_type).where(*filters)).scalar()
+        if previous is None:
+            return None
+
+        deleted = db.execute(
+            reaction_model.__table__.delete().where(*filters, reaction_model.reaction_type == previous)
+        ).rowcount
+        if not deleted:
+            db.rollback()
+            return None
+
+        self.apply(db, target_model, target_id, removed=previous)
+        totals = self._totals(db, target_model, target_id)
+        db.commit()
+        self.stats['removals'] += 1
+        return previous, totals
+
+    def totals(self, row) -> Dict[str, Any]:
+        """Totais para a resposta da escrita (mesmo formato das listagens)"""
+        if row is None:
+            return {"reactions_count": 0, "reaction_summary": {}}
+        return {
+            "reactions_count": max(row.reactions_count or 0, 0),
+            "reaction_summary": self.summary(row.reaction_counts),
+        }
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global dos contadores de reações
+reaction_counters = ReactionCounters()
@@ -0,0 +1,93 @@
+"""
+Compartilhamentos de posts
+
+Cada usuário compartilha um post no máximo uma vez (chave única
+(post_id, user_id)). O compartilhamento e o ajuste de posts.shares_count vão
+na mesma transação, com o contador incrementado no próprio UPDATE — sem
+ler-modificar-gravar. Repetir o pedido devolve o compartilhamento existente
+sem contar de novo.
+
+O compartilhamento entra no feed de quem segue (ou é amigo de) quem
+compartilhou pelo mesmo fan-out dos posts: ver utils/timeline.py.
+"""
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Post, Share
+from utils.timeline import timeline
+
+
+class ShareService:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'shared': 0,
+            'duplicates': 0,
+            'removed': 0,
+        }
+        # Configurações
+        self.MAX_CONTENT_LENGTH = 2000
+        self.PAGE_SIZE = 20
+
+    def _adjust_count(self, db: Session, post_id: int, delta: int):
+        db.execute(
+            update(Post).where(Post.id == post_id).values(
+                shares_count=func.coalesce(Post.shares_count, 0) + delta
+            )
+        )
+
+    def share(
+        self, db: Session, post: Post, user_id: int, content: Optional[str] = None
+    ) -> Tuple[Share, bool]:
+        """Compartilhar o post (faz o commit); devolve (compartilhamento, criado agora)"""
+        existing = db.query(Share).filter(Share.post_id == post.id, Share.user_id == user_id).first()
+        if existing:
+            self.stats['duplicates'] += 1
+            return existing, False
+
+        share = Share(post_id=post.id, user_id=user_id, content=content)
+        try:
+            with db.begin_nested():
+                db.add(share)
+        except IntegrityError:
+            # Compartilhado em paralelo pelo mesmo usuário
+            self.stats['duplicates'] += 1
+            return db.query(Share).filter(Share.post_id == post.id, Share.user_id == user_id).first(), False
+
+        self._adjust_count(db, post.id, 1)
+        db.commit()
+        db.refresh(share)
+        self.stats['shared'] += 1
+        return share, True
+
+    def unshare(self, db: Session, post_id: int, user_id: int) -> bool:
+        """Desfazer o compartilhamento (faz o commit); False se não havia"""
+        deleted = db.query(Share).filter(
+            Share.post_id == post_id,
+            Share.user_id == user_id
+        ).delete(synchronize_session=False)
+        if not deleted:
+            db.rollback()
+            return False
+
+        self._adjust_count(db, post_id, -1)
+        timeline.retract(db, post_id, user_id)
+        db.commit()
+        self.stats['removed'] += 1
+        return True
+
+    def sharers(self, db: Session, post_id: int, limit: int, before_id: Optional[int] = None) -> List[Share]:
+        """Compartilhamentos de um post, mais recentes primeiro (keyset em id)"""
+        query = db.query(Share).filter(Share.post_id == post_id)
+        if before_id:
+            query = query.filter(Share.id < before_id)
+        return query.order_by(Share.id.desc()).limit(limit).all()
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global dos compartilhamentos
+share_service = ShareService()
@@ -0,0 +1,206 @@
+"""
+Índice em memória do grafo social
+
+Mantém, por usuário, os conjuntos de adjacência (amigos, solicitações
+pendentes, seguidores, seguindo e bloqueios nos dois sentidos). Cada usuário
+é carregado sob demanda com três consultas e depois mantido atualizado pelos
+hooks chamados nas rotas de amizade, follow e bloqueio, de modo que checagens
+de privacidade e visibilidade viram consultas O(1) em memória.
+
+Os conjuntos devolvidos são a própria estrutura interna: trate-os como
+somente leitura. Entradas expiram após ENTRY_TTL para corrigir desvios entre
+instâncias da API.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Set
+
+from sqlalchemy.orm import Session
+
+from models import Friendship, Follow, Block
+
+
+class SocialGraph:
+    def __init__(self):
+        # user_id -> conjuntos de adjacência (LRU)
+        self.entries: "OrderedDict[int, Dict[str, Set[int]]]" = OrderedDict()
+        self.loaded_at: Dict[int, float] = {}
+        # Estatísticas
+        self.stats = {
+            'hits': 0,
+            'loads': 0,
+        }
+        # Configurações
+        self.ENTRY_TTL = 600  # 10 minutos
+        self.MAX_USERS = 50000
+
+    def _entry(self, db: Session, user_id: int) -> Dict[str, Set[int]]:
+        """Obter (carregando se necessário) a entrada de um usuário"""
+        entry = self.entries.get(user_id)
+        if entry is not None and time.monotonic() - self.loaded_at[user_id] < self.ENTRY_TTL:
+            self.entries.move_to_end(user_id)
+            self.stats['hits'] += 1
+            return entry
+        return self.load(db, user_id)
+
+    def load(self, db: Session, user_id: int) -> Dict[str, Set[int]]:
+        """Carregar a vizinhança de um usuário do banco"""
+        entry = {
+            'friends': set(),
+            'pending_in': set(),
+            'pending_out': set(),
+            'followers': set(),
+            'following': set(),
+            'blocking': set(),
+            'blocked_by': set(),
+        }
+
+        friendship_columns = (Friendship.requester_id, Friendship.addressee_id, Friendship.status)
+        for requester_id, addressee_id, status in db.query(*friendship_columns).filter(
+            Friendship.requester_id == user_id,
+            Friendship.status.in_(["accepted", "pending"])
+        ).union_all(db.query(*friendship_columns).filter(
+            Friendship.addressee_id == user_id,
+            Friendship.status.in_(["accepted", "pending"])
+        )):
+            other_id = addressee_id if requester_id == user_id else requester_id
+            if status == "accepted":
+                entry['friends'].add(other_id)
+            elif requester_id == user_id:
+                entry['pending_out'].add(other_id)
+            else:
+                entry['pending_in'].add(other_id)
+
+        for follower_id, followed_id in db.query(Follow.follower_id, Follow.followed_id).filter(
+            (Follow.follower_id == user_id) | (Follow.followed_id == user_id)
+        ):
+            if follower_id == user_id:
+                entry['following'].add(followed_id)
+            else:
+                entry['followers'].add(follower_id)
+
+        for blocker_id, blocked_id in db.query(Block.blocker_id, Block.blocked_id).filter(
+            (Block.blocker_id == user_id) | (Block.blocked_id == user_id)
+        ):
+            if blocker_id == user_id:
+                entry['blocking'].add(blocked_id)
+            else:
+                entry['blocked_by'].add(blocker_id)
+
+        self.entries[user_id] = entry
+        self.entries.move_to_end(user_id)
+        self.loaded_at[user_id] = time.monotonic()
+        self.stats['loads'] += 1
+
+        while len(self.entries) > self.MAX_USERS:
+            evicted_id, _ = self.entries.popitem(last=False)
+            self.loaded_at.pop(evicted_id, None)
+
+        return entry
+
+    # Consultas
+
+    def friends(self, db: Session, user_id: int) -> Set[int]:
+        return self._entry(db, user_id)['friends']
+
+    def followers(self, db: Session, user_id: int) -> Set[int]:
+        return self._entry(db, user_id)['followers']
+
+    def following(self, db: Session, user_id: int) -> Set[int]:
+        return self._entry(db, user_id)['following']
+
+    def pending(self, db: Session, user_id: int) -> Set[int]:
+        """Usuários com solicitação pendente em qualquer sentido"""
+        entry = self._entry(db, user_id)
+        return entry['pending_in'] | entry['pending_out']
+
+    def blocking(self, db: Session, user_id: int) -> Set[int]:
+        """Usuários que o usuário bloqueou"""
+        return self._entry(db, user_id)['blocking']
+
+    def blocked_either(self, db: Session, user_id: int) -> Set[int]:
+        """Usuários que o usuário bloqueou ou que o bloquearam"""
+        entry = self._entry(db, user_id)
+        return entry['blocking'] | entry['blocked_by']
+
+    def are_friends(self, db: Session, user_id: int, other_id: int) -> bool:
+        return other_id in self._entry(db, user_id)['friends']
+
+    def is_blocked(self, db: Session, user_id: int, other_id: int) -> bool:
+        """Existe bloqueio entre os dois usuários, em qualquer sentido"""
+        entry = self._entry(db, user_id)
+        return other_id in entry['blocking'] or other_id in entry['blocked_by']
+
+    def excluded_from_suggestions(self, db: Session, user_id: int) -> Set[int]:
+        """O próprio usuário, amigos, pendentes e bloqueados"""
+        entry = self._entry(db, user_id)
+        return (
+            {user_id} | entry['friends'] | entry['pending_in'] | entry['pending_out']
+            | entry['blocking'] | entry['blocked_by']
+        )
+
+    def mutual_friends(self, db: Session, user_id: int, other_id: int) -> Set[int]:
+        return self.friends(db, user_id) & self.friends(db, other_id)
+
+    # Hooks de escrita (atualizam apenas entradas já carregadas)
+
+    def _update(self, user_id: int, key: str, other_id: int, add: bool):
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return
+        if add:
+            entry[key].add(other_id)
+        else:
+            entry[key].discard(other_id)
+
+    def on_friend_request(self, requester_id: int, addressee_id: int):
+        self._update(requester_id, 'pending_out', addressee_id, True)
+        self._update(addressee_id, 'pending_in', requester_id, True)
+
+    def on_friend_request_closed(self, requester_id: int, addressee_id: int):
+        """Solicitação rejeitada ou cancelada"""
+        self._update(requester_id, 'pending_out', addressee_id, False)
+        self._update(addressee_id, 'pending_in', requester_id, False)
+
+    def on_friendship_accepted(self, requester_id: int, addressee_id: int):
+        self.on_friend_request_closed(requester_id, addressee_id)
+        self._update(requester_id, 'friends', addressee_id, True)
+        self._update(addressee_id, 'friends', requester_id, True)
+
+    def on_friendship_removed(self, user_id: int, other_id: int):
+        """Amizade ou solicitação apagada, em qualquer sentido"""
+        for a, b in ((user_id, other_id), (other_id, user_id)):
+            self._update(a, 'friends', b, False)
+            self._update(a, 'pending_in', b, False)
+            self._update(a, 'pending_out', b, False)
+
+    def on_follow(self, follower_id: int, followed_id: int):
+        self._update(follower_id, 'following', followed_id, True)
+        self._update(followed_id, 'followers', follower_id, True)
+
+    def on_unfollow(self, follower_id: int, followed_id: int):
+        self._update(follower_id, 'following', followed_id, False)
+        self._update(followed_id, 'followers', follower_id, False)
+
+    def on_block(self, blocker_id: int, blocked_id: int):
+        """Bloqueio também desfaz amizade e follows nos dois sentidos"""
+        self.on_friendship_removed(blocker_id, blocked_id)
+        self.on_unfollow(blocker_id, blocked_id)
+        self.on_unfollow(blocked_id, blocker_id)
+        self._update(blocker_id, 'blocking', blocked_id, True)
+        self._update(blocked_id, 'blocked_by', blocker_id, True)
+
+    def on_unblock(self, blocker_id: int, blocked_id: int):
+        self._update(blocker_id, 'blocking', blocked_id, False)
+        self._update(blocked_id, 'blocked_by', blocker_id, False)
+
+    def invalidate(self, user_id: int):
+        """Descartar a entrada de um usuário (recarregada no próximo acesso)"""
+        self.entries.pop(user_id, None)
+        self.loaded_at.pop(user_id, None)
+
+    def get_stats(self):
+        return {**self.stats, 'users_loaded': len(self.entries)}
+
+# Instância global do índice
+social_graph = SocialGraph()
@@ -0,0 +1,349 @@
+"""
+Timelines do feed (fan-out na escrita)
+
+Cada usuário tem uma lista de posts em timeline_entries, gravada quando o post
+é publicado ou compartilhado: as rotas só enfileiram o evento e uma task de
+background insere uma linha por destinatário (amigos e seguidores de quem
+publicou, mais ele mesmo) em lotes de FANOUT_CHUNK. Um post que chega de novo
+(vários amigos compartilhando) não duplica: a linha existente só tem a data
+de atividade atualizada. Deixar de seguir (ou desfazer a amizade) também é
+um evento: os itens trazidos por aquele autor saem da timeline.
+
+Autores com CELEBRITY_FOLLOWERS seguidores ou mais só entram na timeline dos
+amigos; seus seguidores recebem esses posts na leitura (ver utils/feed.py),
+sem gravar milhões de linhas por post.
+
+Cada timeline guarda no máximo MAX_ENTRIES itens: os usuários que receberam
+itens são aparados periodicamente.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, exists, func, or_, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models import Post, Share, Friendship, Follow, TimelineEntry
+from utils.user_stats import user_stats
+
+
+class TimelineService:
+    def __init__(self):
+        # Eventos aguardando fan-out
+        self.pending: List[Dict[str, Any]] = []
+        # Timelines que receberam itens desde a última aparagem
+        self.touched: Set[int] = set()
+        self.last_trim = time.monotonic()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.worker_task: Optional[asyncio.Task] = None
+        self.running = False
+        # Estatísticas
+        self.stats = {
+            'published': 0,
+            'entries_written': 0,
+            'celebrity_posts': 0,
+            'backfills': 0,
+            'unfollows': 0,
+            'seeded': 0,
+            'trimmed': 0,
+            'failed_events': 0,
+        }
+        # Configurações
+        self.FLUSH_INTERVAL = 0.5  # segundos
+        self.FANOUT_CHUNK = 1000
+        self.CELEBRITY_FOLLOWERS = 5000
+        self.MAX_ENTRIES = 800
+        self.BACKFILL_POSTS = 20  # posts recentes de quem o usuário passou a seguir
+        self.SEED_POSTS = 200  # primeira leitura de uma timeline vazia
+        self.TRIM_INTERVAL = 300  # segundos
+        self.MAX_TRIMS_PER_RUN = 500
+
+    # Eventos (chamados pelas rotas, sem I/O)
+
+    def publish(self, post_id: int, actor_id: int, created_at: datetime):
+        """Post publicado ou compartilhado por actor_id"""
+        self._enqueue({'kind': 'publish', 'post_id': post_id, 'actor_id': actor_id, 'created_at': created_at})
+        self.stats['published'] += 1
+
+    def follow(self, user_id: int, author_id: int):
+        """user_id passou a seguir (ou ficou amigo de) author_id"""
+        self._enqueue({'kind': 'follow', 'user_id': user_id, 'author_id': author_id})
+
+    def unfollow(self, user_id: int, author_id: int):
+        """user_id deixou de seguir (ou de ser amigo de) author_id"""
+        self._enqueue({'kind': 'unfollow', 'user_id': user_id, 'author_id': author_id})
+
+    def _enqueue(self, event: Dict[str, Any]):
+        self.pending.append(event)
+        if self.wakeup:
+            self.wakeup.set()
+
+    # Leitura
+
+    def entries(
+        self, db: Session, user_id: int, limit: int, before: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Tuple[int, datetime]]:
+        """(post_id, atividade) mais recentes da timeline (antes de before, até until inclusive)"""
+        query = select(TimelineEntry.post_id, TimelineEntry.created_at).where(TimelineEntry.user_id == user_id)
+        if before:
+            query = query.where(TimelineEntry.created_at < before)
+        if until:
+            query = query.where(TimelineEntry.created_at <= until)
+        return [tuple(row) for row in db.execute(query.order_by(TimelineEntry.created_at.desc()).limit(limit))]
+
+    def celebrities(self, db: Session, user_ids: Iterable[int]) -> Set[int]:
+        """Quem, entre user_ids, não tem fan-out para seguidores"""
+        return {
+            user_id for user_id, followers_count in user_stats.followers_counts(db, user_ids).items()
+            if followers_count >= self.CELEBRITY_FOLLOWERS
+        }
+
+    def seed(self, db: Session, user_id: int, author_ids: Iterable[int]) -> int:
+        """Preencher uma timeline vazia com os posts recentes dos autores (faz o commit)"""
+        author_ids = list(author_ids)
+        if not author_ids:
+            return 0
+        rows = [
+            {'user_id': user_id, 'post_id': post_id, 'actor_id': author_id, 'created_at': created_at}
+            for post_id, author_id, created_at in db.execute(
+                select(Post.id, Post.author_id, Post.created_at).where(
+                    Post.author_id.in_(author_ids), Post.deleted_at.is_(None)
+                ).order_by(Post.created_at.desc()).limit(self.SEED_POSTS)
+            )
+        ]
+        if rows:
+            self._upsert(db, rows)
+            db.commit()
+        self.stats['seeded'] += 1
+        return len(rows)
+
+    # Remoção (o commit é do chamador)
+
+    def retract(self, db: Session, post_id: int, actor_id: int):
+        """Tirar dos feeds os itens que chegaram pelo compartilhamento de actor_id"""
+        self._drop_actor(
+            db, actor_id,
+            TimelineEntry.post_id == post_id,
+            TimelineEntry.actor_id != select(Post.author_id).where(Post.id == post_id).scalar_subquery()
+        )
+
+    def _drop_actor(self, db: Session, actor_id: int, *conditions):
+        """Itens entregues por actor_id: passam para outro vínculo que ainda traz o post, ou saem
+
+        Cada item guarda um só actor_id (quem o entregou primeiro); se o autor
+        ou outro compartilhador ainda está entre as fontes do dono da
+        timeline, o item fica e passa a apontar para ele.
+        """
+        conditions = (TimelineEntry.actor_id == actor_id, *conditions)
+        author = select(Post.author_id).where(
+            Post.id == TimelineEntry.post_id,
+            Post.author_id != actor_id,
+            self._linked(TimelineEntry.user_id, Post.author_id)
+        ).scalar_subquery()
+        sharer = select(Share.user_id).where(
+            Share.post_id == TimelineEntry.post_id,
+            Share.user_id != actor_id,
+            self._linked(TimelineEntry.user_id, Share.user_id)
+        ).order_by(Share.created_at.desc()).limit(1).scalar_subquery()
+        replacement = func.coalesce(author, sharer)
+
+        db.execute(update(TimelineEntry).where(*conditions, replacement.isnot(None)).values(
+            actor_id=replacement
+        ).execution_options(synchronize_session=False))
+        db.execute(delete(TimelineEntry).where(*conditions).execution_options(synchronize_session=False))
+
+    def _linked(self, user_column, source_column):
+        """Condição SQL: source_column é o próprio usuário, alguém que ele segue ou um amigo"""
+        return or_(
+            source_column == user_column,
+            exists().where(
+                Follow.follower_id == user_column, Follow.followed_id == source_column
+            ).correlate_except(Follow),
+            exists().where(Friendship.status == "accepted", or_(
+                and_(Friendship.requester_id == user_column, Friendship.addressee_id == source_column),
+                and_(Friendship.requester_id == source_column, Friendship.addressee_id == user_column)
+            )).correlate_except(Friendship)
+        )
+
+    # Worker
+
+    async def run(self):
+        """Loop do worker: fan-out a cada intervalo e aparagem periódica"""
+        while self.running:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+            if time.monotonic() - self.last_trim >= self.TRIM_INTERVAL:
+                self.last_trim = time.monotonic()
+                try:
+                    await asyncio.to_thread(self._trim)
+                except Exception as e:
+                    print(f"❌ Timeline: falha ao aparar timelines: {e}")
+
+    async def flush(self):
+        if not self.pending:
+            return
+        events, self.pending = self.pending, []
+        await asyncio.to_thread(self._process, events)
+
+    def _process(self, events: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            for event in events:
+                try:
+                    if event['kind'] == 'publish':
+                        self._fan_out(db, event)
+                    elif event['kind'] == 'unfollow':
+                        self._unfollow(db, event)
+                    else:
+                        self._backfill(db, event)
+                except IntegrityError:
+                    # Post removido antes do fan-out
+                    db.rollback()
+                    self.stats['failed_events'] += 1
+                except Exception as e:
+                    db.rollback()
+                    self.stats['failed_events'] += 1
+                    print(f"❌ Timeline: falha ao processar evento {event['kind']}: {e}")
+        finally:
+            db.close()
+
+    def audience(self, db: Session, actor_id: int) -> Set[int]:
+        """Quem recebe na timeline o que actor_id publica"""
+        audience = {actor_id}
+        audience.update(db.execute(select(Friendship.addressee_id).where(
+            Friendship.requester_id == actor_id, Friendship.status == "accepted"
+        )).scalars())
+        audience.update(db.execute(select(Friendship.requester_id).where(
+            Friendship.addressee_id == actor_id, Friendship.status == "accepted"
+        )).scalars())
+
+        followers_count = user_stats.followers_counts(db, [actor_id]).get(actor_id, 0)
+        if followers_count >= self.CELEBRITY_FOLLOWERS:
+            self.stats['celebrity_posts'] += 1
+        else:
+            audience.update(db.execute(
+                select(Follow.follower_id).where(Follow.followed_id == actor_id)
+            ).scalars())
+        return audience
+
+    def _fan_out(self, db: Session, event: Dict[str, Any]):
+        audience = list(self.audience(db, event['actor_id']))
+        for start in range(0, len(audience), self.FANOUT_CHUNK):
+            chunk = audience[start:start + self.FANOUT_CHUNK]
+            self._upsert(db, [
+                {
+                    'user_id': user_id,
+                    'post_id': event['post_id'],
+                    'actor_id': event['actor_id'],
+                    'created_at': event['created_at'],
+                }
+                for user_id in chunk
+            ])
+            db.commit()
+            self.touched.update(chunk)
+
+    def _backfill(self, db: Session, event: Dict[str, Any]):
+        rows = [
+            {'user_id': event['user_id'], 'post_id': post_id, 'actor_id': event['author_id'], 'created_at': created_at}
+            for post_id, created_at in db.execute(
+                select(Post.id, Post.created_at).where(
+                    Post.author_id == event['author_id'], Post.deleted_at.is_(None)
+                ).order_by(Post.created_at.desc()).limit(self.BACKFILL_POSTS)
+            )
+        ]
+        if rows:
+            self._upsert(db, rows)
+            db.commit()
+            self.touched.add(event['user_id'])
+        self.stats['backfills'] += 1
+
+    def _unfollow(self, db: Session, event: Dict[str, Any]):
+        """Tirar da timeline os itens trazidos por author_id, se não houver outro vínculo"""
+        user_id, author_id = event['user_id'], event['author_id']
+        # Deixar de seguir um amigo (ou desfazer a amizade com quem ainda segue) mantém os itens
+        still_following = db.execute(select(Follow.id).where(
+            Follow.follower_id == user_id, Follow.followed_id == author_id
+        ).limit(1)).first() or db.execute(select(Friendship.id).where(
+            Friendship.between(user_id, author_id), Friendship.status == "accepted"
+        ).limit(1)).first()
+        if still_following:
+            return
+
+        self._drop_actor(db, author_id, TimelineEntry.user_id == user_id)
+        db.commit()
+        self.stats['unfollows'] += 1
+
+    def _upsert(self, db: Session, rows: List[Dict[str, Any]]):
+        """INSERT em lote; item já presente só tem a atividade atualizada"""
+        if db.bind.dialect.name == "mysql":
+            statement = mysql.insert(TimelineEntry).values(rows)
+            statement = statement.on_duplicate_key_update(
+                created_at=func.greatest(TimelineEntry.created_at, statement.inserted.created_at)
+            )
+        else:
+            statement = sqlite.insert(TimelineEntry).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=[TimelineEntry.user_id, TimelineEntry.post_id],
+                set_={'created_at': func.max(TimelineEntry.created_at, statement.excluded.created_at)}
+            )
+        db.execute(statement)
+        self.stats['entries_written'] += len(rows)
+
+    def _trim(self):
+        """Manter só os MAX_ENTRIES itens mais recentes das timelines alteradas"""
+        batch = [self.touched.pop() for _ in range(min(len(self.touched), self.MAX_TRIMS_PER_RUN))]
+        if not batch:
+            return
+        db = SessionLocal()
+        try:
+            for user_id in batch:
+                cutoff = db.execute(
+                    select(TimelineEntry.created_at).where(TimelineEntry.user_id == user_id).order_by(
+                        TimelineEntry.created_at.desc()
+                    ).offset(self.MAX_ENTRIES).limit(1)
+                ).scalar()
+                if cutoff is None:
+                    continue
+                result = db.execute(delete(TimelineEntry).where(
+                    TimelineEntry.user_id == user_id,
+                    TimelineEntry.created_at <= cutoff
+                ))
+                db.commit()
+                self.stats['trimmed'] += result.rowcount
+        finally:
+            db.close()
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'pending': len(self.pending),
+            'touched': len(self.touched),
+        }
+
+# Instância global das timelines
+timeline = TimelineService()
+
+# Função para iniciar o worker de fan-out
+def start_timeline_fanout():
+    timeline.running = True
+    timeline.wakeup = asyncio.Event()
+    timeline.worker_task = asyncio.create_task(timeline.run())
+
+# Função para parar o worker processando os eventos pendentes
+async def stop_timeline_fanout():
+    timeline.running = False
+    if timeline.worker_task:
+        timeline.wakeup.set()
+        await timeline.worker_task
+        timeline.worker_task = None
+    await timeline.flush()
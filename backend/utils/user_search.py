@@ -0,0 +1,159 @@
+"""
+Busca de usuários
+
+Usa o índice FULLTEXT ft_users_search (first_name, last_name, username, bio)
+em modo booleano com prefixo ("+ana* +sil*"), ordenado por relevância. A
+insensibilidade a acentos e maiúsculas depende da collation das colunas de
+users, que nenhuma migração fixa: a tabela usa o padrão do banco
+(utf8mb4_unicode_ci e utf8mb4_0900_ai_ci tratam "José" e "jose" como iguais,
+no FULLTEXT e no LIKE; uma collation _as_/_bin não). Termos mais curtos que
+o token mínimo do FULLTEXT (3 caracteres no InnoDB) e bancos sem FULLTEXT
+caem numa busca por prefixo (LIKE 'termo%') servida pelos índices B-tree de
+nome e username — nunca um '%termo%'.
+
+E-mails não são buscáveis por substring: só o endereço exato encontra o
+usuário.
+"""
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, literal, or_, text
+from sqlalchemy.orm import Query, Session
+
+from models import User
+from utils.identifier_index import identifier_index
+
+FULLTEXT_COLUMNS = "users.first_name, users.last_name, users.username, users.bio"
+
+# Caracteres com significado no modo booleano do FULLTEXT
+TOKEN_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+
+
+class UserSearch:
+    def __init__(self):
+        # Cache de typeahead: termo normalizado -> (resultados, momento)
+        self.typeahead_cache: "OrderedDict[str, Tuple[List[Dict[str, Any]], float]]" = OrderedDict()
+        # Estatísticas
+        self.stats = {
+            'searches': 0,
+            'typeahead_hits': 0,
+            'typeahead_misses': 0,
+        }
+        # Configurações
+        self.MIN_FULLTEXT_TOKEN = 3
+        self.MAX_TOKENS = 5
+        self.TYPEAHEAD_TTL = 30  # segundos
+        self.TYPEAHEAD_CACHE_SIZE = 10000
+        self.TYPEAHEAD_FETCH = 30  # resultados guardados por termo, antes do filtro por usuário
+
+    def tokenize(self, term: str) -> List[str]:
+        """Separar o termo em palavras, sem operadores do modo booleano"""
+        return [token for token in TOKEN_PATTERN.split(term.lower()) if token][:self.MAX_TOKENS]
+
+    def uses_fulltext(self, db: Session, tokens: List[str]) -> bool:
+        return (
+            db.bind.dialect.name == "mysql"
+            and all(len(token) >= self.MIN_FULLTEXT_TOKEN for token in tokens)
+        )
+
+    def apply(self, db: Session, query: Query, term: str, order_by_relevance: bool = True) -> Query:
+        """Filtrar (e opcionalmente ordenar por relevância) uma consulta de User"""
+        self.stats['searches'] += 1
+        term = term.strip()
+
+        # E-mail: apenas correspondência exata
+        if "@" in term:
+            return query.filter(User.email == term)
+
+        tokens = self.tokenize(term)
+        if not tokens:
+            return query.filter(literal(False))
+
+        if self.uses_fulltext(db, tokens):
+            boolean_query = " ".join(f"+{token}*" for token in tokens)
+            match = text(f"MATCH({FULLTEXT_COLUMNS}) AGAINST (:search_query IN BOOLEAN MODE)").bindparams(
+                search_query=boolean_query
+            )
+            query = query.filter(match)
+            if order_by_relevance:
+                query = query.order_by(desc(match), User.id.asc())
+            return query
+
+        # Prefixo: cada palavra precisa iniciar o nome, o sobrenome ou o username
+        for token in tokens:
+            query = query.filter(or_(
+                User.first_name.startswith(token, autoescape=True),
+                User.last_name.startswith(token, autoescape=True),
+                User.username.startswith(token, autoescape=True)
+            ))
+        if order_by_relevance:
+            query = query.order_by(User.first_name.asc(), User.id.asc())
+        return query
+
+    def typeahead(
+        self, db: Session, term: str, limit: int = 8,
+        exclude_ids: Optional[set] = None, boost_ids: Optional[set] = None
+    ) -> List[Dict[str, Any]]:
+        """Sugestões rápidas para a busca inline
+
+        O resultado por termo é compartilhado entre usuários (cache curto);
+        bloqueios e o impulso para amigos são aplicados depois, por usuário.
+        """
+        tokens = self.tokenize(term)
+        if not tokens:
+            return []
+        key = " ".join(tokens)
+
+        cached = self.typeahead_cache.get(key)
+        if cached and time.monotonic() - cached[1] < self.TYPEAHEAD_TTL:
+            self.typeahead_cache.move_to_end(key)
+            self.stats['typeahead_hits'] += 1
+            results = cached[0]
+        else:
+            self.stats['typeahead_misses'] += 1
+            query = db.query(
+                User.id, User.first_name, User.last_name, User.username,
+                User.avatar, User.is_verified
+            ).filter(User.is_active == True)
+            rows = self.apply(db, query, key).limit(self.TYPEAHEAD_FETCH).all()
+
+            # Prefixo de username (índice em memória) vem antes dos resultados do FULLTEXT
+            if len(tokens) == 1:
+                username_ids = [
+                    user_id for _, user_id in identifier_index.username_prefix(tokens[0], self.TYPEAHEAD_FETCH)
+                ]
+                if username_ids:
+                    by_id = {row.id: row for row in query.filter(User.id.in_(username_ids))}
+                    merged = [by_id[user_id] for user_id in username_ids if user_id in by_id]
+                    merged_ids = {row.id for row in merged}
+                    merged += [row for row in rows if row.id not in merged_ids]
+                    rows = merged[:self.TYPEAHEAD_FETCH]
+            results = [
+                {
+                    "id": row.id,
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "username": row.username,
+                    "avatar": row.avatar,
+                    "is_verified": row.is_verified
+                }
+                for row in rows
+            ]
+            self.typeahead_cache[key] = (results, time.monotonic())
+            while len(self.typeahead_cache) > self.TYPEAHEAD_CACHE_SIZE:
+                self.typeahead_cache.popitem(last=False)
+
+        exclude_ids = exclude_ids or set()
+        boost_ids = boost_ids or set()
+        visible = [result for result in results if result["id"] not in exclude_ids]
+        # Ordenação estável: amigos primeiro, mantendo a relevância dentro de cada grupo
+        visible.sort(key=lambda result: result["id"] not in boost_ids)
+        return visible[:limit]
+
+    def get_stats(self):
+        return {**self.stats, 'typeahead_cached_terms': len(self.typeahead_cache)}
+
+# Instância global da busca
+user_search = UserSearch()
@@ -0,0 +1,161 @@
+"""
+Contadores de perfil pré-calculados (tabela user_stats)
+
+As rotas de amizade, follow e post ajustam os contadores na mesma transação
+da escrita (UPDATE ... SET x = x + delta); o perfil lê uma única linha. Um
+reconciliador periódico recalcula, em lotes e com consultas agrupadas, as
+linhas mais antigas, corrigindo qualquer desvio.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models import UserStats, Friendship, Follow, Post
+
+STAT_COLUMNS = ("friends_count", "posts_count", "followers_count", "following_count")
+
+
+class UserStatsService:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'created': 0,
+            'reconciled': 0,
+        }
+        # Configurações
+        self.RECONCILE_INTERVAL = 600  # 10 minutos entre passadas
+        self.RECONCILE_MAX_AGE = timedelta(hours=24)
+        self.RECONCILE_BATCH = 500
+        self.RECONCILE_PAUSE = 0.2  # segundos entre lotes
+        self.MAX_BATCHES_PER_RUN = 100
+
+    def compute(self, db: Session, user_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        """Contar no banco os quatro contadores de vários usuários (consultas agrupadas)"""
+        counts = {user_id: {column: 0 for column in STAT_COLUMNS} for user_id in user_ids}
+        if not user_ids:
+            return counts
+
+        grouped_counts = [
+            ("friends_count", Friendship.requester_id, [Friendship.status == "accepted"]),
+            ("friends_count", Friendship.addressee_id, [Friendship.status == "accepted"]),
+            ("posts_count", Post.author_id, [Post.deleted_at.is_(None)]),
+            ("followers_count", Follow.followed_id, []),
+            ("following_count", Follow.follower_id, []),
+        ]
+        for column, key, conditions in grouped_counts:
+            for user_id, count in db.execute(
+                select(key, func.count()).where(key.in_(user_ids), *conditions).group_by(key)
+            ):
+                counts[user_id][column] += count
+        return counts
+
+    def get(self, db: Session, user_id: int) -> Dict[str, int]:
+        """Contadores de um usuário (cria a linha na primeira leitura)"""
+        row = db.get(UserStats, user_id)
+        if row is None:
+            values = self.compute(db, [user_id])[user_id]
+            row = UserStats(user_id=user_id, reconciled_at=datetime.utcnow(), **values)
+            db.add(row)
+            try:
+                db.commit()
+                self.stats['created'] += 1
+            except IntegrityError:
+                # Criada em paralelo por outra requisição
+                db.rollback()
+                row = db.get(UserStats, user_id)
+        return {column: max(getattr(row, column), 0) for column in STAT_COLUMNS}
+
+    def followers_counts(self, db: Session, user_ids: Iterable[int]) -> Dict[int, int]:
+        """followers_count de vários usuários
+
+        adjust não cria linhas, então um usuário sem linha ainda pode ter
+        muitos seguidores: as que faltam são calculadas das tabelas de origem
+        e gravadas (faz o commit se criar alguma).
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return {}
+        counts = dict(db.execute(
+            select(UserStats.user_id, UserStats.followers_count).where(UserStats.user_id.in_(user_ids))
+        ).all())
+        missing = [user_id for user_id in user_ids if user_id not in counts]
+        if missing:
+            now = datetime.utcnow()
+            computed = self.compute(db, missing)
+            db.add_all([UserStats(user_id=user_id, reconciled_at=now, **values) for user_id, values in computed.items()])
+            try:
+                db.commit()
+                self.stats['created'] += len(missing)
+            except IntegrityError:
+                # Criadas em paralelo (ou usuário já removido): vale a contagem calculada
+                db.rollback()
+            counts.update({user_id: values['followers_count'] for user_id, values in computed.items()})
+        return counts
+
+    def adjust(self, db: Session, user_id: int, **deltas: int):
+        """Somar deltas aos contadores na transação atual (o commit é do chamador)
+
+        Sem linha ainda, nada a fazer: ela será calculada na primeira leitura.
+        """
+        db.execute(
+            update(UserStats).where(UserStats.user_id == user_id).values({
+                getattr(UserStats, column): getattr(UserStats, column) + delta
+                for column, delta in deltas.items()
+            })
+        )
+
+    def reconcile_batch(self, db: Session, cutoff: datetime) -> int:
+        """Recalcular um lote das linhas reconciliadas há mais tempo"""
+        user_ids = db.execute(
+            select(UserStats.user_id).where(
+                UserStats.reconciled_at < cutoff
+            ).order_by(UserStats.reconciled_at).limit(self.RECONCILE_BATCH)
+        ).scalars().all()
+        if not user_ids:
+            return 0
+
+        now = datetime.utcnow()
+        db.execute(update(UserStats), [
+            {"user_id": user_id, "reconciled_at": now, **values}
+            for user_id, values in self.compute(db, user_ids).items()
+        ])
+        db.commit()
+        self.stats['reconciled'] += len(user_ids)
+        return len(user_ids)
+
+    async def reconcile(self):
+        """Uma passada do reconciliador (limitada a MAX_BATCHES_PER_RUN lotes)"""
+        cutoff = datetime.utcnow() - self.RECONCILE_MAX_AGE
+        db = SessionLocal()
+        try:
+            for _ in range(self.MAX_BATCHES_PER_RUN):
+                if await asyncio.to_thread(self.reconcile_batch, db, cutoff) == 0:
+                    break
+                await asyncio.sleep(self.RECONCILE_PAUSE)
+        finally:
+            db.close()
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global dos contadores de perfil
+user_stats = UserStatsService()
+
+# Reconciliar periodicamente
+async def reconcile_user_stats_task():
+    """Task para a reconciliação periódica dos contadores de perfil"""
+    while True:
+        await asyncio.sleep(user_stats.RECONCILE_INTERVAL)
+        try:
+            await user_stats.reconcile()
+        except Exception as e:
+            print(f"❌ Erro ao reconciliar contadores de perfil: {e}")
+
+# Função para iniciar o reconciliador
+def start_user_stats_reconciler():
+    asyncio.create_task(reconcile_user_stats_task())
@@ -0,0 +1,59 @@
+"""
+Estado do usuário em uma página de posts
+
+Para cada post da página: reação do usuário (e o tipo), se ele compartilhou e
+se salvou. Uma consulta `IN (...)` por tabela (reactions, shares,
+saved_posts), qualquer que seja o tamanho da página; o resultado é mesclado
+no PostResponse (ver routes/posts.py:build_post_response).
+"""
+from typing import Dict, Iterable
+
+from sqlalchemy.orm import Session
+
+from models import Reaction, Share, SavedPost
+
+EMPTY_STATE = {"viewer_reaction": None, "viewer_shared": False, "viewer_saved": False}
+
+
+class ViewerState:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'pages': 0,
+            'posts': 0,
+        }
+
+    def hydrate(self, db: Session, user_id: int, post_ids: Iterable[int]) -> Dict[int, Dict]:
+        """Estado do usuário para cada post (três consultas por página)"""
+        post_ids = list(set(post_ids))
+        states = {post_id: dict(EMPTY_STATE) for post_id in post_ids}
+        if not post_ids:
+            return states
+
+        for post_id, reaction_type in db.query(Reaction.post_id, Reaction.reaction_type).filter(
+            Reaction.post_id.in_(post_ids),
+            Reaction.user_id == user_id
+        ):
+            states[post_id]["viewer_reaction"] = reaction_type
+
+        for (post_id,) in db.query(Share.post_id).filter(
+            Share.post_id.in_(post_ids),
+            Share.user_id == user_id
+        ).distinct():
+            states[post_id]["viewer_shared"] = True
+
+        for (post_id,) in db.query(SavedPost.post_id).filter(
+            SavedPost.user_id == user_id,
+            SavedPost.post_id.in_(post_ids)
+        ).distinct():
+            states[post_id]["viewer_saved"] = True
+
+        self.stats['pages'] += 1
+        self.stats['posts'] += len(post_ids)
+        return states
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global do estado do usuário nos posts
+viewer_state = ViewerState()
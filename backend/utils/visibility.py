@@ -0,0 +1,123 @@
+"""
+Visibilidade de posts, stories e perfis
+
+Regras (public < friends < private):
+- um post é visível se o nível do leitor em relação ao autor (próprio autor,
+  amigo ou qualquer um) alcança o mais restritivo entre Post.privacy e
+  User.post_visibility do autor;
+- stories seguem User.story_visibility e perfis, User.profile_visibility;
+- com bloqueio em qualquer sentido, nada do autor é visível;
+- valores ausentes valem "public"; valores desconhecidos, "private";
+- posts, stories e autores com lápide (deleted_at, ver
+  utils/cascade_deletion.py) não são visíveis para ninguém.
+
+Cada regra existe em duas formas com o mesmo resultado: um predicado SQL para
+as listagens (a consulta precisa de um JOIN com users pelo autor) e uma
+checagem em memória para objetos já carregados. O conjunto de amigos e de
+bloqueios vem do social_graph, então aplicar a regra não acrescenta consultas:
+o predicado vira `author_id IN (...)` sobre os índices por autor que as
+listagens já usam.
+"""
+from typing import Optional
+
+from sqlalchemy import and_, func, literal, or_
+from sqlalchemy.orm import Session
+
+from models import User, Post, Story
+from utils.social_graph import social_graph
+
+LEVELS = {"public": 0, "friends": 1, "private": 2}
+
+
+class Visibility:
+    def __init__(self):
+        # Estatísticas
+        self.stats = {
+            'sql_filters': 0,
+            'checks': 0,
+            'denied': 0,
+        }
+
+    def level(self, value: Optional[str]) -> int:
+        return LEVELS.get(value or "public", LEVELS["private"])
+
+    def viewer_level(self, db: Session, viewer_id: int, author_id: int) -> Optional[int]:
+        """Nível do leitor em relação ao autor (None se há bloqueio)"""
+        if viewer_id == author_id:
+            return LEVELS["private"]
+        if social_graph.is_blocked(db, viewer_id, author_id):
+            return None
+        return LEVELS["friends"] if social_graph.are_friends(db, viewer_id, author_id) else LEVELS["public"]
+
+    def _allowed(self, viewer_level: Optional[int], *settings: Optional[str]) -> bool:
+        self.stats['checks'] += 1
+        allowed = viewer_level is not None and all(viewer_level >= self.level(value) for value in settings)
+        if not allowed:
+            self.stats['denied'] += 1
+        return allowed
+
+    # Checagens em memória (objetos já carregados)
+
+    def can_see_post(self, db: Session, viewer_id: int, post: Post) -> bool:
+        if post.deleted_at is not None or post.author.deleted_at is not None:
+            return False
+        level = self.viewer_level(db, viewer_id, post.author_id)
+        return self._allowed(level, post.privacy, post.author.post_visibility)
+
+    def can_see_stories(self, db: Session, viewer_id: int, author: User) -> bool:
+        if author.deleted_at is not None:
+            return False
+        return self._allowed(self.viewer_level(db, viewer_id, author.id), author.story_visibility)
+
+    def can_view_profile(self, db: Session, viewer_id: int, user: User) -> bool:
+        return self._allowed(self.viewer_level(db, viewer_id, user.id), user.profile_visibility)
+
+    # Predicados SQL (a consulta faz JOIN com users pelo autor)
+
+    def _filter(self, db: Session, viewer_id: int, author_column, *settings):
+        """Próprio autor, ou: sem bloqueio e (tudo público, ou amigo e nada privado)"""
+        self.stats['sql_filters'] += 1
+        friends = social_graph.friends(db, viewer_id)
+        blocked = social_graph.blocked_either(db, viewer_id)
+        settings = [func.coalesce(setting, literal("public")) for setting in settings]
+
+        allowed = and_(*(setting == "public" for setting in settings))
+        if friends:
+            allowed = or_(allowed, and_(
+                author_column.in_(friends),
+                *(setting.in_(("public", "friends")) for setting in settings)
+            ))
+        if blocked:
+            allowed = and_(author_column.notin_(blocked), allowed)
+        return or_(author_column == viewer_id, allowed)
+
+    def post_filter(self, db: Session, viewer_id: int, on_profile: bool = False):
+        """Posts visíveis; on_profile também exige acesso ao perfil do autor"""
+        settings = [Post.privacy, User.post_visibility]
+        if on_profile:
+            settings.append(User.profile_visibility)
+        return and_(
+            Post.deleted_at.is_(None), User.deleted_at.is_(None),
+            self._filter(db, viewer_id, Post.author_id, *settings)
+        )
+
+    def story_filter(self, db: Session, viewer_id: int):
+        return and_(
+            Story.deleted_at.is_(None), User.deleted_at.is_(None),
+            self._filter(db, viewer_id, Story.author_id, User.story_visibility)
+        )
+
+    def post_visible(self, db: Session, viewer_id: int, post_id: int) -> Optional[bool]:
+        """Visibilidade de um post pelo id (None se ele não existe ou tem lápide), numa consulta"""
+        row = db.query(Post.author_id, Post.privacy, User.post_visibility).join(
+            User, User.id == Post.author_id
+        ).filter(Post.id == post_id, Post.deleted_at.is_(None), User.deleted_at.is_(None)).first()
+        if row is None:
+            return None
+        return self._allowed(self.viewer_level(db, viewer_id, row.author_id), row.privacy, row.post_visibility)
+
+    def get_stats(self):
+        return dict(self.stats)
+
+# Instância global das regras de visibilidade
+visibility = Visibility()